@@ -77,6 +77,25 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+    },
+    # одноразовая база нагрузочных замеров (benchmark_rebalance --synthetic):
+    # в памяти процесса, рабочие данные не затрагиваются
+    "benchmark": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+}
+
+
+# Кэш ответов JSON API — в памяти процесса. Ключи включают номер
+# версии данных (library.models.DataVersion), поэтому изменения из
+# других процессов (команды, обработчик заданий) видны сразу.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "city-library",
+        "TIMEOUT": 600,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
     }
 }
 
@@ -0,0 +1,61 @@
+"""
+Счётчик Library.load — число книг в библиотеке.
+
+Поштучные изменения LibraryBook учитывают сигналы журнала
+(library/journal.py), массовые операции вызывают adjust или assign сами.
+Все обновления — F-выражения или прямое присваивание,
+без чтения таблицы LibraryBook.
+"""
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, F
+
+from library.models import Library, LibraryBook
+
+
+def adjust(deltas, using=DEFAULT_DB_ALIAS):
+    """{library_id: изменение числа книг} — один UPDATE на библиотеку."""
+    libraries = Library.objects.using(using)
+    for library_id, delta in deltas.items():
+        if delta:
+            libraries.filter(pk=library_id).update(load=F("load") + delta)
+
+
+def assign(load, batch_size=1000):
+    """
+    Записать известную загрузку {library_id: книги} целиком.
+    Загрузка видна в API — версия данных сдвигается.
+    """
+    # journal импортирует этот модуль
+    from library.journal import bump_version
+
+    libraries = [
+        Library(id=library_id, load=count) for library_id, count in load.items()
+    ]
+    Library.objects.bulk_update(libraries, ["load"], batch_size=batch_size)
+    bump_version()
+
+
+def loads(libraries=None):
+    """Загрузка {library_id: книги} по счётчикам — O(библиотек)."""
+    if libraries is None:
+        return dict(Library.objects.values_list("id", "load"))
+    return {lib.id: lib.load for lib in libraries}
+
+
+def drift():
+    """
+    Расхождения счётчиков с таблицей LibraryBook:
+    {library_id: (счётчик, фактически)}. Один GROUP BY по LibraryBook.
+    """
+    actual = dict(
+        LibraryBook.objects.order_by()
+        .values("library_id")
+        .annotate(total=Count("pk"))
+        .values_list("library_id", "total")
+    )
+    return {
+        library_id: (load, actual.get(library_id, 0))
+        for library_id, load in Library.objects.values_list("id", "load")
+        if load != actual.get(library_id, 0)
+    }
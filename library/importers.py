@@ -0,0 +1,158 @@
+"""
+Потоковое чтение исходных данных.
+
+Все читатели выдают пары (раздел, запись), где раздел —
+"authors", "books" или "libraries", а запись — словарь полей.
+Файл целиком в память не загружается.
+"""
+
+import csv
+import json
+from pathlib import Path
+
+SECTIONS = ("authors", "books", "libraries")
+
+# тип записи в NDJSON → раздел
+NDJSON_TYPES = {"author": "authors", "book": "books", "library": "libraries"}
+
+READ_SIZE = 1 << 20
+
+# предел одного JSON-значения: без него битый файл (незакрытая строка)
+# дочитывался бы в буфер до конца
+MAX_VALUE = 64 << 20
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """Буфер поверх файла: подчитывает данные по мере разбора."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Следующий значимый символ (пробелы пропускаются)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Ожидался '{char}' в позиции {self.pos}")
+        self.pos += 1
+
+    def value(self, decoder):
+        """Очередное JSON-значение; при нехватке данных буфер дочитывается."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if len(self.buf) - self.pos > MAX_VALUE:
+                    raise ValueError(
+                        f"JSON-значение длиннее {MAX_VALUE} символов — файл повреждён?"
+                    )
+                if self.fill():
+                    continue
+                raise
+            # число могло оборваться на границе буфера
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json(path):
+    """
+    Файл вида {"authors": [...], "books": [...], "libraries": [...]}.
+    Элементы массивов разбираются по одному.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(path, encoding="utf-8") as f:
+        reader = _Reader(f)
+        reader.expect("{")
+
+        while reader.peek() != "}":
+            key = reader.value(decoder)
+            reader.expect(":")
+
+            if key not in SECTIONS or reader.peek() != "[":
+                reader.value(decoder)
+            else:
+                reader.expect("[")
+                while reader.peek() != "]":
+                    yield key, reader.value(decoder)
+                    if reader.peek() == ",":
+                        reader.pos += 1
+                reader.expect("]")
+
+            if reader.peek() == ",":
+                reader.pos += 1
+
+        reader.expect("}")
+
+
+def iter_ndjson(path):
+    """
+    По одному JSON-объекту на строку, раздел — в поле "type".
+    Битая строка или неизвестный тип — ValueError с номером строки.
+    """
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"строка {number}: {e}")
+            kind = record.pop("type", None) if isinstance(record, dict) else None
+            if not isinstance(kind, str) or kind not in NDJSON_TYPES:
+                raise ValueError(
+                    f'строка {number}: нет поля "type" или неизвестный '
+                    f"тип {kind!r} (есть: {', '.join(NDJSON_TYPES)})"
+                )
+            yield NDJSON_TYPES[kind], record
+
+
+def iter_csv(directory):
+    """Каталог с authors.csv, books.csv и libraries.csv (с заголовками)."""
+    directory = Path(directory)
+    for section in SECTIONS:
+        path = directory / f"{section}.csv"
+        if not path.exists():
+            continue
+        with path.open(encoding="utf-8", newline="") as f:
+            for record in csv.DictReader(f):
+                yield section, record
+
+
+def detect_format(path) -> str:
+    path = Path(path)
+    if path.is_dir():
+        return "csv"
+    if path.suffix in (".ndjson", ".jsonl"):
+        return "ndjson"
+    return "json"
+
+
+READERS = {"json": iter_json, "ndjson": iter_ndjson, "csv": iter_csv}
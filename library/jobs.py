@@ -0,0 +1,439 @@
+"""
+Фоновые задания перераспределения без внешнего брокера.
+
+Очередь — таблица RebalanceJob. Процесс rebalance_worker забирает
+задание условным UPDATE (claim), строит план и записывает его пачками
+RebalanceChunk, затем применяет пачки по одной: UPDATE книг, сдвиг
+счётчиков Library.load, записи журнала и отметка пачки — в одной
+транзакции. Упавшее или отменённое задание продолжается с первой
+неприменённой пачки, уже перенесённые книги не трогаются.
+
+Книги переносятся с условием library_id = донор: если за время
+задания книгу перенесли или удалили, она пропускается (skipped_moves).
+
+Задание принадлежит процессу из поля worker. Пока строится план,
+heartbeat обновляет фоновый поток (keep_alive), а каждая запись
+(пачки плана, применение пачки, завершение) начинается с проверки
+владения: если задание успели забрать как брошенное, процесс
+останавливается (JobLost), ничего не записав.
+"""
+
+import os
+import socket
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.db import connections, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from library import counters, journal
+from library.models import Library, LibraryBook, RebalanceChunk, RebalanceJob
+from library.redistribution.apportion import target_loads
+from library.redistribution.arrays import ArrayInventory, ArrayRedistributionManager
+from library.redistribution.mincost import (
+    MinCostRedistributionManager,
+    missing_coordinates,
+)
+from library.redistribution.orm import iter_inventory_rows
+from library.redistribution.priority import PriorityRedistributionManager
+
+PLANNERS = {
+    "priority": PriorityRedistributionManager,
+    "mincost": MinCostRedistributionManager,
+}
+BACKENDS = ("objects", "arrays")
+
+# пачек плана на один INSERT
+INSERT_BATCH = 100
+
+ACTIVE = (RebalanceJob.PLANNING, RebalanceJob.APPLYING)
+
+# как часто keep_alive обновляет heartbeat, секунды; должно быть
+# заметно меньше stale_after у claim()
+HEARTBEAT_INTERVAL = 30
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobLost(Exception):
+    """Задание забрал другой процесс (heartbeat устарел)."""
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def submit(planner="priority", backend="objects", chunk_size=1000) -> RebalanceJob:
+    if planner not in PLANNERS:
+        raise ValueError(f"Неизвестный планировщик: {planner}")
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд: {backend}")
+    if backend == "arrays" and planner != "priority":
+        # векторизованный бэкенд строит только план priority
+        raise ValueError("Бэкенд arrays работает только с планировщиком priority")
+    if chunk_size < 1:
+        raise ValueError("chunk_size должен быть положительным")
+    return RebalanceJob.objects.create(
+        planner=planner, backend=backend, chunk_size=chunk_size
+    )
+
+
+def cancel(job_id) -> RebalanceJob:
+    """
+    Задание в очереди отменяется сразу, выполняемое — после текущей пачки.
+    Применённые пачки остаются применёнными.
+    """
+    RebalanceJob.objects.filter(pk=job_id, status=RebalanceJob.QUEUED).update(
+        status=RebalanceJob.CANCELLED, finished_at=timezone.now()
+    )
+    RebalanceJob.objects.filter(pk=job_id, status__in=ACTIVE).update(
+        cancel_requested=True
+    )
+    return RebalanceJob.objects.get(pk=job_id)
+
+
+def resume(job_id) -> RebalanceJob:
+    """Вернуть отменённое или упавшее задание в очередь."""
+    updated = RebalanceJob.objects.filter(
+        pk=job_id, status__in=(RebalanceJob.FAILED, RebalanceJob.CANCELLED)
+    ).update(
+        status=RebalanceJob.QUEUED,
+        cancel_requested=False,
+        error="",
+        finished_at=None,
+    )
+    job = RebalanceJob.objects.get(pk=job_id)
+    if not updated:
+        raise ValueError(f"Задание #{job_id} в статусе {job.status}: продолжать нечего")
+    return job
+
+
+def claim(worker, stale_after=300):
+    """
+    Забрать задание: из очереди или брошенное упавшим процессом
+    (heartbeat старше stale_after секунд). None — заданий нет.
+    """
+    stale = timezone.now() - timedelta(seconds=stale_after)
+    candidates = RebalanceJob.objects.filter(
+        status=RebalanceJob.QUEUED
+    ) | RebalanceJob.objects.filter(status__in=ACTIVE, heartbeat_at__lt=stale)
+
+    for job in candidates.order_by("created_at", "pk"):
+        # условный UPDATE: из двух процессов задание получит один
+        now = timezone.now()
+        taken = RebalanceJob.objects.filter(
+            pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at
+        ).update(
+            status=RebalanceJob.APPLYING if job.planned else RebalanceJob.PLANNING,
+            worker=worker,
+            heartbeat_at=now,
+            started_at=job.started_at or now,
+        )
+        if taken:
+            return RebalanceJob.objects.get(pk=job.pk)
+    return None
+
+
+def release(job):
+    """Вернуть задание в очередь (процесс останавливается штатно)."""
+    RebalanceJob.objects.filter(pk=job.pk, worker=job.worker, status__in=ACTIVE).update(
+        status=RebalanceJob.QUEUED, worker=""
+    )
+
+
+def _touch(job) -> bool:
+    """Обновить heartbeat, если задание всё ещё у этого процесса."""
+    return bool(
+        RebalanceJob.objects.filter(
+            pk=job.pk, worker=job.worker, status__in=ACTIVE
+        ).update(heartbeat_at=timezone.now())
+    )
+
+
+def _own(job):
+    """
+    Первая запись транзакции: задание наше, и до её фиксации claim()
+    другого процесса его не заберёт (heartbeat уже не тот).
+    """
+    if not _touch(job):
+        raise JobLost(f"Задание #{job.pk} забрал другой процесс")
+
+
+@contextmanager
+def keep_alive(job, interval=HEARTBEAT_INTERVAL):
+    """
+    Долгий шаг без записей (построение плана): heartbeat обновляется
+    из фонового потока раз в interval секунд.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval) and _touch(job):
+                pass
+        finally:
+            # соединение с базой у потока своё
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _plan(job):
+    libraries = list(Library.objects.all())
+    if job.planner == "mincost" and missing_coordinates(libraries):
+        raise ValueError("mincost: не у всех библиотек есть координаты")
+    inventory = iter_inventory_rows()
+    if job.backend == "arrays":
+        inv = ArrayInventory.from_rows(libraries, inventory)
+        return ArrayRedistributionManager(
+            inv, priority_year=PriorityRedistributionManager.PRIORITY_YEAR
+        ).rebalance()
+    return PLANNERS[job.planner](libraries, inventory).plan()
+
+
+def _iter_chunks(job, plan, applied):
+    index = 0
+    for route in plan.routes():
+        book_ids = route.book_ids
+        for start in range(0, len(book_ids), job.chunk_size):
+            part = book_ids[start : start + job.chunk_size]
+            yield RebalanceChunk(
+                job=job,
+                index=index,
+                from_library_id=route.from_library_id,
+                to_library_id=route.to_library_id,
+                # array("q") у Plan, int64-массив у ArrayPlan — те же байты
+                book_ids=part.tobytes(),
+                quantity=len(part),
+                applied=applied,
+            )
+            index += 1
+
+
+def _iter_route_totals(job, plan):
+    """Уже применённый план: строка на маршрут, без номеров книг."""
+    for index, route in enumerate(plan.routes()):
+        yield RebalanceChunk(
+            job=job,
+            index=index,
+            from_library_id=route.from_library_id,
+            to_library_id=route.to_library_id,
+            book_ids=b"",
+            quantity=route.quantity,
+            applied=True,
+        )
+
+
+def _store_chunks(job, plan, applied=False, chunks=None) -> int:
+    """Записать план пачками (или готовые строки chunks); число строк."""
+    if chunks is None:
+        chunks = _iter_chunks(job, plan, applied)
+    total = 0
+    while batch := list(islice(chunks, INSERT_BATCH)):
+        RebalanceChunk.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def _prune_done(keep):
+    """
+    Пачки завершённых заданий старше keep больше не нужны: последний
+    план (last_plan) — keep или задание новее, прогресс хранится в
+    самом задании.
+    """
+    RebalanceChunk.objects.filter(
+        job__status=RebalanceJob.DONE, job__pk__lt=keep.pk
+    ).delete()
+
+
+def plan_job(job, heartbeat=HEARTBEAT_INTERVAL):
+    """Построить план и записать его пачками — всё или ничего."""
+    with keep_alive(job, heartbeat):
+        plan = _plan(job)
+    with transaction.atomic():
+        _own(job)
+        # остатки плана, прерванного на середине записи
+        job.chunks.all().delete()
+        total = _store_chunks(job, plan)
+        RebalanceJob.objects.filter(pk=job.pk).update(
+            planned=True,
+            status=RebalanceJob.APPLYING,
+            total_moves=len(plan),
+            total_chunks=total,
+            heartbeat_at=timezone.now(),
+        )
+        # новый «последний план» для API
+        journal.bump_version()
+    job.refresh_from_db()
+
+
+def record_plan(plan, planner, backend, chunk_size=1000) -> RebalanceJob:
+    """
+    План, уже применённый rebalance_libraries, — завершённым заданием:
+    последний план всегда один и тот же источник, как бы его ни применяли.
+    Книги уже на местах, поэтому хранятся только маршруты — строка на
+    маршрут, O(маршрутов), а не O(переносов). Пачки прежних завершённых
+    заданий удаляются — хранится один план.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = RebalanceJob.objects.create(
+            status=RebalanceJob.DONE,
+            planner=planner,
+            backend=backend,
+            chunk_size=chunk_size,
+            planned=True,
+            total_moves=len(plan),
+            applied_moves=len(plan),
+            worker=worker_name(),
+            started_at=now,
+            finished_at=now,
+            heartbeat_at=now,
+        )
+        job.total_chunks = job.applied_chunks = _store_chunks(
+            job, plan, chunks=_iter_route_totals(job, plan)
+        )
+        job.save(update_fields=["total_chunks", "applied_chunks"])
+        _prune_done(keep=job)
+        journal.bump_version()
+    return job
+
+
+def last_plan():
+    """Последнее задание с записанным планом (None — планов ещё не было)."""
+    return RebalanceJob.objects.filter(planned=True).order_by("-pk").first()
+
+
+def plan_routes(job):
+    """Маршруты плана задания: [(from, to, книг)] — один GROUP BY."""
+    return list(
+        job.chunks.order_by()
+        .values("from_library_id", "to_library_id")
+        .annotate(quantity=Sum("quantity"))
+        .order_by("from_library_id", "to_library_id")
+        .values_list("from_library_id", "to_library_id", "quantity")
+    )
+
+
+def apply_chunk(job, chunk):
+    """Пачка, счётчики, журнал и прогресс — в одной транзакции."""
+    book_ids = array("q")
+    book_ids.frombytes(chunk.book_ids)
+    with transaction.atomic():
+        _own(job)
+        moved = LibraryBook.objects.filter(
+            library_id=chunk.from_library_id, book_id__in=book_ids.tolist()
+        ).update(library_id=chunk.to_library_id)
+        counters.adjust({chunk.from_library_id: -moved, chunk.to_library_id: moved})
+        journal.record_transfer(chunk.from_library_id, chunk.to_library_id, moved)
+        RebalanceChunk.objects.filter(pk=chunk.pk).update(applied=True)
+        RebalanceJob.objects.filter(pk=job.pk).update(
+            applied_moves=F("applied_moves") + moved,
+            skipped_moves=F("skipped_moves") + (chunk.quantity - moved),
+            applied_chunks=F("applied_chunks") + 1,
+        )
+    return moved
+
+
+def _finish(job):
+    """Снимок для --incremental и статус «завершено»."""
+    with transaction.atomic():
+        _own(job)
+        last_id = journal.last_change_id()
+        libraries = list(Library.objects.all())
+        load = counters.loads(libraries)
+        journal.save_snapshot(
+            load, target_loads(libraries, sum(load.values())), last_id
+        )
+        RebalanceJob.objects.filter(pk=job.pk).update(
+            status=RebalanceJob.DONE, finished_at=timezone.now()
+        )
+        _prune_done(keep=job)
+
+
+def _check_cancel(job):
+    if RebalanceJob.objects.filter(pk=job.pk, cancel_requested=True).exists():
+        raise JobCancelled
+
+
+def run(job, on_chunk=None, heartbeat=HEARTBEAT_INTERVAL):
+    """
+    Выполнить задание, полученное через claim(): план (если его ещё нет)
+    и неприменённые пачки по порядку. on_chunk(job, chunk, moved) —
+    для вывода прогресса. Ошибка переводит задание в FAILED; задание,
+    которое забрал другой процесс, не трогается.
+    """
+    mine = RebalanceJob.objects.filter(pk=job.pk, worker=job.worker)
+    try:
+        if not job.planned:
+            plan_job(job, heartbeat)
+        pending = job.chunks.filter(applied=False).order_by("index")
+        for chunk in pending.iterator(chunk_size=INSERT_BATCH):
+            _check_cancel(job)
+            moved = apply_chunk(job, chunk)
+            if on_chunk is not None:
+                on_chunk(job, chunk, moved)
+        _finish(job)
+    except JobLost:
+        pass
+    except JobCancelled:
+        mine.update(
+            status=RebalanceJob.CANCELLED,
+            cancel_requested=False,
+            finished_at=timezone.now(),
+        )
+    except Exception as e:
+        mine.update(
+            status=RebalanceJob.FAILED,
+            error=f"{type(e).__name__}: {e}",
+            finished_at=timezone.now(),
+        )
+        raise
+    finally:
+        job.refresh_from_db()
+    return job
+
+
+def progress(job) -> dict:
+    """Состояние задания для CLI и HTTP."""
+
+    def iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        "id": job.pk,
+        "status": job.status,
+        "planner": job.planner,
+        "backend": job.backend,
+        "chunk_size": job.chunk_size,
+        "planned": job.planned,
+        "total_moves": job.total_moves,
+        "applied_moves": job.applied_moves,
+        "skipped_moves": job.skipped_moves,
+        "total_chunks": job.total_chunks,
+        "applied_chunks": job.applied_chunks,
+        "percent": (
+            round(job.applied_chunks / job.total_chunks * 100, 1)
+            if job.total_chunks
+            else (100.0 if job.status == RebalanceJob.DONE else 0.0)
+        ),
+        "cancel_requested": job.cancel_requested,
+        "worker": job.worker,
+        "error": job.error,
+        "created_at": iso(job.created_at),
+        "started_at": iso(job.started_at),
+        "finished_at": iso(job.finished_at),
+        "heartbeat_at": iso(job.heartbeat_at),
+    }
@@ -0,0 +1,222 @@
+"""
+Журнал изменений инвентаря и снимок состояния для инкрементального
+перераспределения.
+
+После каждого перераспределения сохраняется снимок LibraryState
+(загрузка и цель каждой библиотеки), а сигналы моделей пишут в
+InventoryChange всё, что меняется потом. Текущая загрузка = снимок +
+сумма изменений, поэтому следующий запуск не читает весь инвентарь.
+
+Те же сигналы поддерживают счётчик Library.load (library/counters.py)
+и номер версии данных DataVersion — по нему кэш API (library/views.py)
+замечает изменения, сделанные другими процессами. Версию сдвигают и
+изменения библиотек, книг и авторов.
+
+Массовые операции (bulk_create, QuerySet.update) сигналов не шлют:
+их выполняют внутри suspended(), счётчики обновляют сами,
+а снимок сбрасывают через invalidate(). Таблицы целиком очищает clear().
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F, Max, Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from library import counters
+from library.models import (
+    Author,
+    Book,
+    DataVersion,
+    InventoryChange,
+    Library,
+    LibraryBook,
+    LibraryState,
+)
+
+BOOK_KINDS = (InventoryChange.BOOK_ADDED, InventoryChange.BOOK_REMOVED)
+
+# журнал отключён в этом потоке (задаче asyncio) — см. suspended()
+_suspended = ContextVar("journal_suspended", default=False)
+
+
+def _record(kind, library_id, delta=0):
+    InventoryChange.objects.create(kind=kind, library_id=library_id, delta=delta)
+
+
+def bump_version():
+    """Данные изменились: закэшированные ответы API больше не действуют."""
+    if not DataVersion.objects.filter(pk=1).update(value=F("value") + 1):
+        DataVersion.objects.get_or_create(pk=1, defaults={"value": 1})
+
+
+def version() -> int:
+    """Текущий номер версии данных — один запрос по первичному ключу."""
+    return DataVersion.objects.filter(pk=1).values_list("value", flat=True).first() or 0
+
+
+def _remember_library(sender, instance, **kwargs):
+    """Прежняя библиотека книги — чтобы заметить перенос."""
+    if _suspended.get():
+        return
+    instance._journal_library_id = (
+        LibraryBook.objects.filter(pk=instance.pk)
+        .values_list("library_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+def _placement_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or _suspended.get():
+        return
+    previous = getattr(instance, "_journal_library_id", None)
+    if not created and previous == instance.library_id:
+        return
+    deltas = {instance.library_id: 1}
+    if previous is not None:
+        _record(InventoryChange.BOOK_REMOVED, previous, -1)
+        deltas[previous] = -1
+    _record(InventoryChange.BOOK_ADDED, instance.library_id, 1)
+    counters.adjust(deltas)
+    bump_version()
+
+
+def _placement_deleted(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    _record(InventoryChange.BOOK_REMOVED, instance.library_id, -1)
+    counters.adjust({instance.library_id: -1})
+    bump_version()
+
+
+def _catalog_changed(sender, instance, raw=False, **kwargs):
+    """
+    Библиотеки, книги и авторы в журнал не пишутся: загрузку они не
+    меняют, цели считаются по текущим библиотекам при каждом запуске.
+    Но названия, годы, вместимость видны в API.
+    """
+    if raw or _suspended.get():
+        return
+    bump_version()
+
+
+RECEIVERS = [
+    (pre_save, _remember_library, LibraryBook),
+    (post_save, _placement_saved, LibraryBook),
+    (post_delete, _placement_deleted, LibraryBook),
+    (post_save, _catalog_changed, Library),
+    (post_delete, _catalog_changed, Library),
+    (post_save, _catalog_changed, Book),
+    (post_delete, _catalog_changed, Book),
+    (post_save, _catalog_changed, Author),
+    (post_delete, _catalog_changed, Author),
+]
+
+
+def connect():
+    for signal, receiver, sender in RECEIVERS:
+        signal.connect(receiver, sender=sender, dispatch_uid=receiver.__name__)
+
+
+@contextmanager
+def suspended():
+    """
+    Журнал отключён в текущем потоке: сигналы приходят, но ничего не
+    пишут. Другие потоки и процессы журналируют как обычно.
+    После этого снимок нужно сбросить.
+    """
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def clear(*models, using=DEFAULT_DB_ALIAS):
+    """
+    Очистить таблицы моделей — по одному DELETE на таблицу, без сигналов
+    и без обхода каскадов в Python (QuerySet.delete() у моделей с
+    сигналами читает каждую строку). Порядок — от зависимых к главным.
+    Журнал и счётчики не меняются: вызывать внутри suspended().
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for model in models:
+            table = connection.ops.quote_name(model._meta.db_table)
+            cursor.execute(f"DELETE FROM {table}")
+
+
+def invalidate():
+    """Снимок больше не отражает таблицы — следующий запуск будет полным."""
+    with transaction.atomic():
+        LibraryState.objects.all().delete()
+        InventoryChange.objects.all().delete()
+        bump_version()
+
+
+def record_transfer(from_library_id, to_library_id, quantity):
+    """
+    Перенос quantity книг, выполненный QuerySet.update() мимо сигналов:
+    две записи журнала вместо invalidate(), снимок остаётся верным.
+    """
+    if quantity:
+        InventoryChange.objects.bulk_create(
+            [
+                InventoryChange(
+                    kind=InventoryChange.BOOK_REMOVED,
+                    library_id=from_library_id,
+                    delta=-quantity,
+                ),
+                InventoryChange(
+                    kind=InventoryChange.BOOK_ADDED,
+                    library_id=to_library_id,
+                    delta=quantity,
+                ),
+            ]
+        )
+        bump_version()
+
+
+def last_change_id() -> int:
+    return InventoryChange.objects.aggregate(last=Max("id"))["last"] or 0
+
+
+def current_load(libraries, last_id):
+    """
+    Загрузка {library_id: книги} по снимку и журналу до last_id включительно.
+    None, если снимка нет или загрузка разошлась со счётчиками Library.load
+    (изменения мимо сигналов) — тогда нужен полный пересчёт. libraries —
+    экземпляры Library: счётчики берутся из них, без запроса.
+    """
+    snapshot = dict(LibraryState.objects.values_list("library_id", "load"))
+    if not snapshot and libraries:
+        return None
+
+    changes = dict(
+        InventoryChange.objects.filter(id__lte=last_id, kind__in=BOOK_KINDS)
+        .values("library_id")
+        .annotate(total=Sum("delta"))
+        .values_list("library_id", "total")
+    )
+
+    load = {
+        lib.id: snapshot.get(lib.id, 0) + changes.get(lib.id, 0) for lib in libraries
+    }
+    if load != counters.loads(libraries):
+        return None
+    return load
+
+
+def save_snapshot(load, target_load, last_id):
+    """Снимок после перераспределения; учтённые записи журнала удаляются."""
+    with transaction.atomic():
+        LibraryState.objects.all().delete()
+        LibraryState.objects.bulk_create(
+            LibraryState(library_id=lib_id, load=load.get(lib_id, 0), target=target)
+            for lib_id, target in target_load.items()
+        )
+        InventoryChange.objects.filter(id__lte=last_id).delete()
+        bump_version()
@@ -0,0 +1,493 @@
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+
+import numpy as np
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+
+from library import journal
+from library.models import Author, Book, Library, LibraryBook, LibraryState
+from library.persist import persist_delta, persist_rebuild
+from library.redistribution.arrays import ArrayInventory, ArrayRedistributionManager
+from library.redistribution.base import RedistributionManager
+from library.redistribution.capacity import CapacityAwareRedistributionManager
+from library.redistribution.mincost import MinCostRedistributionManager
+from library.redistribution.orm import iter_inventory_rows
+from library.redistribution.placement import STRATEGIES
+from library.redistribution.priority import PriorityRedistributionManager
+from library.redistribution.synthetic import CAPACITY_DISTRIBUTIONS, generate
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MANAGERS = {
+    "base": RedistributionManager,
+    "capacity": CapacityAwareRedistributionManager,
+    "priority": PriorityRedistributionManager,
+    "mincost": MinCostRedistributionManager,
+    # векторизованный бэкенд, получает массивы сети напрямую
+    "arrays": ArrayRedistributionManager,
+}
+
+DEFAULT_MANAGERS = "base,capacity,priority"
+DEFAULT_SIZES = "1e3,1e4,1e5,1e6"
+
+# рост памяти меньше этого не считается регрессией (шум аллокатора)
+MEMORY_NOISE_MB = 16
+
+# одноразовая база замера сохранения (settings.DATABASES)
+BENCHMARK_DB = "benchmark"
+
+# Сеть текущего размера. Замеры идут в дочерних процессах (fork),
+# которые получают её без копирования и сериализации.
+_NETWORK = None
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux — килобайты, macOS — байты
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def _plan(manager):
+    network = _NETWORK
+    if manager == "arrays":
+        inv = ArrayInventory(
+            [lib.id for lib in network.libraries],
+            [lib.capacity for lib in network.libraries],
+            network.book_id,
+            network.library_id,
+            network.year,
+        )
+        return ArrayRedistributionManager(
+            inv, priority_year=PriorityRedistributionManager.PRIORITY_YEAR
+        ).rebalance()
+    return MANAGERS[manager](network.libraries, network.rows()).plan()
+
+
+def _persist(plan, batch_size):
+    """
+    Время сохранения плана (--persist delta) на сети, записанной
+    в одноразовую базу BENCHMARK_DB. Рабочая база не затрагивается.
+    """
+    network = _NETWORK
+    load = np.bincount(network.library_id, minlength=len(network.libraries) + 1)
+    using = BENCHMARK_DB
+
+    call_command("migrate", database=using, verbosity=0)
+    with journal.suspended(), transaction.atomic(using=using):
+        # без fork база процесса общая для всех замеров
+        journal.clear(LibraryBook, LibraryState, Book, Author, Library, using=using)
+
+        Author.objects.using(using).bulk_create(
+            (
+                Author(id=a["id"], full_name=a["full_name"], birth_date=a["birth_date"])
+                for section, a in network.records()
+                if section == "authors"
+            ),
+            batch_size=batch_size,
+        )
+        Library.objects.using(using).bulk_create(
+            [
+                Library(
+                    id=lib.id,
+                    name=f"Библиотека {lib.id}",
+                    capacity=lib.capacity,
+                    district=lib.district,
+                    load=int(load[lib.id]),
+                )
+                for lib in network.libraries
+            ],
+            batch_size=batch_size,
+        )
+        Book.objects.using(using).bulk_create(
+            (
+                Book(id=book_id, title=f"Книга {book_id}", year=year, author_id=a)
+                for book_id, year, a in zip(
+                    network.book_id.tolist(),
+                    network.year.tolist(),
+                    network.author_id.tolist(),
+                )
+            ),
+            batch_size=batch_size,
+        )
+        LibraryBook.objects.using(using).bulk_create(
+            (
+                LibraryBook(library_id=lib_id, book_id=book_id)
+                for book_id, lib_id, _ in network.rows()
+            ),
+            batch_size=batch_size,
+        )
+
+        started = time.perf_counter()
+        persist_delta(plan, batch_size, using=using)
+        elapsed = time.perf_counter() - started
+
+        transaction.set_rollback(True, using=using)
+
+    return elapsed
+
+
+def _run_case(manager, repeat, persist, batch_size):
+    baseline = _max_rss_mb()
+
+    # лучшее из repeat: шум планировщика ОС не выдаётся за регрессию
+    plan_seconds = None
+    for _ in range(repeat):
+        plan = None
+        started = time.perf_counter()
+        plan = _plan(manager)
+        elapsed = time.perf_counter() - started
+        plan_seconds = elapsed if plan_seconds is None else min(plan_seconds, elapsed)
+
+    peak = _max_rss_mb()
+    result = {
+        "plan_seconds": plan_seconds,
+        "peak_memory_mb": None if peak is None else peak - baseline,
+        "moves": len(plan),
+        "routes": sum(1 for _ in plan.routes()),
+        "persist_seconds": _persist(plan, batch_size) if persist else None,
+    }
+    return result
+
+
+def _isolated(func, *args):
+    """
+    Запуск в отдельном процессе: пик памяти меряется от состояния
+    на момент fork, а падение (например, нехватка памяти) не роняет замер.
+    Без fork — в текущем процессе.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return func(*args)
+
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(func, *args).result()
+
+
+def _parse_list(value, convert=str):
+    return [convert(item) for item in value.split(",") if item.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замерить горячие запросы перераспределения на текущей базе: чтение "
+        "инвентаря, выбор книг донора по году, подсчёт загрузки, сохранение плана "
+        "(запись — в транзакции с откатом). С --synthetic — нагрузочный замер "
+        "менеджеров на синтетических сетях: время плана, пик памяти, число "
+        "переносов, время сохранения в одноразовой базе; результаты — JSON "
+        "для сравнения между версиями."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Сколько раз повторить каждый замер (берётся лучший)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Размер пачки для сохранения плана",
+        )
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Показать планы выполнения горячих запросов",
+        )
+
+        synthetic = parser.add_argument_group("синтетические сети (--synthetic)")
+        synthetic.add_argument(
+            "--synthetic",
+            action="store_true",
+            help="Замерять менеджеры на синтетических сетях, а не текущую базу",
+        )
+        synthetic.add_argument(
+            "--sizes",
+            type=str,
+            default=DEFAULT_SIZES,
+            help=f"Размеры сети в книгах через запятую (по умолчанию {DEFAULT_SIZES})",
+        )
+        synthetic.add_argument(
+            "--managers",
+            type=str,
+            default=DEFAULT_MANAGERS,
+            help=f"Менеджеры через запятую: {', '.join(MANAGERS)}",
+        )
+        synthetic.add_argument(
+            "--libraries", type=int, default=100, help="Число библиотек"
+        )
+        synthetic.add_argument(
+            "--capacity",
+            choices=CAPACITY_DISTRIBUTIONS,
+            default="skewed",
+            help="Распределение вместимости",
+        )
+        synthetic.add_argument(
+            "--placement",
+            choices=sorted(STRATEGIES),
+            default="first-fit",
+            help="Первичное размещение: first-fit — сильный перекос",
+        )
+        synthetic.add_argument(
+            "--fill", type=float, default=0.8, help="Доля занятых мест"
+        )
+        synthetic.add_argument(
+            "--old-share",
+            type=float,
+            default=0.3,
+            help="Доля книг не новее года приоритета",
+        )
+        synthetic.add_argument("--seed", type=int, default=0)
+        synthetic.add_argument(
+            "--persist-limit",
+            type=int,
+            default=100000,
+            help="Замерять сохранение в БД для сетей не больше стольких книг "
+            "(0 — не замерять)",
+        )
+        synthetic.add_argument(
+            "--output", type=str, default=None, help="Куда записать JSON"
+        )
+        synthetic.add_argument(
+            "--compare",
+            type=str,
+            default=None,
+            help="JSON прошлого замера: замедление или рост памяти "
+            "больше --tolerance — ошибка",
+        )
+        synthetic.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Допустимое ухудшение при --compare (доля, по умолчанию 0.25)",
+        )
+
+    def _measure(self, name, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        self.stdout.write(f"{name:20} {best * 1000:10.1f} мс")
+        return best
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            self._synthetic(options)
+        else:
+            self._queries(options)
+
+    # Горячие запросы на текущей базе
+
+    def _queries(self, options):
+        repeat = options["repeat"]
+        batch_size = options["batch_size"]
+
+        libraries = list(Library.objects.all())
+        if not libraries:
+            self.stderr.write(self.style.ERROR("Нет библиотек"))
+            return
+        donor = max(libraries, key=lambda lib: lib.load)
+
+        # горячие запросы
+        donor_books = (
+            LibraryBook.objects.filter(library_id=donor.id)
+            .order_by("book__year")
+            .values_list("book_id", "book__year")
+        )
+        load_counts = (
+            LibraryBook.objects.order_by()
+            .values("library_id")
+            .annotate(total=Count("pk"))
+            .values_list("library_id", "total")
+        )
+
+        if options["explain"]:
+            for title, queryset in (
+                ("Книги донора по году", donor_books),
+                ("Загрузка по библиотекам", load_counts),
+            ):
+                self.stdout.write(f"\n{title}:\n{queryset.explain()}")
+            self.stdout.write("")
+
+        state = {}
+
+        def plan():
+            mgr = PriorityRedistributionManager(libraries, iter_inventory_rows())
+            state["plan"] = mgr.plan()
+            state["placements"] = [
+                (lib_id, book.id)
+                for lib_id, books in mgr.books_by_library.items()
+                for book in books
+            ]
+            state["load"] = {lib.id: mgr.load.get(lib.id, 0) for lib in libraries}
+
+        def delta():
+            with transaction.atomic():
+                persist_delta(state["plan"], batch_size)
+                transaction.set_rollback(True)
+
+        def rebuild():
+            with transaction.atomic():
+                persist_rebuild(state["placements"], state["load"], batch_size)
+                transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"Библиотек: {len(libraries)}, книг: {LibraryBook.objects.count()}, "
+            f"донор: {donor.id} ({donor.load} книг)\n"
+        )
+        self._measure(
+            "inventory_scan", lambda: sum(1 for _ in iter_inventory_rows()), repeat
+        )
+        self._measure("donor_books", lambda: list(donor_books.all()), repeat)
+        self._measure("load_counts", lambda: list(load_counts.all()), repeat)
+        self._measure("plan", plan, repeat)
+        self.stdout.write(f"{'':20} переносов: {len(state['plan'])}")
+        self._measure("persist_delta", delta, repeat)
+        self._measure("persist_rebuild", rebuild, repeat)
+
+    # Синтетические сети
+
+    def _print_result(self, result):
+        memory = result["peak_memory_mb"]
+        persist = result["persist_seconds"]
+        self.stdout.write(
+            f"{result['manager']:10} {result['books']:>10}  "
+            f"{result['status']:6} "
+            f"план {result['plan_seconds'] or 0:9.3f} с  "
+            f"память {'—' if memory is None else f'{memory:8.1f} МБ'}  "
+            f"переносов {result['moves'] or 0:>9}  "
+            f"сохранение {'—' if persist is None else f'{persist:7.3f} с'}"
+        )
+
+    def _compare(self, results, path, tolerance):
+        with open(path, encoding="utf-8") as f:
+            baseline = {
+                (r["manager"], r["books"]): r
+                for r in json.load(f)["results"]
+                if r["status"] == "ok"
+            }
+
+        regressions = []
+        for result in results:
+            before = baseline.get((result["manager"], result["books"]))
+            if before is None or result["status"] != "ok":
+                continue
+            case = f"{result['manager']} / {result['books']}"
+
+            if result["plan_seconds"] > before["plan_seconds"] * (1 + tolerance):
+                regressions.append(
+                    f"{case}: план {before['plan_seconds']:.3f} → "
+                    f"{result['plan_seconds']:.3f} с"
+                )
+            memory, memory_before = result["peak_memory_mb"], before["peak_memory_mb"]
+            if (
+                memory is not None
+                and memory_before is not None
+                and memory > memory_before * (1 + tolerance)
+                and memory - memory_before > MEMORY_NOISE_MB
+            ):
+                regressions.append(
+                    f"{case}: память {memory_before:.1f} → {memory:.1f} МБ"
+                )
+            if result["moves"] != before["moves"]:
+                self.stdout.write(
+                    f"{case}: число переносов {before['moves']} → {result['moves']}"
+                )
+
+        return regressions
+
+    def _synthetic(self, options):
+        global _NETWORK
+
+        sizes = _parse_list(options["sizes"], lambda x: int(float(x)))
+        managers = _parse_list(options["managers"])
+        unknown = set(managers) - set(MANAGERS)
+        if unknown:
+            raise CommandError(f"Неизвестные менеджеры: {', '.join(sorted(unknown))}")
+
+        params = {
+            "n_libraries": options["libraries"],
+            "capacity": options["capacity"],
+            "placement": options["placement"],
+            "fill": options["fill"],
+            "old_share": options["old_share"],
+            "seed": options["seed"],
+        }
+        settings = {**params, "repeat": options["repeat"]}
+
+        results = []
+        for size in sizes:
+            try:
+                _NETWORK = generate(size, **params)
+            except ValueError as e:
+                raise CommandError(str(e))
+            persist = size <= options["persist_limit"]
+
+            for manager in managers:
+                result = {"manager": manager, "books": size}
+                try:
+                    measured = _isolated(
+                        _run_case,
+                        manager,
+                        options["repeat"],
+                        persist,
+                        options["batch_size"],
+                    )
+                    result.update(status="ok", **measured)
+                except BrokenProcessPool:
+                    # процесс убит, чаще всего — нехватка памяти
+                    result.update(
+                        status="failed",
+                        plan_seconds=None,
+                        peak_memory_mb=None,
+                        moves=None,
+                        routes=None,
+                        persist_seconds=None,
+                    )
+                results.append(result)
+                self._print_result(result)
+
+        _NETWORK = None
+
+        report = {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "params": settings,
+                "sizes": sizes,
+                "managers": managers,
+            },
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результаты записаны в {options['output']}")
+
+        if options["compare"]:
+            regressions = self._compare(
+                results, options["compare"], options["tolerance"]
+            )
+            if regressions:
+                raise CommandError("Регрессии:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Регрессий нет"))
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.redistribution.orm import export_snapshot, is_stale
+from library.redistribution.snapshot import read_header
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгрузить сеть в бинарный файл снимка (колонки книг + таблица "
+        "библиотек). rebalance_libraries и simulate_scenarios открывают его "
+        "через mmap (--snapshot) вместо чтения инвентаря из базы."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="library/data/inventory.snap",
+            help="Куда записать снимок",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Не выгружать, только проверить, не устарел ли файл",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100000,
+            help="Размер пачки при чтении из базы",
+        )
+
+    def handle(self, *args, **options):
+        path = options["output"]
+
+        if options["check"]:
+            try:
+                header = read_header(path)
+                stale = is_stale(path)
+            except (OSError, ValueError) as e:
+                raise CommandError(str(e))
+            self.stdout.write(
+                f"{path}: {header['books']} книг, версия данных {header['marker']}"
+            )
+            if stale:
+                raise CommandError("Снимок устарел")
+            self.stdout.write(self.style.SUCCESS("Снимок актуален"))
+            return
+
+        started = time.perf_counter()
+        try:
+            marker, n_books = export_snapshot(path, chunk_size=options["chunk_size"])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Не удалось выгрузить снимок: {e}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Снимок записан в {path}: {n_books} книг, версия данных {marker} "
+                f"({time.perf_counter() - started:.2f} с)"
+            )
+        )
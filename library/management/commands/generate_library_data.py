@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.importers import NDJSON_TYPES
+from library.redistribution.synthetic import CAPACITY_DISTRIBUTIONS, generate
+
+# раздел → тип записи в NDJSON
+TYPES = {section: type_ for type_, section in NDJSON_TYPES.items()}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сгенерировать синтетических авторов, книги и библиотеки в NDJSON "
+        "(для load_initial_data --path ... и init_inventory)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=10000, help="Число книг")
+        parser.add_argument(
+            "--libraries", type=int, default=100, help="Число библиотек"
+        )
+        parser.add_argument(
+            "--capacity",
+            choices=CAPACITY_DISTRIBUTIONS,
+            default="skewed",
+            help="Распределение вместимости: uniform или skewed (тяжёлый хвост)",
+        )
+        parser.add_argument(
+            "--fill",
+            type=float,
+            default=0.8,
+            help="Доля занятых мест в сети (по умолчанию 0.8)",
+        )
+        parser.add_argument(
+            "--old-share",
+            type=float,
+            default=0.3,
+            help="Доля книг не новее года приоритета",
+        )
+        parser.add_argument("--districts", type=int, default=10, help="Число районов")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output",
+            type=str,
+            default="library/data/synthetic.ndjson",
+            help="Куда записать NDJSON",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            network = generate(
+                options["books"],
+                options["libraries"],
+                capacity=options["capacity"],
+                fill=options["fill"],
+                old_share=options["old_share"],
+                districts=options["districts"],
+                seed=options["seed"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        count = 0
+        with open(options["output"], "w", encoding="utf-8") as f:
+            for section, record in network.records():
+                f.write(
+                    json.dumps({"type": TYPES[section], **record}, ensure_ascii=False)
+                )
+                f.write("\n")
+                count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Записано {count} записей в {options['output']}")
+        )
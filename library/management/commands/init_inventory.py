@@ -1,13 +1,29 @@
-import random
-from collections import defaultdict
-from django.core.management.base import BaseCommand
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from library import counters, journal
 from library.models import Book, Library, LibraryBook
+from library.redistribution.placement import STRATEGIES, place
 
 
 class Command(BaseCommand):
     help = "Разместить книги по библиотекам и вывести первичное распределение"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--strategy",
+            choices=sorted(STRATEGIES),
+            default="first-fit",
+            help="Стратегия размещения (по умолчанию first-fit)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Сколько строк LibraryBook вставлять за один bulk_create",
+        )
+
     def _print_libraries_state(self, libraries, counts):
         self.stdout.write("\n=== Первичное распределение книг ===")
         total_books = sum(counts.values())
@@ -22,31 +38,46 @@ class Command(BaseCommand):
             )
 
     def handle(self, *args, **options):
-        # Загружаем библиотеки и книги из БД
+        # Загружаем библиотеки и id книг из БД
         libraries = list(Library.objects.all())
-        books = list(Book.objects.all())
+        book_ids = np.fromiter(
+            Book.objects.order_by("id").values_list("id", flat=True).iterator(),
+            dtype=np.int64,
+        )
 
-        # очищаем старые размещения
-        LibraryBook.objects.all().delete()
+        # размещение целиком считается в памяти: позиция библиотеки на каждую книгу
+        try:
+            positions = place(
+                options["strategy"], [lib.capacity for lib in libraries], len(book_ids)
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
 
-        # создаём словарь для подсчёта загрузки
-        # пока что 0 книг в каждой библиотеке
-        load = {lib.id: 0 for lib in libraries}
+        library_ids = np.array([lib.id for lib in libraries], dtype=np.int64)
+        placed = library_ids[positions]
 
-        # iter - перебор с ручным управление
-        lib_iter = iter(libraries)
-        current = next(lib_iter)
+        batch_size = options["batch_size"]
+        with journal.suspended(), transaction.atomic():
+            journal.invalidate()
+            # очищаем старые размещения
+            journal.clear(LibraryBook)
 
-        for book in books:
-            # если текущая библиотека переполнена — берём следующую
-            if load[current.id] >= current.capacity:
-                current = next(lib_iter)
+            for start in range(0, len(book_ids), batch_size):
+                stop = start + batch_size
+                LibraryBook.objects.bulk_create(
+                    [
+                        LibraryBook(library_id=lib_id, book_id=book_id)
+                        for lib_id, book_id in zip(
+                            placed[start:stop].tolist(), book_ids[start:stop].tolist()
+                        )
+                    ]
+                )
 
-            # размещаем книгу
-            LibraryBook.objects.create(library=current, book=book)
-            load[current.id] += 1
+            load = np.bincount(positions, minlength=len(libraries))
+            counts = dict(zip(library_ids.tolist(), load.tolist()))
+            counters.assign(counts, batch_size=batch_size)
 
         # вывод первичного распределения
-        self._print_libraries_state(libraries, load)
+        self._print_libraries_state(libraries, counts)
 
         self.stdout.write(self.style.SUCCESS("\nПервичное распределение завершено"))
@@ -1,76 +1,150 @@
-import json
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
-from library.models import Author, Book, Library
+from library import journal
+from library.importers import READERS, detect_format
+from library.models import Author, Book, Library, LibraryBook, LibraryState
+
+
+def _optional(value):
+    """Пустое значение из CSV/JSON → None."""
+    return None if value in ("", None) else value
+
+
+BUILDERS = {
+    "authors": lambda r: Author(
+        id=r["id"],
+        full_name=r["full_name"],
+        birth_date=r["birth_date"],
+    ),
+    "books": lambda r: Book(
+        id=r["id"],
+        title=r["title"],
+        year=r["year"],
+        author_id=r["author_id"],
+    ),
+    "libraries": lambda r: Library(
+        id=r["id"],
+        name=r["name"],
+        capacity=r["capacity"],
+        district=r.get("district") or "",
+        latitude=_optional(r.get("latitude")),
+        longitude=_optional(r.get("longitude")),
+    ),
+}
+
+MODELS = {"authors": Author, "books": Book, "libraries": Library}
+
+TITLES = {
+    "authors": "Создаём авторов...",
+    "books": "Создаём книги...",
+    "libraries": "Создаём библиотеки...",
+}
 
 
 class Command(BaseCommand):
-    help = "Загрузить авторов, книги и библиотеки из JSON"
+    help = "Загрузить авторов, книги и библиотеки из JSON, NDJSON или CSV"
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--path",
             type=str,
             default="library/data/initial_data.json",
-            help="Путь до JSON файла",
+            help="Путь до JSON/NDJSON файла или каталога с CSV",
         )
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            default=None,
+            help="Формат данных (по умолчанию — по расширению файла)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Сколько строк вставлять за один bulk_create",
+        )
+
+    @contextmanager
+    def _fast_sqlite(self):
+        """
+        На время импорта SQLite пишет журнал в память и не ждёт fsync.
+        Прежние значения PRAGMA восстанавливаются.
+        """
+        if connection.vendor != "sqlite":
+            yield
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+            cursor.execute("PRAGMA synchronous")
+            synchronous = cursor.fetchone()[0]
+
+            cursor.execute("PRAGMA journal_mode=MEMORY")
+            cursor.execute("PRAGMA synchronous=OFF")
+
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+                cursor.execute(f"PRAGMA synchronous={synchronous}")
+
+    def _load(self, records, batch_size):
+        journal.clear(LibraryBook, LibraryState, Book, Author, Library)
+
+        buffers = {section: [] for section in MODELS}
+        counts = {section: 0 for section in MODELS}
+        started = time.perf_counter()
+
+        def flush(section):
+            rows = buffers[section]
+            if not rows:
+                return
+            MODELS[section].objects.bulk_create(rows, batch_size=batch_size)
+            counts[section] += len(rows)
+            buffers[section] = []
+
+            total = sum(counts.values())
+            rate = total / max(time.perf_counter() - started, 1e-9)
+            self.stdout.write(
+                f"  {section}: {counts[section]} строк, всего {total} ({rate:.0f} строк/с)"
+            )
+
+        for section, record in records:
+            if not counts[section] and not buffers[section]:
+                self.stdout.write(TITLES[section])
+
+            buffers[section].append(BUILDERS[section](record))
+            if len(buffers[section]) >= batch_size:
+                flush(section)
+
+        for section in MODELS:
+            flush(section)
 
-    @transaction.atomic
     def handle(self, *args, **options):
         path = Path(options["path"])
         if not path.exists():
             self.stderr.write(self.style.ERROR(f"Файл {path} не найден"))
             return
 
-        with path.open(encoding="utf-8") as f:
-            data = json.load(f)
-
-        authors = data["authors"]
-        books = data["books"]
-        libraries = data["libraries"]
-
-        self.stdout.write("Создаём авторов...")
-        Author.objects.all().delete()
-        Book.objects.all().delete()
-        Library.objects.all().delete()
-
-        Author.objects.bulk_create(
-            [
-                Author(
-                    id=a["id"],
-                    full_name=a["full_name"],
-                    birth_date=a["birth_date"],
-                )
-                for a in authors
-            ]
-        )
-
-        self.stdout.write("Создаём книги...")
-        Book.objects.bulk_create(
-            [
-                Book(
-                    id=b["id"],
-                    title=b["title"],
-                    year=b["year"],
-                    author_id=b["author_id"],
-                )
-                for b in books
-            ]
-        )
+        fmt = options["format"] or detect_format(path)
+        records = READERS[fmt](path)
 
-        self.stdout.write("Создаём библиотеки...")
-        Library.objects.bulk_create(
-            [
-                Library(
-                    id=l["id"],
-                    name=l["name"],
-                    capacity=l["capacity"],
-                )
-                for l in libraries
-            ]
-        )
+        try:
+            with self._fast_sqlite(), journal.suspended():
+                with transaction.atomic():
+                    journal.invalidate()
+                    self._load(records, options["batch_size"])
+        except ValueError as e:
+            # битый файл: транзакция откатилась, база как была
+            raise CommandError(f"Не удалось загрузить {path}: {e}")
+        except KeyError as e:
+            raise CommandError(f"Не удалось загрузить {path}: в записи нет поля {e}")
 
         self.stdout.write(self.style.SUCCESS("Данные успешно загружены"))
@@ -0,0 +1,93 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library import jobs
+from library.models import RebalanceJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Фоновые задания перераспределения: submit — поставить в очередь, "
+        "status — прогресс, cancel — отменить, resume — продолжить с "
+        "последней применённой пачки. Выполняет задания rebalance_worker."
+    )
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest="action", required=True)
+
+        submit = actions.add_parser("submit", help="Поставить задание в очередь")
+        submit.add_argument(
+            "--planner", choices=sorted(jobs.PLANNERS), default="priority"
+        )
+        submit.add_argument("--backend", choices=jobs.BACKENDS, default="objects")
+        submit.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Книг в пачке плана — и в одной транзакции",
+        )
+
+        status = actions.add_parser("status", help="Прогресс заданий")
+        status.add_argument("job_id", type=int, nargs="?", default=None)
+        status.add_argument("--json", action="store_true", help="Вывод в JSON")
+        status.add_argument(
+            "--limit", type=int, default=10, help="Сколько последних заданий показать"
+        )
+
+        for name, text in (
+            ("cancel", "Отменить задание"),
+            ("resume", "Вернуть отменённое или упавшее задание в очередь"),
+        ):
+            actions.add_parser(name, help=text).add_argument("job_id", type=int)
+
+    def _print_job(self, job):
+        data = jobs.progress(job)
+        line = (
+            f"#{data['id']:<5} {data['status']:10} "
+            f"{data['applied_chunks']}/{data['total_chunks']} пачек  "
+            f"{data['applied_moves']}/{data['total_moves']} книг  "
+            f"({data['percent']:5.1f}%)"
+        )
+        if data["skipped_moves"]:
+            line += f"  пропущено {data['skipped_moves']}"
+        if data["cancel_requested"]:
+            line += "  отмена запрошена"
+        self.stdout.write(line)
+        if data["error"]:
+            self.stdout.write(self.style.ERROR(f"       {data['error']}"))
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        try:
+            if action == "submit":
+                job = jobs.submit(
+                    planner=options["planner"],
+                    backend=options["backend"],
+                    chunk_size=options["chunk_size"],
+                )
+                self.stdout.write(self.style.SUCCESS(f"Задание #{job.pk} в очереди"))
+            elif action == "cancel":
+                self._print_job(jobs.cancel(options["job_id"]))
+            elif action == "resume":
+                self._print_job(jobs.resume(options["job_id"]))
+            else:
+                self._status(options)
+        except RebalanceJob.DoesNotExist:
+            raise CommandError(f"Задания #{options['job_id']} нет")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+    def _status(self, options):
+        if options["job_id"] is not None:
+            selected = [RebalanceJob.objects.get(pk=options["job_id"])]
+        else:
+            selected = RebalanceJob.objects.order_by("-pk")[: options["limit"]]
+
+        if options["json"]:
+            self.stdout.write(
+                json.dumps([jobs.progress(job) for job in selected], indent=2)
+            )
+            return
+        for job in selected:
+            self._print_job(job)
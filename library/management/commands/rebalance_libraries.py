@@ -1,17 +1,164 @@
+import cProfile
+import io
+import json
+import pstats
 from collections import defaultdict
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from contextlib import ExitStack
+from functools import partial
 
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from library import counters, jobs, journal
 from library.models import Library, LibraryBook
+from library.persist import persist_delta, persist_rebuild
+from library.redistribution.apportion import target_loads
+from library.redistribution.arrays import ArrayInventory, ArrayRedistributionManager
+from library.redistribution.budget import BudgetedPlanner
 from library.redistribution.capacity import CapacityAwareRedistributionManager
+from library.redistribution.hierarchical import HierarchicalRebalancer
+from library.redistribution.export import FORMATS, guess_format, write_plan
+from library.redistribution.instrument import Instrumentation
+from library.redistribution.mincost import (
+    MinCostRedistributionManager,
+    missing_coordinates,
+)
+from library.redistribution.move import Plan
+from library.redistribution.policies import Policy, PolicyRedistributionManager
 from library.redistribution.priority import PriorityRedistributionManager
+from library.redistribution.orm import (
+    StaleSnapshot,
+    book_titles,
+    iter_inventory_rows,
+    iter_leaving_rows,
+    library_names,
+    open_snapshot,
+)
+from library.redistribution.records import residual_view
+from library.redistribution.sharded import ShardedRebalancer
 
 
 class Command(BaseCommand):
-    help = "Полное перераспределение книг между библиотеками (вариант A): пересборка таблицы LibraryBook."
+    help = (
+        "Перераспределение книг между библиотеками. "
+        "Вариант A (rebuild): пересборка таблицы LibraryBook. "
+        "Вариант B (delta): обновление только перемещённых книг."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--persist",
+            choices=["delta", "rebuild"],
+            default="delta",
+            help="Способ сохранения результата (по умолчанию delta)",
+        )
+        parser.add_argument(
+            "--backend",
+            choices=["objects", "arrays"],
+            default="objects",
+            help="objects — менеджеры на объектах, arrays — векторизованный NumPy-бэкенд",
+        )
+        parser.add_argument(
+            "--planner",
+            choices=["priority", "mincost", "policy"],
+            default="priority",
+            help="priority — жадный план с приоритетами, mincost — минимум расстояния перевозок, "
+            "policy — выбор книг по правилам --policy",
+        )
+        parser.add_argument(
+            "--policy",
+            action="append",
+            default=[],
+            metavar="RULE",
+            help="Правило для --planner policy, можно несколько: newest:year=1950, "
+            "spread-authors:weight=2, duplicates:weight=5, keep-era:year=1950,minimum=3",
+        )
+        parser.add_argument(
+            "--sharded",
+            action="store_true",
+            help="Планировать районы (Library.district) параллельно в пуле процессов",
+        )
+        parser.add_argument(
+            "--hierarchical",
+            action="store_true",
+            help="Сначала балансировать районы как целое, затем библиотеки "
+            "внутри района: менеджер видит только один район",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Число процессов для --sharded (по умолчанию — число ядер)",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Планировать по снимку прошлого запуска и журналу изменений, "
+            "читая книги только библиотек-доноров",
+        )
+        parser.add_argument(
+            "--snapshot",
+            type=str,
+            default=None,
+            help="Брать инвентарь из файла снимка (export_snapshot) через mmap; "
+            "устаревший снимок — ошибка",
+        )
+        parser.add_argument(
+            "--max-moves",
+            type=int,
+            default=None,
+            help="Бюджет: не больше N переносов, сначала самые полезные; "
+            "повторные запуски доводят сеть до тех же целей",
+        )
+        parser.add_argument(
+            "--max-cost",
+            type=float,
+            default=None,
+            help="Бюджет: суммарное расстояние перевозок, км",
+        )
+        parser.add_argument(
+            "--export",
+            type=str,
+            default=None,
+            help="Выгрузить план по маршрутам с названиями книг и библиотек "
+            "(.csv, .ndjson, .clplan — колоночный файл)",
+        )
+        parser.add_argument(
+            "--export-format",
+            choices=sorted(FORMATS),
+            default=None,
+            help="Формат --export, если не по расширению файла",
+        )
+        parser.add_argument(
+            "--report",
+            type=str,
+            default=None,
+            help="JSON-отчёт о прогоне: фазы, проходы, хуки, SQL, память "
+            "(путь к файлу или - для вывода в консоль)",
+        )
+        parser.add_argument(
+            "--profile",
+            type=str,
+            default=None,
+            help="Записать cProfile прогона в файл (формат pstats)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Размер пачки при потоковом чтении инвентаря",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Размер пачки для bulk_update / bulk_create",
+        )
 
     def _print_state(self, libraries, load, title="Состояние"):
         total = sum(load.values())
+        # те же цели, что использует планировщик
+        target = target_loads(libraries, total)
         self.stdout.write(f"\n=== {title} ===")
         self.stdout.write(f"Всего книг в системе: {total}\n")
 
@@ -21,48 +168,400 @@ class Command(BaseCommand):
             percent = (count / capacity * 100) if capacity > 0 else 0
 
             self.stdout.write(
-                f"{lib.name:30} {count:3d}/{capacity:3d}  " f"({percent:5.1f}%)"
+                f"{lib.name:30} {count:3d}/{capacity:3d}  "
+                f"({percent:5.1f}%)  цель {target[lib.id]:3d}"
+            )
+
+    def _run_planner(self, mgr):
+        """Полный план менеджера или, с --max-moves / --max-cost, ограниченный."""
+        mgr = self.instrumentation.instrument(mgr)
+        if self.budget_options is None:
+            return mgr.plan()
+        self.budget = BudgetedPlanner(mgr, **self.budget_options)
+        return self.budget.plan()
+
+    def _print_budget(self):
+        budget = self.budget
+        reasons = {
+            "balanced": "дисбаланс закрыт",
+            "moves": "исчерпан лимит переносов",
+            "cost": "исчерпан бюджет стоимости",
+        }
+        self.stdout.write(
+            f"\nБюджет: {budget.moves} переносов, {budget.cost:.1f} км — "
+            f"{reasons[budget.stopped]}"
+        )
+        for title, state in (("до", budget.before), ("после", budget.after)):
+            self.stdout.write(
+                f"Отклонение {title}: осталось переносов {state['moves_left']}, "
+                f"максимум {state['max']}, СКО {state['rms']}"
+            )
+        if not budget.complete:
+            self.stdout.write("Следующий запуск продолжит с этого состояния")
+        self.instrumentation.count("moves_left", budget.after["moves_left"])
+
+    def _export(self, plan, options):
+        with self.instrumentation.phase("export"):
+            exported = write_plan(
+                plan,
+                options["export"],
+                library_names(),
+                book_titles,
+                fmt=options["export_format"],
+                chunk_size=options["chunk_size"],
+            )
+        self.stdout.write(f"План выгружен в {options['export']}: {exported} книг")
+
+    def _plan_objects(self, libraries, inventory, manager_class):
+        with self.instrumentation.phase("load_inventory"):
+            mgr = manager_class(libraries, inventory)
+        load_before = dict(mgr.load)
+
+        with self.instrumentation.phase("plan"):
+            plan = self._run_planner(mgr)
+        self.instrumentation.collect(mgr)
+
+        placements = (
+            (lib_id, book.id)
+            for lib_id, books in mgr.books_by_library.items()
+            for book in books
+        )
+        return load_before, dict(mgr.load), placements, plan
+
+    def _plan_sharded(self, libraries, inventory, manager_class, workers):
+        with self.instrumentation.phase("load_inventory"):
+            mgr = ShardedRebalancer(
+                libraries, inventory, manager_class=manager_class, max_workers=workers
             )
+        load_before = {
+            lib_id: len(rows) for lib_id, rows in mgr.rows_by_library.items()
+        }
+
+        with self.instrumentation.phase("plan"):
+            plan = mgr.plan()
+        # менеджеры шардов работают в других процессах: их хуки не видны
+        self.instrumentation.hooks_measured = False
+        self.instrumentation.collect(mgr)
+
+        destination = {
+            book_id: lib_id
+            for lib_id, book_ids in plan.books_by_destination().items()
+            for book_id in book_ids
+        }
+        placements = (
+            (destination.get(book_id, lib_id), book_id)
+            for rows in mgr.rows_by_library.values()
+            for book_id, lib_id, _ in rows
+        )
+        return load_before, dict(mgr.load), placements, plan
+
+    def _plan_hierarchical(self, libraries, inventory, manager_class):
+        with self.instrumentation.phase("load_inventory"):
+            mgr = HierarchicalRebalancer(
+                libraries,
+                inventory,
+                manager_class=manager_class,
+                prepare=self.instrumentation.instrument,
+            )
+        load_before = mgr.initial_loads()
+
+        with self.instrumentation.phase("plan"):
+            plan = mgr.plan()
+        for region_mgr in mgr.managers.values():
+            self.instrumentation.collect(region_mgr)
+        self.instrumentation.count("regions", len(mgr.regions))
+        self.instrumentation.count("cross_region_moves", mgr.cross_region_moves)
+
+        placements = (
+            (lib_id, book.id)
+            for lib_id, books in mgr.books_by_library.items()
+            for book in books
+        )
+        return load_before, dict(mgr.load), placements, plan
+
+    def _plan_incremental(
+        self, libraries, load, manager_class, chunk_size, details=False
+    ):
+        """
+        Текущая загрузка известна из снимка и журнала. Менеджер получает
+        только несбалансированную часть сети: доноров с их книгами и
+        получателей без книг, поэтому план совпадает с полным запуском.
+        Если менеджер заранее знает, какие книги отдаст донор (leaving),
+        читается только избыток донора — O(изменений), а не O(книг доноров).
+        """
+        target = target_loads(libraries, sum(load.values()))
+        # functools.partial (планировщик policy) — класс в .func
+        planner = getattr(manager_class, "func", manager_class)
+        leaving = planner.leaving
+        view, view_target, donor_ids = residual_view(
+            libraries, load, target, surplus_only=leaving is not None
+        )
+
+        if not donor_ids:
+            inventory = ()
+        elif leaving is not None:
+            inventory = iter_leaving_rows(
+                {lib_id: load[lib_id] - target[lib_id] for lib_id in donor_ids},
+                planner,
+            )
+        else:
+            inventory = iter_inventory_rows(
+                chunk_size=chunk_size, library_ids=donor_ids, details=details
+            )
+        with self.instrumentation.phase("load_inventory"):
+            mgr = manager_class(view, inventory, target_load=view_target)
+        with self.instrumentation.phase("plan"):
+            plan = self._run_planner(mgr)
+        self.instrumentation.collect(mgr)
+
+        load_after = dict(load)
+        for route in plan.routes():
+            load_after[route.from_library_id] -= route.quantity
+            load_after[route.to_library_id] += route.quantity
+        return load, load_after, None, plan
+
+    def _plan_arrays(self, libraries, inventory, snapshot=None):
+        with self.instrumentation.phase("load_inventory"):
+            inv = (
+                ArrayInventory.from_rows(libraries, inventory)
+                if snapshot is None
+                else ArrayInventory.from_snapshot(snapshot)
+            )
+        load_before = inv.load_by_library()
+
+        mgr = ArrayRedistributionManager(
+            inv, priority_year=PriorityRedistributionManager.PRIORITY_YEAR
+        )
+        with self.instrumentation.phase("plan"):
+            plan = mgr.rebalance()
+
+        placements = zip(inv.library_ids[inv.library].tolist(), inv.book_id.tolist())
+        return load_before, inv.load_by_library(), placements, plan
 
     def handle(self, *args, **options):
+        # хуки и SQL считаются только по запросу отчёта или профиля
+        self.instrumentation = Instrumentation(
+            enabled=bool(options["report"] or options["profile"])
+        )
+        profiler = cProfile.Profile() if options["profile"] else None
+
+        with ExitStack() as stack:
+            if self.instrumentation.enabled:
+                stack.enter_context(
+                    connection.execute_wrapper(self.instrumentation.query_wrapper)
+                )
+            if profiler is not None:
+                profiler.enable()
+                stack.callback(profiler.disable)
+
+            self._rebalance(options)
+
+        if profiler is not None:
+            profiler.dump_stats(options["profile"])
+            self.stdout.write(f"\nПрофиль записан в {options['profile']}")
+            buffer = io.StringIO()
+            stats = pstats.Stats(profiler, stream=buffer)
+            stats.sort_stats("cumulative").print_stats(15)
+            self.stdout.write(buffer.getvalue())
+
+        if options["report"]:
+            report = json.dumps(self.instrumentation.report(), indent=2)
+            if options["report"] == "-":
+                self.stdout.write(report)
+            else:
+                with open(options["report"], "w", encoding="utf-8") as f:
+                    f.write(report)
+                self.stdout.write(f"Отчёт записан в {options['report']}")
+
+    def _rebalance(self, options):
         self.stdout.write("Загрузка библиотек и инвентаря...")
 
-        libraries = list(Library.objects.all())
-        inventory = list(LibraryBook.objects.select_related("book", "library"))
+        with self.instrumentation.phase("load_libraries"):
+            libraries = list(Library.objects.all())
+        # изменения журнала после этой отметки войдут уже в следующий запуск
+        last_id = journal.last_change_id()
+        # Кортежи (book_id, library_id, year) вместо трёх моделей на книгу
+        inventory = iter_inventory_rows(chunk_size=options["chunk_size"])
+        snapshot = None
+        if options["snapshot"]:
+            # отметка снимка совпадает с версией данных — он описывает
+            # ровно то, что сейчас в базе
+            with self.instrumentation.phase("open_snapshot"):
+                try:
+                    snapshot = open_snapshot(options["snapshot"])
+                except (OSError, ValueError, StaleSnapshot) as e:
+                    raise CommandError(str(e))
+            inventory = snapshot.rows()
 
-        # Загружаем текущую загрузку
-        load_before = defaultdict(int)
-        for lb in inventory:
-            load_before[lb.library_id] += 1
+        if options["export"] and options["export_format"] is None:
+            try:
+                guess_format(options["export"])
+            except ValueError as e:
+                raise CommandError(str(e))
 
-        # Вывод состояния ДО
-        self._print_state(libraries, load_before, "ДО перераспределения")
+        self.budget_options = self.budget = None
+        if options["max_moves"] is not None or options["max_cost"] is not None:
+            if (
+                options["sharded"]
+                or options["hierarchical"]
+                or options["backend"] != "objects"
+            ):
+                raise CommandError(
+                    "--max-moves / --max-cost работают только с --backend objects "
+                    "без --sharded и --hierarchical"
+                )
+            if (options["max_moves"] or 0) < 0 or (options["max_cost"] or 0) < 0:
+                raise CommandError("Бюджет не может быть отрицательным")
+            self.budget_options = {
+                "max_moves": options["max_moves"],
+                "max_cost": options["max_cost"],
+            }
+
+        details = False
+        if options["planner"] == "policy":
+            try:
+                policy = Policy.parse(options["policy"]) if options["policy"] else None
+            except ValueError as e:
+                raise CommandError(f"--policy: {e}")
+            if (
+                options["sharded"]
+                or options["hierarchical"]
+                or options["backend"] != "objects"
+                or options["snapshot"]
+            ):
+                raise CommandError(
+                    "--planner policy работает только с --backend objects "
+                    "без --sharded, --hierarchical и --snapshot"
+                )
+            manager_class = partial(PolicyRedistributionManager, policy=policy)
+            # автор и название читаются, только если их требуют правила
+            details = policy is not None and policy.needs_details
+            inventory = iter_inventory_rows(
+                chunk_size=options["chunk_size"], details=details
+            )
+        elif options["policy"]:
+            raise CommandError("--policy задаётся вместе с --planner policy")
+        elif options["planner"] == "mincost":
+            manager_class = MinCostRedistributionManager
+        else:
+            manager_class = PriorityRedistributionManager
 
-        # Менеджер перераспределения
-        mgr = PriorityRedistributionManager(libraries, inventory)
+        if options["planner"] == "mincost" or options["max_cost"] is not None:
+            # без координат расстояний нет: план по нулевым ценам бессмыслен
+            missing = missing_coordinates(libraries)
+            if missing:
+                names = ", ".join(lib.name for lib in missing[:5])
+                more = f" и ещё {len(missing) - 5}" if len(missing) > 5 else ""
+                raise CommandError(
+                    "--planner mincost и --max-cost считают расстояния, "
+                    f"а у библиотек нет координат: {names}{more}"
+                )
 
-        # Выполняем перераспределение (создаёт локальное новое состояние)
-        mgr.rebalance()
+        if options["backend"] == "arrays" and options["planner"] != "priority":
+            # векторизованный бэкенд строит только план priority
+            raise CommandError("--backend arrays работает только с --planner priority")
 
-        # Теперь mgr.books_by_library содержит правильное распределение
-        self.stdout.write("\nПерестраиваем таблицу LibraryBook...")
+        if options["sharded"] and options["backend"] != "objects":
+            raise CommandError("--sharded работает только с --backend objects")
 
-        # Полная пересборка таблицы
-        with transaction.atomic():
-            LibraryBook.objects.all().delete()
+        if options["hierarchical"] and (
+            options["sharded"] or options["backend"] != "objects"
+        ):
+            raise CommandError(
+                "--hierarchical работает только с --backend objects без --sharded"
+            )
+
+        load = None
+        if options["incremental"]:
+            if (
+                options["sharded"]
+                or options["hierarchical"]
+                or options["backend"] != "objects"
+                or options["persist"] != "delta"
+            ):
+                raise CommandError(
+                    "--incremental работает только с --backend objects и --persist delta "
+                    "без --sharded и --hierarchical"
+                )
+            with self.instrumentation.phase("journal"):
+                load = journal.current_load(libraries, last_id)
+            if load is None:
+                self.stdout.write("Снимка нет или он устарел — полный пересчёт")
+
+        # Счётчики Library.load показывают, что сеть уже сбалансирована:
+        # инвентарь не читаем, план пустой
+        with self.instrumentation.phase("check_counters"):
+            current = counters.loads(libraries)
+            total = sum(current.values())
+            target = target_loads(libraries, total)
+            balanced = current == target and total == LibraryBook.objects.count()
+        if balanced:
+            self._print_state(libraries, current, "Сеть уже сбалансирована")
+            journal.save_snapshot(current, target, last_id)
+            if options["export"]:
+                # пустой план — чтобы логистика не взяла прошлый файл
+                self._export(Plan(), options)
+            return
+
+        # Выполняем перераспределение (создаёт локальное новое состояние).
+        # Загрузку ДО и ПОСЛЕ менеджер считает сам — повторно таблицу не читаем.
+        if load is not None:
+            plan = self._plan_incremental(
+                libraries, load, manager_class, options["chunk_size"], details
+            )
+        elif options["sharded"]:
+            plan = self._plan_sharded(
+                libraries, inventory, manager_class, options["workers"]
+            )
+        elif options["hierarchical"]:
+            plan = self._plan_hierarchical(libraries, inventory, manager_class)
+        elif options["backend"] == "arrays":
+            plan = self._plan_arrays(libraries, inventory, snapshot)
+        else:
+            plan = self._plan_objects(libraries, inventory, manager_class)
+        load_before, load_after, placements, plan = plan
 
-            new_records = []
-            for lib_id, books in mgr.books_by_library.items():
-                for book in books:
-                    new_records.append(LibraryBook(library_id=lib_id, book_id=book.id))
+        # Вывод состояния ДО
+        self._print_state(libraries, load_before, "ДО перераспределения")
+
+        routes = sum(1 for _ in plan.routes())
+        self.stdout.write(f"\nПереносов: {len(plan)}, маршрутов: {routes}")
+        self.instrumentation.count("moves", len(plan))
+        self.instrumentation.count("routes", routes)
+        if self.budget is not None:
+            self._print_budget()
 
-            LibraryBook.objects.bulk_create(new_records)
+        # выгрузка до записи в базу: если она не удалась, сеть не тронута
+        if options["export"]:
+            self._export(plan, options)
 
-        # Загружаем новое распределение
-        new_inventory = list(LibraryBook.objects.all())
-        load_after = defaultdict(int)
-        for lb in new_inventory:
-            load_after[lb.library_id] += 1
+        batch_size = options["batch_size"]
+        if options["persist"] == "rebuild":
+            self.stdout.write("\nПерестраиваем таблицу LibraryBook...")
+            load_after = {lib.id: load_after.get(lib.id, 0) for lib in libraries}
+            with self.instrumentation.phase("persist"):
+                persist_rebuild(placements, load_after, batch_size)
+        else:
+            self.stdout.write("\nСохраняем перемещения...")
+            with self.instrumentation.phase("persist"):
+                updated = persist_delta(plan, batch_size)
+            self.stdout.write(f"Обновлено записей: {updated}")
+
+        # последний план — для GET /api/plan/
+        if len(plan):
+            with self.instrumentation.phase("record_plan"):
+                jobs.record_plan(
+                    plan,
+                    planner=options["planner"],
+                    backend=options["backend"],
+                    chunk_size=batch_size,
+                )
+
+        # снимок для следующего --incremental
+        with self.instrumentation.phase("snapshot"):
+            journal.save_snapshot(
+                load_after, target_loads(libraries, sum(load_after.values())), last_id
+            )
 
         # Вывод состояния ПОСЛЕ
         self._print_state(libraries, load_after, "ПОСЛЕ перераспределения")
@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Локальный обработчик заданий перераспределения: берёт задания "
+        "из таблицы RebalanceJob, брокер не нужен. Брошенные упавшим "
+        "процессом задания продолжаются с последней применённой пачки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить задания из очереди и завершиться",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=2.0,
+            help="Пауза между опросами очереди, секунды",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=300,
+            help="Задание без heartbeat дольше стольких секунд считается брошенным "
+            f"(больше {jobs.HEARTBEAT_INTERVAL})",
+        )
+
+    def _on_chunk(self, job, chunk, moved):
+        self.stdout.write(
+            f"#{job.pk} пачка {chunk.index + 1}/{job.total_chunks}: "
+            f"{chunk.from_library_id} → {chunk.to_library_id}, "
+            f"перенесено {moved}/{chunk.quantity}"
+        )
+
+    def handle(self, *args, **options):
+        if options["stale_after"] <= jobs.HEARTBEAT_INTERVAL:
+            # иначе задание заберут, пока план ещё строится
+            raise CommandError(
+                f"--stale-after должен быть больше {jobs.HEARTBEAT_INTERVAL} с"
+            )
+        worker = jobs.worker_name()
+        self.stdout.write(f"Обработчик {worker} запущен")
+
+        while True:
+            job = jobs.claim(worker, stale_after=options["stale_after"])
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll"])
+                continue
+
+            self.stdout.write(f"Задание #{job.pk}: {job.planner}/{job.backend}")
+            try:
+                job = jobs.run(job, on_chunk=self._on_chunk)
+            except KeyboardInterrupt:
+                # применённые пачки остаются, задание — снова в очереди
+                jobs.release(job)
+                self.stdout.write(f"Остановлен, задание #{job.pk} вернулось в очередь")
+                return
+            except Exception as e:
+                self.stderr.write(f"Задание #{job.pk} упало: {e}")
+                continue
+
+            if job.worker != worker:
+                self.stderr.write(f"Задание #{job.pk} забрал {job.worker}")
+                continue
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Задание #{job.pk}: {job.status}, "
+                    f"перенесено {job.applied_moves}/{job.total_moves}"
+                )
+            )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from library import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверить счётчики Library.load с таблицей LibraryBook и исправить расхождения"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать расхождения, ничего не менять",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = counters.drift()
+
+            for library_id, (load, actual) in sorted(drift.items()):
+                self.stdout.write(
+                    f"Библиотека {library_id}: счётчик {load}, фактически {actual}"
+                )
+
+            if not drift:
+                self.stdout.write(self.style.SUCCESS("Счётчики совпадают"))
+                return
+
+            if options["dry_run"]:
+                self.stdout.write(f"Расхождений: {len(drift)}")
+                return
+
+            counters.assign({lib_id: actual for lib_id, (_, actual) in drift.items()})
+
+        self.stdout.write(self.style.SUCCESS(f"Исправлено счётчиков: {len(drift)}"))
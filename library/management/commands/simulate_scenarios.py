@@ -0,0 +1,142 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.redistribution.orm import (
+    StaleSnapshot,
+    inventory_snapshot,
+    open_snapshot,
+)
+from library.redistribution.scenarios import MANAGERS, Scenario, simulate
+
+
+class Command(BaseCommand):
+    help = (
+        "Сценарии «что если» без изменения базы: уменьшение вместимости "
+        "и закрытие библиотек. Все сценарии считаются по одному снимку инвентаря."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenarios",
+            type=str,
+            default=None,
+            help='JSON-список сценариев: [{"name": ..., "capacity": {"3": 0.6}, '
+            '"close": [5]}, ...]',
+        )
+        parser.add_argument(
+            "--close-each",
+            action="store_true",
+            help="Добавить по сценарию закрытия на каждую библиотеку",
+        )
+        parser.add_argument(
+            "--shrink-each",
+            type=float,
+            default=None,
+            help="Добавить по сценарию на каждую библиотеку: вместимость × доля",
+        )
+        parser.add_argument(
+            "--manager",
+            choices=list(MANAGERS),
+            default="arrays",
+            help="Чем планировать (по умолчанию векторизованный бэкенд arrays)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Число процессов (по умолчанию — число ядер, 1 — без пула)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Размер пачки при чтении инвентаря",
+        )
+        parser.add_argument(
+            "--snapshot",
+            type=str,
+            default=None,
+            help="Файл снимка (export_snapshot) вместо чтения инвентаря из базы",
+        )
+        parser.add_argument(
+            "--allow-stale",
+            action="store_true",
+            help="Считать и по устаревшему снимку",
+        )
+        parser.add_argument(
+            "--output", type=str, default=None, help="Куда записать результаты в JSON"
+        )
+
+    def _scenarios(self, options, libraries):
+        scenarios = [Scenario("без изменений")]
+
+        if options["scenarios"]:
+            try:
+                with open(options["scenarios"], encoding="utf-8") as f:
+                    scenarios += [Scenario.from_dict(item) for item in json.load(f)]
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Не удалось прочитать сценарии: {e}")
+
+        if options["close_each"]:
+            scenarios += [
+                Scenario(f"закрыть {lib.id}", closed=(lib.id,)) for lib in libraries
+            ]
+
+        factor = options["shrink_each"]
+        if factor is not None:
+            scenarios += [
+                Scenario(f"{lib.id}: вместимость × {factor}", capacity={lib.id: factor})
+                for lib in libraries
+            ]
+
+        return scenarios
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["snapshot"]:
+            try:
+                snapshot = open_snapshot(
+                    options["snapshot"], allow_stale=options["allow_stale"]
+                )
+            except (OSError, ValueError, StaleSnapshot) as e:
+                raise CommandError(str(e))
+        else:
+            snapshot = inventory_snapshot(chunk_size=options["chunk_size"])
+        loaded = time.perf_counter() - started
+
+        scenarios = self._scenarios(options, snapshot.libraries)
+        self.stdout.write(
+            f"Снимок: {len(snapshot.libraries)} библиотек, {len(snapshot)} книг "
+            f"({loaded:.2f} с). Сценариев: {len(scenarios)}"
+        )
+
+        started = time.perf_counter()
+        results = simulate(
+            snapshot,
+            scenarios,
+            manager=options["manager"],
+            max_workers=options["workers"],
+        )
+        elapsed = time.perf_counter() - started
+
+        for result in results:
+            km = result["transfer_km"]
+            # None — у библиотек маршрута нет координат
+            km = "?" if km is None else f"{km:.1f}"
+            self.stdout.write(
+                f"{result['name'][:40]:40} переносов {result['moves']:>8}  "
+                f"не размещено {result['unplaced']:>6}  "
+                f"загрузка max {result['utilisation_max'] or 0:6.1%}  "
+                f"перевозки {km:>12} км"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результаты записаны в {options['output']}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"\nСценариев: {len(results)} за {elapsed:.2f} с")
+        )
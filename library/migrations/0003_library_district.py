@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0002_remove_librarybook_quantity_alter_book_author_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="library",
+            name="district",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+    ]
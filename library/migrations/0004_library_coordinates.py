@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0003_library_district"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="library",
+            name="latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="library",
+            name="longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0004_library_coordinates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventoryChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("book_added", "Книга добавлена"),
+                            ("book_removed", "Книга убрана"),
+                            ("library_added", "Библиотека добавлена"),
+                            ("library_removed", "Библиотека удалена"),
+                            ("capacity", "Изменена вместимость"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("library_id", models.BigIntegerField()),
+                ("delta", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="LibraryState",
+            fields=[
+                (
+                    "library",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="state",
+                        serialize=False,
+                        to="library.library",
+                    ),
+                ),
+                ("load", models.PositiveIntegerField()),
+                ("target", models.PositiveIntegerField()),
+            ],
+        ),
+    ]
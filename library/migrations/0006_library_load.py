@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:50
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_load(apps, schema_editor):
+    Library = apps.get_model("library", "Library")
+    LibraryBook = apps.get_model("library", "LibraryBook")
+
+    counts = (
+        LibraryBook.objects.filter(library=OuterRef("pk"))
+        .order_by()
+        .values("library")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Library.objects.update(load=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0005_rebalance_journal"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="library",
+            name="load",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_load, migrations.RunPython.noop),
+    ]
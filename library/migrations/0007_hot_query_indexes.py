@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0006_library_load"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="librarybook",
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name="librarybook",
+            name="library",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="books",
+                to="library.library",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="librarybook",
+            index=models.Index(
+                fields=["library", "book"], name="librarybook_library_book"
+            ),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0007_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RebalanceJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "В очереди"),
+                            ("planning", "Строится план"),
+                            ("applying", "Применяется"),
+                            ("done", "Завершено"),
+                            ("failed", "Ошибка"),
+                            ("cancelled", "Отменено"),
+                        ],
+                        db_index=True,
+                        default="queued",
+                        max_length=20,
+                    ),
+                ),
+                ("planner", models.CharField(default="priority", max_length=20)),
+                ("backend", models.CharField(default="objects", max_length=20)),
+                ("chunk_size", models.PositiveIntegerField(default=1000)),
+                ("planned", models.BooleanField(default=False)),
+                ("total_moves", models.PositiveIntegerField(default=0)),
+                ("applied_moves", models.PositiveIntegerField(default=0)),
+                ("skipped_moves", models.PositiveIntegerField(default=0)),
+                ("total_chunks", models.PositiveIntegerField(default=0)),
+                ("applied_chunks", models.PositiveIntegerField(default=0)),
+                ("cancel_requested", models.BooleanField(default=False)),
+                ("worker", models.CharField(blank=True, default="", max_length=255)),
+                ("error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("heartbeat_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RebalanceChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.PositiveIntegerField()),
+                ("from_library_id", models.BigIntegerField()),
+                ("to_library_id", models.BigIntegerField()),
+                ("book_ids", models.BinaryField()),
+                ("quantity", models.PositiveIntegerField()),
+                ("applied", models.BooleanField(default=False)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="library.rebalancejob",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="rebalancechunk",
+            constraint=models.UniqueConstraint(
+                fields=("job", "index"), name="rebalancechunk_job_index"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:47
+
+from django.db import migrations, models
+
+
+def delete_library_kinds(apps, schema_editor):
+    InventoryChange = apps.get_model("library", "InventoryChange")
+    InventoryChange.objects.exclude(kind__in=["book_added", "book_removed"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0009_data_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="inventorychange",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("book_added", "Книга добавлена"),
+                    ("book_removed", "Книга убрана"),
+                ],
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(delete_library_kinds, migrations.RunPython.noop),
+    ]
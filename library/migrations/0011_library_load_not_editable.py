@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0010_journal_book_kinds"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="library",
+            name="load",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -19,8 +19,33 @@ class Book(models.Model):
 
 
 class Library(models.Model):
+    """
+    Библиотека. Поле load save() не записывает: для уже сохранённой
+    библиотеки пишутся все поля, кроме него. Счётчик меняют только
+    counters и journal; чтобы записать его явно — save(update_fields=["load"]).
+    """
+
     name = models.CharField(max_length=255)
     capacity = models.PositiveIntegerField()
+    # Район: библиотеки одного района перераспределяются вместе
+    district = models.CharField(max_length=255, blank=True, default="")
+    # Координаты — для расчёта стоимости перевозок
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Текущее число книг. Поддерживается при записи (см. library/journal.py),
+    # расхождения исправляет команда reconcile_library_load
+    load = models.PositiveIntegerField(default=0, editable=False)
+
+    def save(self, *args, **kwargs):
+        # load меняется F-выражениями: обычный save не затирает его
+        # значением, прочитанным раньше
+        if not args and not self._state.adding and "update_fields" not in kwargs:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "load"
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -31,13 +56,158 @@ class LibraryBook(models.Model):
     Каждая книга находится ровно в одной библиотеке.
     """
 
-    library = models.ForeignKey(Library, related_name="books", on_delete=models.CASCADE)
+    # отдельный индекс по library_id не нужен: он — префикс составного
+    library = models.ForeignKey(
+        Library, related_name="books", on_delete=models.CASCADE, db_index=False
+    )
+    # OneToOne уже гарантирует уникальность книги, пара (library, book)
+    # тем более уникальна — отдельное ограничение только замедляло запись
     book = models.OneToOneField(
         Book, related_name="placement", on_delete=models.CASCADE
     )
 
     class Meta:
-        unique_together = ("library", "book")
+        indexes = [
+            # инвентарь библиотеки и подсчёт по library_id — только по индексу
+            models.Index(fields=["library", "book"], name="librarybook_library_book"),
+        ]
 
     def __str__(self):
         return f"{self.book} @ {self.library}"
+
+
+class LibraryState(models.Model):
+    """
+    Снимок после последнего перераспределения: загрузка и цель библиотеки.
+    Вместе с журналом InventoryChange даёт текущую загрузку без чтения инвентаря.
+    """
+
+    library = models.OneToOneField(
+        Library, primary_key=True, related_name="state", on_delete=models.CASCADE
+    )
+    load = models.PositiveIntegerField()
+    target = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.library_id}: {self.load}/{self.target}"
+
+
+class InventoryChange(models.Model):
+    """
+    Журнал изменений с момента последнего снимка. Пишется сигналами
+    (см. library/journal.py). library_id — без внешнего ключа,
+    чтобы запись пережила удаление библиотеки.
+    """
+
+    BOOK_ADDED = "book_added"
+    BOOK_REMOVED = "book_removed"
+
+    KIND_CHOICES = [
+        (BOOK_ADDED, "Книга добавлена"),
+        (BOOK_REMOVED, "Книга убрана"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    library_id = models.BigIntegerField()
+    # изменение загрузки библиотеки
+    delta = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.library_id} {self.delta:+d}"
+
+
+class RebalanceJob(models.Model):
+    """
+    Фоновое перераспределение (см. library/jobs.py). План хранится
+    пачками RebalanceChunk, каждая применяется в своей транзакции:
+    прерванное задание продолжается с первой неприменённой пачки.
+    """
+
+    QUEUED = "queued"
+    PLANNING = "planning"
+    APPLYING = "applying"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    STATUS_CHOICES = [
+        (QUEUED, "В очереди"),
+        (PLANNING, "Строится план"),
+        (APPLYING, "Применяется"),
+        (DONE, "Завершено"),
+        (FAILED, "Ошибка"),
+        (CANCELLED, "Отменено"),
+    ]
+
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=QUEUED, db_index=True
+    )
+    planner = models.CharField(max_length=20, default="priority")
+    backend = models.CharField(max_length=20, default="objects")
+    # книг в одной пачке — и в одной транзакции
+    chunk_size = models.PositiveIntegerField(default=1000)
+    # план целиком записан в RebalanceChunk
+    planned = models.BooleanField(default=False)
+    total_moves = models.PositiveIntegerField(default=0)
+    applied_moves = models.PositiveIntegerField(default=0)
+    # книги, которых к моменту применения уже не было у донора
+    skipped_moves = models.PositiveIntegerField(default=0)
+    total_chunks = models.PositiveIntegerField(default=0)
+    applied_chunks = models.PositiveIntegerField(default=0)
+    cancel_requested = models.BooleanField(default=False)
+    # хост:pid процесса, который выполняет задание
+    worker = models.CharField(max_length=255, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # обновляется после каждой пачки; давно не обновлялось — процесс упал
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.status} {self.applied_moves}/{self.total_moves}"
+
+
+class RebalanceChunk(models.Model):
+    """
+    Пачка плана: книги одного маршрута from → to.
+    book_ids — массив int64 в байтах (8 байт на книгу). У плана,
+    записанного rebalance_libraries (jobs.record_plan), — строка на
+    маршрут с пустым book_ids: книги уже перенесены.
+    """
+
+    job = models.ForeignKey(
+        RebalanceJob, related_name="chunks", on_delete=models.CASCADE
+    )
+    index = models.PositiveIntegerField()
+    from_library_id = models.BigIntegerField()
+    to_library_id = models.BigIntegerField()
+    book_ids = models.BinaryField()
+    quantity = models.PositiveIntegerField()
+    applied = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "index"], name="rebalancechunk_job_index"
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.job_id}/{self.index}: {self.from_library_id} → {self.to_library_id}"
+        )
+
+
+class DataVersion(models.Model):
+    """
+    Одна строка: номер версии данных. Растёт при любом изменении
+    LibraryBook и при каждом перераспределении (см. library/journal.py).
+    По нему кэш API узнаёт об изменениях из других процессов.
+    """
+
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.value)
@@ -0,0 +1,53 @@
+"""
+Сохранение плана перераспределения в LibraryBook.
+
+Вариант A (rebuild) — пересборка всей таблицы, вариант B (delta) —
+UPDATE только перемещённых книг. Счётчики Library.load обновляются
+здесь же; журнал и снимок — забота вызывающего (rebalance_libraries).
+"""
+
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from library import counters, journal
+from library.models import LibraryBook
+
+
+def persist_rebuild(placements, load_after, batch_size=1000):
+    """Вариант A: полная пересборка таблицы. placements — пары (library_id, book_id)."""
+    with journal.suspended(), transaction.atomic():
+        journal.clear(LibraryBook)
+
+        new_records = [
+            LibraryBook(library_id=lib_id, book_id=book_id)
+            for lib_id, book_id in placements
+        ]
+
+        LibraryBook.objects.bulk_create(new_records, batch_size=batch_size)
+        counters.assign(load_after, batch_size=batch_size)
+
+
+def persist_delta(plan, batch_size=1000, using=DEFAULT_DB_ALIAS) -> int:
+    """
+    Вариант B: меняем library_id только у перемещённых книг.
+    Книги группируются по библиотеке-получателю: один UPDATE на пачку.
+    Счётчики Library.load сдвигаются на сальдо по маршрутам.
+    using — база (замеры пишут в отдельную). Число обновлённых строк.
+    """
+    deltas = defaultdict(int)
+    for route in plan.routes():
+        deltas[route.from_library_id] -= route.quantity
+        deltas[route.to_library_id] += route.quantity
+
+    updated = 0
+    placements = LibraryBook.objects.using(using)
+    with transaction.atomic(using=using):
+        for library_id, book_ids in plan.books_by_destination().items():
+            for start in range(0, len(book_ids), batch_size):
+                updated += placements.filter(
+                    book_id__in=book_ids[start : start + batch_size]
+                ).update(library_id=library_id)
+        counters.adjust(deltas, using=using)
+
+    return updated
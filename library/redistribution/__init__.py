@@ -0,0 +1,8 @@
+"""
+Ядро перераспределения книг.
+
+Модули пакета не зависят от Django: менеджеры принимают библиотеки
+(модели или records.LibraryRecord) и размещения кортежами
+(book_id, library_id, year), поэтому планировать можно из скрипта
+без django.setup() и без БД. Чтение из базы — в orm.py.
+"""
@@ -0,0 +1,80 @@
+"""
+Распределение целевой загрузки между библиотеками.
+
+Метод наибольших остатков (Гамильтона): каждая библиотека получает
+целую часть своей квоты, а оставшиеся книги — по одной библиотекам
+с наибольшими дробными остатками. Сумма целей всегда равна total.
+"""
+
+import numpy as np
+
+
+def largest_remainder(total: int, weights) -> np.ndarray:
+    """
+    Делит total пропорционально целым весам weights.
+    Считается в целых числах, без ошибок округления;
+    при равных остатках лишняя книга достаётся библиотеке с меньшим индексом.
+    """
+    weights = np.asarray(weights, dtype=np.int64)
+    weight_sum = int(weights.sum())
+
+    if total <= 0 or weight_sum <= 0:
+        return np.zeros(len(weights), dtype=np.int64)
+
+    scaled = total * weights
+    result = scaled // weight_sum
+    remainder = scaled % weight_sum
+
+    left = total - int(result.sum())
+    if left:
+        result[np.argsort(-remainder, kind="stable")[:left]] += 1
+
+    return result
+
+
+def capped_largest_remainder(total: int, weights, caps) -> np.ndarray:
+    """
+    То же, но цель библиотеки не превышает caps.
+    Библиотеки, чья доля упёрлась в предел, насыщаются,
+    а остаток заново делится между остальными.
+    Сумма целей равна min(total, sum(caps)).
+    """
+    weights = np.asarray(weights, dtype=np.int64)
+    caps = np.asarray(caps, dtype=np.int64)
+
+    target = np.zeros(len(caps), dtype=np.int64)
+    remaining = min(total, int(caps.sum()))
+    active = caps > 0
+
+    while remaining > 0 and active.any():
+        room = caps - target
+
+        active_weights = weights[active]
+        if active_weights.sum() <= 0:
+            # веса кончились — делим пропорционально свободному месту
+            active_weights = room[active]
+
+        share = np.zeros(len(caps), dtype=np.int64)
+        share[active] = largest_remainder(remaining, active_weights)
+
+        over = active & (share >= room)
+        if not over.any():
+            target += share
+            break
+
+        target[over] = caps[over]
+        active &= ~over
+        remaining = min(total, int(caps.sum())) - int(target.sum())
+
+    return target
+
+
+def target_loads(libraries, total_books: int) -> dict:
+    """
+    Целевая загрузка {library_id: книги} пропорционально capacity.
+    Общая функция для планировщиков и отчётов, чтобы цели совпадали.
+    """
+    libraries = list(libraries)
+    capacities = [lib.capacity for lib in libraries]
+    targets = capped_largest_remainder(total_books, capacities, capacities)
+    return dict(zip([lib.id for lib in libraries], targets.tolist()))
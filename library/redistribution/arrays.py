@@ -0,0 +1,230 @@
+"""
+Массивный (NumPy) бэкенд перераспределения.
+
+Инвентарь хранится непрерывными int-массивами (book_id, library, year),
+а загрузка, цель и свободное место — массивами, индексированными
+по позиции библиотеки. Все шаги, кроме чтения данных, векторизованы.
+"""
+
+import copy
+from itertools import chain
+from typing import NamedTuple
+
+import numpy as np
+
+from .apportion import capped_largest_remainder
+from .move import Move, Route
+
+
+class ArrayPlan(NamedTuple):
+    """План переносов в виде параллельных массивов (одна строка — одна книга)."""
+
+    book_id: np.ndarray
+    from_library_id: np.ndarray
+    to_library_id: np.ndarray
+
+    def __len__(self):
+        return len(self.book_id)
+
+    def moves(self):
+        """Совместимость: тот же план списком Move."""
+        return [
+            Move(book_id=b, from_library_id=f, to_library_id=t, quantity=1)
+            for b, f, t in zip(
+                self.book_id.tolist(),
+                self.from_library_id.tolist(),
+                self.to_library_id.tolist(),
+            )
+        ]
+
+    def routes(self):
+        """Маршруты (from, to) с массивами book_id, как у Plan.routes()."""
+        order = np.lexsort((self.to_library_id, self.from_library_id))
+        pairs = np.stack(
+            [self.from_library_id[order], self.to_library_id[order]], axis=1
+        )
+        if not len(pairs):
+            return
+        starts = np.flatnonzero(np.any(pairs[1:] != pairs[:-1], axis=1)) + 1
+        for lo, hi in zip(np.r_[0, starts], np.r_[starts, len(pairs)]):
+            yield Route(
+                int(pairs[lo, 0]), int(pairs[lo, 1]), self.book_id[order[lo:hi]]
+            )
+
+    def books_by_destination(self):
+        """{library_id: [book_id, ...]} — для пакетного сохранения."""
+        order = np.argsort(self.to_library_id, kind="stable")
+        to_sorted = self.to_library_id[order]
+        library_ids, starts = np.unique(to_sorted, return_index=True)
+        groups = np.split(self.book_id[order], starts[1:])
+        return {
+            int(library_id): group.tolist()
+            for library_id, group in zip(library_ids, groups)
+        }
+
+
+class ArrayInventory:
+    """
+    Инвентарь в массивах.
+
+    library_ids, capacity, load, target, free — по позиции библиотеки;
+    book_id, library, year — по книге (library — позиция библиотеки).
+    """
+
+    def __init__(self, library_ids, capacities, book_ids, book_library_ids, years):
+        self.library_ids = np.asarray(library_ids, dtype=np.int64)
+        self.capacity = np.asarray(capacities, dtype=np.int64)
+
+        order = np.argsort(self.library_ids)
+        positions = np.searchsorted(
+            self.library_ids, np.asarray(book_library_ids, dtype=np.int64), sorter=order
+        )
+        self.book_id = np.asarray(book_ids, dtype=np.int64)
+        self.library = order[positions]
+        self.year = np.asarray(years, dtype=np.int64)
+
+        self.load = np.bincount(self.library, minlength=len(self.library_ids))
+
+        self.target = capped_largest_remainder(
+            len(self.book_id), self.capacity, self.capacity
+        )
+
+        # порядок отдачи книг по priority_year — зависит только от размещения
+        self._book_orders = {}
+
+    @classmethod
+    def from_rows(cls, libraries, rows):
+        """
+        Строит инвентарь из моделей Library и кортежей
+        (book_id, library_id, year), например orm.iter_inventory_rows.
+        """
+        libraries = list(libraries)
+        flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 3)
+        return cls(
+            [lib.id for lib in libraries],
+            [lib.capacity for lib in libraries],
+            flat[:, 0],
+            flat[:, 1],
+            flat[:, 2],
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "ArrayInventory":
+        """Из InventorySnapshot: колонки книг не копируются."""
+        return cls(
+            [lib.id for lib in snapshot.libraries],
+            [lib.capacity for lib in snapshot.libraries],
+            snapshot.book_id,
+            snapshot.library_id,
+            snapshot.year,
+        )
+
+    def with_capacities(self, capacities) -> "ArrayInventory":
+        """
+        Та же сеть с другими вместимостями (в порядке library_ids).
+        Массивы книг общие, копируется только размещение — его меняет план;
+        уже посчитанный порядок отдачи книг переиспользуется.
+        """
+        inv = copy.copy(self)
+        inv.capacity = np.asarray(capacities, dtype=np.int64)
+        inv.library = self.library.copy()
+        inv.target = capped_largest_remainder(
+            len(self.book_id), inv.capacity, inv.capacity
+        )
+        return inv
+
+    @property
+    def free(self):
+        return self.capacity - self.load
+
+    @property
+    def surplus(self):
+        return self.load - self.target
+
+    def load_by_library(self):
+        return dict(zip(self.library_ids.tolist(), self.load.tolist()))
+
+
+class ArrayRedistributionManager:
+    """
+    Векторизованный аналог CapacityAwareRedistributionManager.
+
+    priority_year=None — донор отдаёт последние книги (как базовый менеджер),
+    иначе — как PriorityRedistributionManager: сначала новее priority_year,
+    внутри группы по убыванию года.
+    """
+
+    def __init__(self, inventory: ArrayInventory, priority_year=None):
+        self.inventory = inventory
+        self.priority_year = priority_year
+
+    def _book_order(self):
+        """Индексы книг: по библиотеке, внутри — в порядке отдачи."""
+        inv = self.inventory
+        order = inv._book_orders.get(self.priority_year)
+        if order is not None:
+            return order
+
+        position = np.arange(len(inv.book_id))
+        if self.priority_year is None:
+            order = np.lexsort((-position, inv.library))
+        else:
+            is_new = (inv.year > self.priority_year).astype(np.int64)
+            order = np.lexsort((position, -inv.year, -is_new, inv.library))
+
+        inv._book_orders[self.priority_year] = order
+        return order
+
+    def rebalance(self) -> ArrayPlan:
+        inv = self.inventory
+
+        surplus = inv.surplus
+        send = np.clip(surplus, 0, None)
+        # получатель не берёт больше, чем позволяет capacity
+        take = np.clip(np.minimum(-surplus, inv.free), 0, None)
+
+        flow = min(int(send.sum()), int(take.sum()))
+
+        # доноры и получатели — по убыванию избытка / недостатка
+        donors = np.argsort(-send, kind="stable")
+        donors = donors[send[donors] > 0]
+        receivers = np.argsort(-take, kind="stable")
+        receivers = receivers[take[receivers] > 0]
+
+        # Правило северо-западного угла: единица потока u уходит от донора,
+        # в чей накопленный интервал она попала, к соответствующему получателю.
+        donor_cum = np.cumsum(send[donors])
+        receiver_cum = np.cumsum(take[receivers])
+
+        units = np.arange(flow)
+        unit_donor = donors[np.searchsorted(donor_cum, units, side="right")]
+        unit_receiver = receivers[np.searchsorted(receiver_cum, units, side="right")]
+
+        # сколько реально отдаёт каждый донор
+        sent = np.bincount(unit_donor, minlength=len(inv.library_ids))
+
+        # выбираем у каждого донора первые sent книг в порядке отдачи
+        order = self._book_order()
+        lib_sorted = inv.library[order]
+        starts = np.concatenate(([0], np.cumsum(inv.load)[:-1]))
+        rank = np.arange(len(order)) - starts[lib_sorted]
+        chosen = order[rank < sent[lib_sorted]]
+
+        # в unit-пространстве книги идут в порядке доноров, затем по рангу
+        donor_rank = np.empty(len(inv.library_ids), dtype=np.int64)
+        donor_rank[donors] = np.arange(len(donors))
+        chosen = chosen[np.argsort(donor_rank[inv.library[chosen]], kind="stable")]
+
+        from_library = inv.library[chosen]
+        plan = ArrayPlan(
+            book_id=inv.book_id[chosen],
+            from_library_id=inv.library_ids[from_library],
+            to_library_id=inv.library_ids[unit_receiver],
+        )
+
+        # применяем план к инвентарю; прежний порядок отдачи больше не верен
+        inv.library[chosen] = unit_receiver
+        inv.load = np.bincount(inv.library, minlength=len(inv.library_ids))
+        inv._book_orders = {}
+
+        return plan
@@ -1,7 +1,10 @@
+import heapq
 from collections import defaultdict
-from typing import List
-from library.models import Library, LibraryBook
-from .move import Move
+from typing import Iterator, List
+
+from .apportion import target_loads
+from .move import Move, Plan
+from .records import BookRecord, DetailedBookRecord
 
 
 class RedistributionManager:
@@ -11,24 +14,54 @@ class RedistributionManager:
     Может быть расширен за счёт переопределения нескольких методов.
     """
 
-    def __init__(self, libraries, inventory):
+    # Какие книги донор отдаёт, известно заранее — инкрементальный запуск
+    # читает только их (orm.iter_leaving_rows): "last" — последние по
+    # порядку чтения, "priority" — по PriorityRedistributionManager.priority_key,
+    # None — выбор зависит от всех книг донора, читаются все.
+    leaving = "last"
+
+    def __init__(self, libraries, inventory, target_load=None):
+        """
+        inventory — любой итерируемый источник размещений:
+        экземпляры LibraryBook (с загруженной book) или компактные кортежи
+        (book_id, library_id, year), см. orm.iter_inventory_rows.
+        Источник читается один раз и целиком в памяти не хранится.
+
+        target_load — готовые цели {library_id: книги}, если менеджер
+        работает с частью сети (шард), а цели посчитаны по всей сети.
+        """
         self.libraries = {lib.id: lib for lib in libraries}
-        self.inventory = list(inventory)
 
         self.load = defaultdict(int)
         self.books_by_library = defaultdict(list)
 
-        for lb in self.inventory:
-            self.load[lb.library_id] += 1
-            self.books_by_library[lb.library_id].append(lb.book)
+        for item in inventory:
+            if isinstance(item, tuple):
+                if len(item) == 3:
+                    book_id, library_id, year = item
+                    book = BookRecord(book_id, year)
+                else:
+                    # с автором и названием — для политик (policies.py)
+                    book_id, library_id, year, author_id, title = item
+                    book = DetailedBookRecord(book_id, year, author_id, title)
+            else:
+                library_id, book = item.library_id, item.book
+
+            self.load[library_id] += 1
+            self.books_by_library[library_id].append(book)
 
         self.total_books = sum(self.load.values())
         self.total_capacity = sum(lib.capacity for lib in libraries)
 
-        self.target_load = {
-            lib.id: round(self.total_books * lib.capacity / self.total_capacity)
-            for lib in self.libraries.values()
-        }
+        # Цели по методу наибольших остатков: в сумме ровно total_books
+        # (или вся вместимость) и не больше capacity библиотеки
+        if target_load is None:
+            target_load = target_loads(self.libraries.values(), self.total_books)
+        self.target_load = target_load
+
+        # проходы цикла планирования и пары донор → получатель (для отчётов)
+        self.passes = 0
+        self.pairings = 0
 
     # Методы для наследников
 
@@ -36,82 +69,134 @@ class RedistributionManager:
         """Можно ли принять книгу? Базовая версия разрешает всё."""
         return True
 
+    def can_give(self, library_id: int) -> bool:
+        """Может ли донор отдать ещё книгу? Базовая версия — есть ли книги."""
+        return bool(self.books_by_library[library_id])
+
     def on_move_planned(self, donor_id: int, receiver_id: int):
         """Хук, вызываемый при планировании переноса. Базовая версия пустая."""
         pass
 
+    # Половины on_move_planned для переноса между менеджерами: донор у
+    # одного, получатель у другого (hierarchical.py). Наследник, которому
+    # нужен on_move_planned, переопределяет и их.
+
+    def on_book_given(self, donor_id: int, book):
+        """Донор отдал book в библиотеку другого менеджера."""
+        pass
+
+    def on_book_taken(self, receiver_id: int, book):
+        """Получатель принял book из библиотеки другого менеджера."""
+        pass
+
     def pick_book(self, donor_id: int):
         """Какую книгу донор отдаёт? Базовая версия — последнюю."""
         return self.books_by_library[donor_id].pop()
 
     # Распределение
-    def rebalance(self) -> List[Move]:
-        moves = []
 
-        while True:
-            donors = sorted(
-                [
-                    lib
-                    for lib in self.libraries.values()
-                    if self.load[lib.id] > self.target_load[lib.id]
-                ],
-                key=lambda lib: self.load[lib.id] - self.target_load[lib.id],
-                reverse=True,
+    def _surplus(self, library_id: int) -> int:
+        return self.load[library_id] - self.target_load[library_id]
+
+    def _transfer(self, donor_id: int, receiver_id: int, quantity: int):
+        """
+        Переносит до quantity книг от донора к получателю за один шаг
+        и по одной выдаёт получившиеся Move.
+        Хуки вызываются для каждой книги, поэтому наследники
+        (capacity, приоритеты) работают так же, как и раньше.
+        """
+        moved = 0
+
+        while (
+            moved < quantity
+            and self.can_give(donor_id)
+            and self.can_receive(receiver_id)
+        ):
+            book = self.pick_book(donor_id)
+
+            self.load[donor_id] -= 1
+            self.load[receiver_id] += 1
+            self.books_by_library[receiver_id].append(book)
+
+            self.on_move_planned(donor_id, receiver_id)
+
+            yield Move(
+                book_id=book.id,
+                from_library_id=donor_id,
+                to_library_id=receiver_id,
+                quantity=1,
             )
+            moved += 1
+
+    def iter_moves(self) -> Iterator[Move]:
+        """
+        Потоковый вариант rebalance: переносы выдаются по мере планирования,
+        весь список в памяти не держится.
+
+        Очереди с приоритетом по избытку и недостатку:
+        самый перегруженный донор отдаёт самому недогруженному получателю
+        сразу min(избыток, недостаток) книг. Сложность O(M + L log L),
+        где M — число переносов, L — число библиотек.
+        """
+        # порядок библиотек разрешает равенства так же, как стабильная сортировка
+        order = {lib_id: i for i, lib_id in enumerate(self.libraries)}
+
+        donors = []
+        receivers = []
+        for lib_id in self.libraries:
+            surplus = self._surplus(lib_id)
+            if surplus > 0:
+                donors.append((-surplus, order[lib_id], lib_id))
+            elif surplus < 0:
+                receivers.append((surplus, order[lib_id], lib_id))
+
+        heapq.heapify(donors)
+        heapq.heapify(receivers)
+
+        # получатели, которым can_receive отказал; пробуем их снова,
+        # только если после отказа что-то было перенесено
+        blocked = []
 
-            receivers = sorted(
-                [
-                    lib
-                    for lib in self.libraries.values()
-                    if self.load[lib.id] < self.target_load[lib.id]
-                ],
-                key=lambda lib: self.target_load[lib.id] - self.load[lib.id],
-                reverse=True,
-            )
-
-            if not donors or not receivers:
-                break
-
+        while True:
             progress = False
+            self.passes += 1
+
+            while donors and receivers:
+                _, _, donor_id = heapq.heappop(donors)
+                _, _, receiver_id = heapq.heappop(receivers)
+                self.pairings += 1
+
+                quantity = min(self._surplus(donor_id), -self._surplus(receiver_id))
+                moved = 0
+                for move in self._transfer(donor_id, receiver_id, quantity):
+                    moved += 1
+                    yield move
+                progress = progress or moved > 0
+
+                donor_left = self._surplus(donor_id)
+                donor_has_books = self.can_give(donor_id)
+                if donor_left > 0 and donor_has_books:
+                    heapq.heappush(donors, (-donor_left, order[donor_id], donor_id))
+
+                receiver_left = self._surplus(receiver_id)
+                if receiver_left < 0:
+                    item = (receiver_left, order[receiver_id], receiver_id)
+                    if moved < quantity and donor_has_books:
+                        blocked.append(item)
+                    else:
+                        heapq.heappush(receivers, item)
+
+            if not (progress and blocked and donors):
+                break
 
-            for donor in donors:
-                for receiver in receivers:
-
-                    donor_id = donor.id
-                    receiver_id = receiver.id
-
-                    if self.load[donor_id] <= self.target_load[donor_id]:
-                        break
-
-                    if self.load[receiver_id] >= self.target_load[receiver_id]:
-                        continue
-
-                    if not self.books_by_library[donor_id]:
-                        continue
-
-                    if not self.can_receive(receiver_id):
-                        continue
-
-                    book = self.pick_book(donor_id)
-
-                    self.load[donor_id] -= 1
-                    self.load[receiver_id] += 1
-                    self.books_by_library[receiver_id].append(book)
-
-                    self.on_move_planned(donor_id, receiver_id)
-
-                    moves.append(
-                        Move(
-                            book_id=book.id,
-                            from_library_id=donor_id,
-                            to_library_id=receiver_id,
-                            quantity=1,
-                        )
-                    )
-
-                    progress = True
+            for item in blocked:
+                heapq.heappush(receivers, item)
+            blocked = []
 
-            if not progress:
-                break
+    def plan(self) -> Plan:
+        """Сводный план по маршрутам (from, to) с массивами book_id."""
+        return Plan.from_moves(self.iter_moves())
 
-        return moves
+    def rebalance(self) -> List[Move]:
+        """Совместимость: поштучный список переносов."""
+        return list(self.iter_moves())
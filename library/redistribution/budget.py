@@ -0,0 +1,287 @@
+"""
+План с бюджетом: не больше max_moves переносов и/или max_cost
+суммарной стоимости (км перевозок).
+
+Полный план закрывает весь дисбаланс; за неделю фургоны столько не
+увезут. Здесь каждый перенос — одна книга от донора к получателю, и
+выбирается перенос, сильнее всего уменьшающий отклонение от целей:
+книга уходит от самого перегруженного к самому недогруженному
+(квадратичное отклонение падает на 2·(избыток + недостаток − 1)).
+С бюджетом стоимости среди нескольких крайних доноров и получателей
+берётся пара с лучшим отношением «выигрыш / стоимость»; если ни одна
+не укладывается в остаток бюджета — лучшая среди пар «донор —
+ближайший к нему оставшийся получатель» (_nearest).
+
+Каждый перенос полезный (донор выше цели, получатель ниже), поэтому
+повторные запуски с бюджетом сходятся к той же загрузке, что и полный
+план, и в сумме делают столько же переносов. Время планирования —
+O(бюджет · log L), а не O(весь дисбаланс); перенос через запасной
+поиск — O(L).
+"""
+
+import heapq
+from math import inf, sqrt
+
+import numpy as np
+
+from .mincost import distance_matrix
+from .move import Plan
+
+# доноров и получателей, среди которых ищется пара с бюджетом стоимости
+CANDIDATES = 8
+
+
+def deviation(load, target, library_ids) -> dict:
+    """
+    Остаточное отклонение от целей: сколько переносов ещё нужно,
+    наибольшее отклонение библиотеки и среднеквадратичное.
+    """
+    left = 0
+    worst = 0
+    squares = 0
+    for lib_id in library_ids:
+        delta = load.get(lib_id, 0) - target[lib_id]
+        if delta > 0:
+            left += delta
+        worst = max(worst, abs(delta))
+        squares += delta * delta
+    count = len(library_ids)
+    return {
+        "moves_left": left,
+        "max": worst,
+        "rms": round(sqrt(squares / count), 4) if count else 0.0,
+    }
+
+
+def route_cost(manager):
+    """
+    Стоимость переноса donor → receiver: route_costs менеджера
+    (MinCostRedistributionManager) или расстояние по координатам.
+    Пары кэшируются — бюджет касается немногих библиотек.
+    cost.row(donor_id, receiver_ids) — стоимости от донора до всех
+    receiver_ids одним вызовом (для запасного поиска планировщика).
+    """
+    cache = {}
+    route_costs = getattr(manager, "route_costs", None)
+
+    def row(donor_id, receiver_ids):
+        if route_costs is not None:
+            matrix = route_costs([donor_id], receiver_ids)
+        else:
+            matrix = distance_matrix(
+                [manager.libraries[donor_id]],
+                [manager.libraries[i] for i in receiver_ids],
+            )
+        values = matrix[0].tolist()
+        cache.update(zip(((donor_id, i) for i in receiver_ids), values))
+        return values
+
+    def cost(donor_id, receiver_id):
+        value = cache.get((donor_id, receiver_id))
+        if value is None:
+            value = row(donor_id, [receiver_id])[0]
+        return value
+
+    cost.row = row
+    return cost
+
+
+class BudgetedPlanner:
+    """
+    Ограниченный план поверх менеджера: книги выбирает и ограничения
+    проверяет сам менеджер (pick_book, can_give, can_receive), здесь —
+    только порядок пар и остановка.
+
+    После plan(): moves, cost, stopped ("balanced", "moves", "cost"),
+    before / after — deviation() до и после.
+    """
+
+    def __init__(self, manager, max_moves=None, max_cost=None, cost=None):
+        if max_moves is not None and max_moves < 0:
+            raise ValueError("max_moves не может быть отрицательным")
+        if max_cost is not None and max_cost < 0:
+            raise ValueError("max_cost не может быть отрицательным")
+        self.manager = manager
+        self.max_moves = max_moves
+        self.max_cost = max_cost
+        # у MinCostRedistributionManager пары выбираются с учётом стоимости
+        # и без бюджета стоимости
+        if cost is None and (max_cost is not None or hasattr(manager, "route_costs")):
+            cost = route_cost(manager)
+        self.cost_of = cost
+        # без стоимости лучшая пара — всегда вершины куч
+        self.candidates = CANDIDATES if cost is not None else 1
+
+        self.moves = 0
+        self.cost = 0.0
+        self.stopped = None
+        self.before = self.after = None
+        # для _nearest: донор → [позиция, получатели по стоимости, стоимости]
+        self._ranked = {}
+        self._receiver_ids = []
+
+    def _deviation(self):
+        mgr = self.manager
+        return deviation(mgr.load, mgr.target_load, list(mgr.libraries))
+
+    def _choose(self, donors, receivers):
+        """Лучшая пара среди вершин куч, укладывающаяся в бюджет, или None."""
+        if self.cost_of is None:
+            return donors[0], receivers[0], 0.0
+
+        budget = inf if self.max_cost is None else self.max_cost - self.cost
+        best = None
+        best_ratio = -1.0
+        for donor in donors:
+            for receiver in receivers:
+                price = self.cost_of(donor[2], receiver[2])
+                # inf — маршрут без стоимости, он запрещён
+                if price > budget or price == inf:
+                    continue
+                # -donor[0] — избыток, -receiver[0] — недостаток
+                gain = -donor[0] - receiver[0] - 1
+                ratio = gain / price if price else inf
+                if ratio > best_ratio:
+                    best, best_ratio = (donor, receiver, price), ratio
+        return best
+
+    def _rank(self, donor_id):
+        """Получатели донора по возрастанию стоимости — один раз на донора."""
+        row = getattr(self.cost_of, "row", None)
+        if row is not None:
+            prices = row(donor_id, self._receiver_ids)
+        else:
+            prices = [self.cost_of(donor_id, i) for i in self._receiver_ids]
+        order = np.argsort(prices, kind="stable").tolist()
+        return [0, [self._receiver_ids[i] for i in order], sorted(prices)]
+
+    def _nearest(self, donors, receivers):
+        """
+        Запасной поиск, когда ни одна пара вершин не укладывается в бюджет:
+        для каждого донора — ближайший из оставшихся получателей, из этих
+        пар — лучшая по «выигрыш / стоимость», или None.
+
+        Получатели только принимают книги и, выйдя из очереди, в неё не
+        возвращаются; остаток бюджета только убывает. Поэтому позиция в
+        списке донора лишь сдвигается вперёд, а донор, чей ближайший
+        получатель дороже остатка, больше не рассматривается.
+        O(доноров + получателей) на поиск, а не O(доноров · получателей).
+        """
+        budget = inf if self.max_cost is None else self.max_cost - self.cost
+        current = {item[2]: item for item in receivers}
+        best = None
+        best_ratio = -1.0
+        for donor in donors:
+            ranked = self._ranked.get(donor[2])
+            if ranked is None:
+                ranked = self._ranked[donor[2]] = self._rank(donor[2])
+            pos, receiver_ids, prices = ranked
+            while pos < len(receiver_ids) and receiver_ids[pos] not in current:
+                pos += 1
+            ranked[0] = pos
+            if pos == len(receiver_ids):
+                continue
+            price = prices[pos]
+            if price > budget or price == inf:
+                # дальше по списку только дороже
+                ranked[0] = len(receiver_ids)
+                continue
+            receiver = current[receiver_ids[pos]]
+            gain = -donor[0] - receiver[0] - 1
+            ratio = gain / price if price else inf
+            if ratio > best_ratio:
+                best, best_ratio = (donor, receiver, price), ratio
+        return best
+
+    def plan(self) -> Plan:
+        mgr = self.manager
+        order = {lib_id: i for i, lib_id in enumerate(mgr.libraries)}
+        self.before = self._deviation()
+
+        donors = []
+        receivers = []
+        for lib_id in mgr.libraries:
+            surplus = mgr._surplus(lib_id)
+            if surplus > 0 and mgr.can_give(lib_id):
+                donors.append((-surplus, order[lib_id], lib_id))
+            elif surplus < 0:
+                receivers.append((surplus, order[lib_id], lib_id))
+        heapq.heapify(donors)
+        heapq.heapify(receivers)
+        self._receiver_ids = [item[2] for item in receivers]
+
+        plan = Plan()
+        mgr.passes += 1
+        while donors and receivers:
+            if self.max_moves is not None and self.moves >= self.max_moves:
+                self.stopped = "moves"
+                break
+
+            top_donors = [
+                heapq.heappop(donors) for _ in range(min(self.candidates, len(donors)))
+            ]
+            top_receivers = [
+                heapq.heappop(receivers)
+                for _ in range(min(self.candidates, len(receivers)))
+            ]
+            chosen = self._choose(top_donors, top_receivers)
+            if chosen is None and (donors or receivers):
+                # вершины дороже остатка бюджета — ищем дальше от вершин
+                chosen = self._nearest(top_donors + donors, top_receivers + receivers)
+                if chosen is not None:
+                    for heap, top, item in (
+                        (donors, top_donors, chosen[0]),
+                        (receivers, top_receivers, chosen[1]),
+                    ):
+                        if item not in top:
+                            heap.remove(item)
+                            heapq.heapify(heap)
+                            top.append(item)
+            if chosen is None:
+                for item in top_donors:
+                    heapq.heappush(donors, item)
+                for item in top_receivers:
+                    heapq.heappush(receivers, item)
+                self.stopped = "cost"
+                break
+
+            donor, receiver, price = chosen
+            for item in top_donors:
+                if item is not donor:
+                    heapq.heappush(donors, item)
+            for item in top_receivers:
+                if item is not receiver:
+                    heapq.heappush(receivers, item)
+
+            donor_id, receiver_id = donor[2], receiver[2]
+            mgr.pairings += 1
+            moved = False
+            for move in mgr._transfer(donor_id, receiver_id, 1):
+                plan.add(move.book_id, donor_id, receiver_id)
+                moved = True
+
+            if moved:
+                self.moves += 1
+                self.cost += price
+            elif not mgr.can_receive(receiver_id):
+                # получатель заполнен — донор остаётся в очереди
+                heapq.heappush(donors, donor)
+                continue
+
+            # донор, которому больше нечего отдать, из очереди выходит
+            surplus = mgr._surplus(donor_id)
+            if surplus > 0 and mgr.can_give(donor_id):
+                heapq.heappush(donors, (-surplus, order[donor_id], donor_id))
+            surplus = mgr._surplus(receiver_id)
+            if surplus < 0:
+                heapq.heappush(receivers, (surplus, order[receiver_id], receiver_id))
+
+        if self.stopped is None:
+            self.stopped = "balanced"
+        self.after = self._deviation()
+        return plan
+
+    @property
+    def complete(self) -> bool:
+        """Закрыт ли весь дисбаланс, который менеджер может закрыть."""
+        return self.stopped == "balanced"
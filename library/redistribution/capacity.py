@@ -3,8 +3,8 @@ from .base import RedistributionManager
 
 class CapacityAwareRedistributionManager(RedistributionManager):
 
-    def __init__(self, libraries, inventory):
-        super().__init__(libraries, inventory)
+    def __init__(self, libraries, inventory, target_load=None):
+        super().__init__(libraries, inventory, target_load)
         self.free = {
             lib.id: lib.capacity - self.load[lib.id] for lib in self.libraries.values()
         }
@@ -15,3 +15,9 @@ class CapacityAwareRedistributionManager(RedistributionManager):
     def on_move_planned(self, donor_id: int, receiver_id: int):
         self.free[donor_id] += 1
         self.free[receiver_id] -= 1
+
+    def on_book_given(self, donor_id: int, book):
+        self.free[donor_id] += 1
+
+    def on_book_taken(self, receiver_id: int, book):
+        self.free[receiver_id] -= 1
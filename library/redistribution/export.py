@@ -0,0 +1,333 @@
+"""
+Выгрузка плана для логистики: CSV, NDJSON или колоночный файл.
+
+Строка — одна книга: маршрут (from → to) с названиями библиотек, id и
+название книги. Источник — план (Plan, ArrayPlan: маршрут за маршрутом)
+или поток переносов либо маршрутов, например manager.iter_moves().
+Строки пишутся пачками по chunk_size: названия книг пачки приходят
+одним запросом (titles(book_ids) → {id: название}), библиотек — одним
+на всю выгрузку. CSV и NDJSON читают поток по ходу записи и держат в
+памяти одну пачку; колоночному формату таблица маршрутов нужна до
+записи, поэтому поток для него сначала собирается в Plan (8 байт на
+книгу).
+
+Файл пишется рядом под временным именем и появляется только целым.
+
+Колоночный формат (версия FORMAT_VERSION):
+
+    MAGIC (8 байт), версия формата (uint32), длина заголовка (uint32)
+    заголовок — JSON: число книг, названия библиотек {id: имя},
+        маршруты [[from, to, первая строка, книг], ...]
+    book_id — int64 little-endian по книгам, с границы ALIGN байт
+    title_offset — int64 по книгам + 1: границы названий в блоке ниже
+    блок названий — UTF-8 подряд, до конца файла
+"""
+
+import csv
+import json
+import mmap
+import os
+import struct
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .move import Plan
+
+MAGIC = b"CLPLAN\r\n"
+FORMAT_VERSION = 1
+ALIGN = 64
+DTYPE = "<i8"
+
+# MAGIC, версия формата, длина заголовка
+_PREFIX = struct.Struct("<8sII")
+
+FIELDS = (
+    "from_library_id",
+    "from_library",
+    "to_library_id",
+    "to_library",
+    "book_id",
+    "title",
+)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGN) * ALIGN
+
+
+class PlanWriter(ABC):
+    """
+    Общая часть форматов: временный файл и пачки одного маршрута.
+
+        with CsvPlanWriter(path, library_names) as writer:
+            writer.write(from_id, to_id, book_ids, titles)
+    """
+
+    mode = "w"
+
+    def __init__(self, path, library_names):
+        self.path = os.fspath(path)
+        self.library_names = library_names
+        self.written = 0
+        self._tmp = f"{self.path}.tmp"
+        if self.mode == "w":
+            self._file = open(self._tmp, "w", encoding="utf-8", newline="")
+        else:
+            self._file = open(self._tmp, "w+b")
+
+    @abstractmethod
+    def write(self, from_id, to_id, book_ids, titles):
+        """Пачка книг маршрута from_id → to_id; titles — {book_id: название}."""
+
+    def close(self):
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CsvPlanWriter(PlanWriter):
+    def __init__(self, path, library_names):
+        super().__init__(path, library_names)
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(FIELDS)
+
+    def write(self, from_id, to_id, book_ids, titles):
+        source = self.library_names.get(from_id, "")
+        destination = self.library_names.get(to_id, "")
+        self._csv.writerows(
+            (from_id, source, to_id, destination, book_id, titles.get(book_id, ""))
+            for book_id in book_ids
+        )
+        self.written += len(book_ids)
+
+
+class NdjsonPlanWriter(PlanWriter):
+    def write(self, from_id, to_id, book_ids, titles):
+        # поля маршрута одинаковы для всей пачки — кодируются один раз
+        route = json.dumps(
+            {
+                "from_library_id": from_id,
+                "from_library": self.library_names.get(from_id, ""),
+                "to_library_id": to_id,
+                "to_library": self.library_names.get(to_id, ""),
+            },
+            ensure_ascii=False,
+        )[:-1]
+        self._file.writelines(
+            f'{route}, "book_id": {book_id}, "title": '
+            f"{json.dumps(titles.get(book_id, ''), ensure_ascii=False)}}}\n"
+            for book_id in book_ids
+        )
+        self.written += len(book_ids)
+
+
+class ColumnarPlanWriter(PlanWriter):
+    """
+    Число книг и маршруты известны до записи (план уже построен),
+    поэтому заголовок и место под колонки int64 размечаются сразу,
+    а названия дописываются в конец файла по мере записи пачек.
+    """
+
+    mode = "wb"
+
+    def __init__(self, path, library_names, routes):
+        super().__init__(path, library_names)
+        table = []
+        n_books = 0
+        for from_id, to_id, count in routes:
+            table.append([from_id, to_id, n_books, count])
+            n_books += count
+        self.n_books = n_books
+
+        header = json.dumps(
+            {
+                "books": n_books,
+                "dtype": DTYPE,
+                "libraries": {str(k): v for k, v in library_names.items()},
+                "routes": table,
+            },
+            ensure_ascii=False,
+        ).encode()
+        self._book_id_at = _aligned(_PREFIX.size + len(header))
+        self._offset_at = self._book_id_at + _aligned(n_books * 8)
+        self._titles_at = self._offset_at + _aligned((n_books + 1) * 8)
+        self._title_end = 0
+
+        self._file.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        self._file.write(header)
+        self._file.truncate(self._titles_at)
+        self._file.seek(self._offset_at)
+        self._file.write(np.zeros(1, dtype=DTYPE).tobytes())
+
+    def write(self, from_id, to_id, book_ids, titles):
+        count = len(book_ids)
+        if self.written + count > self.n_books:
+            raise ValueError(f"Книг больше, чем объявлено ({self.n_books})")
+        encoded = [titles.get(book_id, "").encode() for book_id in book_ids]
+        ends = self._title_end + np.cumsum(
+            [len(title) for title in encoded], dtype=np.int64
+        )
+
+        f = self._file
+        f.seek(self._book_id_at + self.written * 8)
+        f.write(np.asarray(book_ids, dtype=DTYPE).tobytes())
+        f.seek(self._offset_at + (self.written + 1) * 8)
+        f.write(ends.astype(DTYPE).tobytes())
+        f.seek(self._titles_at + self._title_end)
+        f.write(b"".join(encoded))
+
+        self.written += count
+        if count:
+            self._title_end = int(ends[-1])
+
+    def close(self):
+        if self.written != self.n_books:
+            self.abort()
+            raise ValueError(
+                f"Записано книг: {self.written}, объявлено: {self.n_books}"
+            )
+        super().close()
+
+
+class ColumnarPlan:
+    """
+    Колоночный файл плана через mmap: header — заголовок, book_id —
+    массив поверх файла, title(i) — название i-й книги.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, size = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path}: не файл плана")
+            if version != FORMAT_VERSION:
+                raise ValueError(
+                    f"{path}: формат плана {version}, поддерживается {FORMAT_VERSION}"
+                )
+            self.header = json.loads(f.read(size))
+            self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        n_books = self.header["books"]
+        book_id_at = _aligned(_PREFIX.size + size)
+        offset_at = book_id_at + _aligned(n_books * 8)
+        self._titles_at = offset_at + _aligned((n_books + 1) * 8)
+        self.book_id = np.frombuffer(
+            self._mapped, dtype=DTYPE, count=n_books, offset=book_id_at
+        )
+        self.title_offset = np.frombuffer(
+            self._mapped, dtype=DTYPE, count=n_books + 1, offset=offset_at
+        )
+
+    def __len__(self):
+        return len(self.book_id)
+
+    def title(self, i: int) -> str:
+        start = self._titles_at + int(self.title_offset[i])
+        end = self._titles_at + int(self.title_offset[i + 1])
+        return self._mapped[start:end].decode()
+
+    def routes(self):
+        """[(from, to, массив book_id)] — срезы колонки без копирования."""
+        for from_id, to_id, start, count in self.header["routes"]:
+            yield from_id, to_id, self.book_id[start : start + count]
+
+
+FORMATS = {
+    "csv": CsvPlanWriter,
+    "ndjson": NdjsonPlanWriter,
+    "columnar": ColumnarPlanWriter,
+}
+EXTENSIONS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".clplan": "columnar",
+}
+
+
+def guess_format(path) -> str:
+    """Формат по расширению файла; неизвестное расширение — ValueError."""
+    extension = os.path.splitext(os.fspath(path))[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(
+            f"{path}: формат не определить по расширению "
+            f"({', '.join(EXTENSIONS)}), укажите его явно"
+        )
+    return EXTENSIONS[extension]
+
+
+def _batches(source, chunk_size):
+    """
+    Пачки (from, to, [book_id]) не длиннее chunk_size. source — план
+    (есть routes()) или поток маршрутов (Route) либо переносов (Move):
+    подряд идущие переносы одного маршрута собираются в одну пачку.
+    """
+    if hasattr(source, "routes"):
+        source = source.routes()
+    key, part = None, []
+    for item in source:
+        book_ids = getattr(item, "book_ids", None)
+        if book_ids is None:
+            book_ids = (item.book_id,)
+        item_key = (int(item.from_library_id), int(item.to_library_id))
+        if item_key != key and part:
+            yield (*key, part)
+            part = []
+        key = item_key
+        for book_id in book_ids:
+            part.append(int(book_id))
+            if len(part) == chunk_size:
+                yield (*key, part)
+                part = []
+    if part:
+        yield (*key, part)
+
+
+def write_plan(source, path, library_names, titles, fmt=None, chunk_size=10000) -> int:
+    """
+    Выгрузить в path план (Plan или ArrayPlan) или поток переносов либо
+    маршрутов (manager.iter_moves()). library_names — {id: имя},
+    titles(book_ids) → {book_id: название}, вызывается раз на пачку.
+    Число выгруженных книг.
+    """
+    fmt = fmt or guess_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt} (есть: {', '.join(FORMATS)})")
+
+    if fmt == "columnar":
+        if not hasattr(source, "routes"):
+            # заголовку нужны все маршруты до записи — поток собирается в план
+            plan = Plan()
+            for from_id, to_id, part in _batches(source, chunk_size):
+                for book_id in part:
+                    plan.add(book_id, from_id, to_id)
+            source = plan
+        writer = ColumnarPlanWriter(
+            path,
+            library_names,
+            [
+                (route.from_library_id, route.to_library_id, route.quantity)
+                for route in source.routes()
+            ],
+        )
+    else:
+        writer = FORMATS[fmt](path, library_names)
+
+    with writer:
+        for from_id, to_id, part in _batches(source, chunk_size):
+            writer.write(from_id, to_id, part, titles(part))
+    return writer.written
@@ -0,0 +1,240 @@
+"""
+Иерархическое перераспределение: сначала между регионами, потом внутри.
+
+1. Регион (по умолчанию — район, см. sharded.by_district) сводится к
+   одной «сверхбиблиотеке»: загрузка и цель — суммы по его библиотекам.
+   Избыток регионов закрывает их недостаток — потоки между регионами
+   (region_flows), O(R log R) по числу регионов.
+2. Вывоз региона раскладывается по его донорам, ввоз — по получателям
+   (квоты). Внутри региона обычный менеджер балансирует библиотеки
+   к целям, в которые квоты уже заложены: донор оставляет у себя книги
+   на вывоз, получатель оставляет место под ввоз.
+3. Межрегиональные переносы: книги на вывоз отдаёт менеджер региона-
+   донора (pick_book — по его правилам), пары донор → получатель
+   составляются только внутри потоков шага 1.
+
+Цели — по всей сети, поэтому, если книги помещаются в сеть (их не
+больше суммарной вместимости), итоговая загрузка и число переносов —
+как у плоского запуска, но почти все пары остаются внутри региона:
+менеджер видит только библиотеки своего региона. Если книг больше,
+цели занимают всю вместимость, и менеджеры регионов распределяют
+лишние книги каждый по-своему — загрузка может отличаться от плоского
+запуска.
+"""
+
+import heapq
+from collections import defaultdict
+from typing import List
+
+from .apportion import target_loads
+from .capacity import CapacityAwareRedistributionManager
+from .move import Move, Plan
+from .records import LibraryRecord
+from .sharded import _as_row, by_district
+
+
+def region_flows(surplus):
+    """
+    {регион: избыток (>0) или недостаток (<0)} → [(откуда, куда, книг)].
+    Крупнейший избыток — крупнейшему недостатку, как в базовом менеджере.
+    """
+    order = {key: i for i, key in enumerate(surplus)}
+    donors = [(-value, order[key], key) for key, value in surplus.items() if value > 0]
+    receivers = [
+        (value, order[key], key) for key, value in surplus.items() if value < 0
+    ]
+    heapq.heapify(donors)
+    heapq.heapify(receivers)
+
+    flows = []
+    while donors and receivers:
+        give, i, donor = heapq.heappop(donors)
+        need, j, receiver = heapq.heappop(receivers)
+        quantity = min(-give, -need)
+        flows.append((donor, receiver, quantity))
+        if -give > quantity:
+            heapq.heappush(donors, (give + quantity, i, donor))
+        if -need > quantity:
+            heapq.heappush(receivers, (need + quantity, j, receiver))
+    return flows
+
+
+def _quotas(libraries, room, total):
+    """
+    Разложить total по библиотекам региона, не больше room[id] на каждую:
+    сначала самым большим. {library_id: квота}.
+    """
+    quotas = {}
+    for lib in sorted(libraries, key=lambda lib: -room[lib.id]):
+        if total <= 0:
+            break
+        share = min(room[lib.id], total)
+        if share > 0:
+            quotas[lib.id] = share
+            total -= share
+    return quotas
+
+
+class HierarchicalRebalancer:
+    """
+    Двухуровневый план: регионы, затем библиотеки внутри региона.
+    manager_class — наследник CapacityAwareRedistributionManager (по
+    умолчанию он сам), partitioner — как у ShardedRebalancer.
+    prepare(mgr) вызывается для менеджера каждого региона до его plan()
+    и возвращает менеджер (например, Instrumentation.instrument).
+    """
+
+    def __init__(
+        self,
+        libraries,
+        inventory,
+        manager_class=CapacityAwareRedistributionManager,
+        partitioner=by_district,
+        prepare=None,
+    ):
+        self.libraries = [LibraryRecord.from_library(lib) for lib in libraries]
+        self.manager_class = manager_class
+        self.prepare = prepare
+        self.regions = partitioner(self.libraries)
+
+        region_of = {
+            lib.id: key for key, members in self.regions.items() for lib in members
+        }
+        self.rows_by_region = defaultdict(list)
+        for item in inventory:
+            row = _as_row(item)
+            self.rows_by_region[region_of[row[1]]].append(row)
+
+        self.total_books = sum(len(rows) for rows in self.rows_by_region.values())
+        self.target_load = target_loads(self.libraries, self.total_books)
+
+        self.load = {}
+        self.managers = {}
+        self.flows = []
+        # число межрегиональных переносов (для отчётов)
+        self.cross_region_moves = 0
+
+    def initial_loads(self):
+        """Загрузка до плана: {library_id: книг}."""
+        load = defaultdict(int)
+        for rows in self.rows_by_region.values():
+            for row in rows:
+                load[row[1]] += 1
+        return load
+
+    def plan(self) -> Plan:
+        load = self.initial_loads()
+        surplus = {
+            lib.id: load[lib.id] - self.target_load[lib.id] for lib in self.libraries
+        }
+
+        # 1. потоки между регионами-сверхбиблиотеками
+        self.flows = region_flows(
+            {
+                key: sum(surplus[lib.id] for lib in members)
+                for key, members in self.regions.items()
+            }
+        )
+        exports = defaultdict(int)
+        imports = defaultdict(int)
+        for donor, receiver, quantity in self.flows:
+            exports[donor] += quantity
+            imports[receiver] += quantity
+
+        # 2. квоты вывоза и ввоза, план внутри каждого региона
+        give = {}
+        take = {}
+        plan = Plan()
+        for key, members in self.regions.items():
+            give[key] = _quotas(
+                members,
+                {lib.id: max(surplus[lib.id], 0) for lib in members},
+                exports[key],
+            )
+            take[key] = _quotas(
+                members,
+                {lib.id: max(-surplus[lib.id], 0) for lib in members},
+                imports[key],
+            )
+            local_target = {
+                lib.id: self.target_load[lib.id]
+                + give[key].get(lib.id, 0)
+                - take[key].get(lib.id, 0)
+                for lib in members
+            }
+            mgr = self.manager_class(
+                members, self.rows_by_region.pop(key, ()), target_load=local_target
+            )
+            if self.prepare is not None:
+                mgr = self.prepare(mgr)
+            plan.extend(mgr.plan())
+            self.managers[key] = mgr
+
+        # 3. межрегиональные переносы внутри потоков шага 1
+        for donor_region, receiver_region, quantity in self.flows:
+            plan.extend(
+                self._transfer(donor_region, receiver_region, quantity, give, take)
+            )
+
+        for mgr in self.managers.values():
+            self.load.update(mgr.load)
+        for lib in self.libraries:
+            self.load.setdefault(lib.id, 0)
+        return plan
+
+    def _transfer(self, donor_region, receiver_region, quantity, give, take) -> Plan:
+        source = self.managers[donor_region]
+        destination = self.managers[receiver_region]
+        plan = Plan()
+
+        for donor_id in list(give[donor_region]):
+            for receiver_id in list(take[receiver_region]):
+                if quantity <= 0:
+                    return plan
+                count = min(
+                    give[donor_region][donor_id],
+                    take[receiver_region][receiver_id],
+                    quantity,
+                )
+                moved = 0
+                while (
+                    moved < count
+                    and source.can_give(donor_id)
+                    and destination.can_receive(receiver_id)
+                ):
+                    book = source.pick_book(donor_id)
+                    source.load[donor_id] -= 1
+                    destination.load[receiver_id] += 1
+                    destination.books_by_library[receiver_id].append(book)
+                    # on_move_planned — о библиотеках одного менеджера,
+                    # здесь каждый узнаёт о своей половине переноса
+                    source.on_book_given(donor_id, book)
+                    destination.on_book_taken(receiver_id, book)
+                    plan.add(book.id, donor_id, receiver_id)
+                    moved += 1
+
+                self.cross_region_moves += moved
+                quantity -= moved
+                give[donor_region][donor_id] -= moved
+                take[receiver_region][receiver_id] -= moved
+                if not take[receiver_region][receiver_id] or not (
+                    destination.can_receive(receiver_id)
+                ):
+                    # квота исчерпана или получатель заполнен — остаток
+                    # донора переходит к следующему получателю
+                    del take[receiver_region][receiver_id]
+                if not give[donor_region][donor_id] or not source.can_give(donor_id):
+                    break
+        return plan
+
+    @property
+    def books_by_library(self):
+        """Книги по библиотекам после plan() — регионы не пересекаются."""
+        books = {}
+        for mgr in self.managers.values():
+            books.update(mgr.books_by_library)
+        return books
+
+    def rebalance(self) -> List[Move]:
+        """Совместимость: поштучный список переносов."""
+        return self.plan().moves()
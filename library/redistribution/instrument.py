@@ -0,0 +1,105 @@
+"""
+Замеры прогона перераспределения: фазы, проходы, хуки, SQL, память.
+
+Таймеры фаз включены всегда — их единицы на прогон. Хуки менеджера
+оборачиваются только при enabled=True: обёртка ставится на экземпляр
+и заслоняет метод класса, поэтому без замеров горячий цикл не меняется.
+"""
+
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+HOOKS = ("can_receive", "can_give", "pick_book", "on_move_planned")
+
+
+def peak_memory_mb():
+    """Пиковый RSS процесса в МБ (None, если платформа не сообщает)."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux — килобайты, macOS — байты
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def _timed(method, entry):
+    def wrapper(*args):
+        started = perf_counter()
+        try:
+            return method(*args)
+        finally:
+            entry[0] += 1
+            entry[1] += perf_counter() - started
+
+    return wrapper
+
+
+class Instrumentation:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.phases = {}
+        self.counters = {}
+        # имя хука → [вызовов, секунд]
+        self.hooks = {}
+        # False — хуки выполнялись вне процесса (шарды) и не замерены
+        self.hooks_measured = True
+        self.queries = [0, 0.0]
+
+    @contextmanager
+    def phase(self, name: str):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + perf_counter() - started
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def instrument(self, manager):
+        """Считать вызовы и время хуков менеджера (только при enabled)."""
+        if self.enabled:
+            for name in HOOKS:
+                entry = self.hooks.setdefault(name, [0, 0.0])
+                setattr(manager, name, _timed(getattr(manager, name), entry))
+        return manager
+
+    def collect(self, manager):
+        """Счётчики проходов планировщика после plan()."""
+        self.count("passes", getattr(manager, "passes", 0))
+        self.count("pairings", getattr(manager, "pairings", 0))
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        """Для connection.execute_wrapper: число и время SQL-запросов."""
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries[0] += 1
+            self.queries[1] += perf_counter() - started
+
+    def report(self) -> dict:
+        report = {
+            "phases": {name: round(t, 6) for name, t in self.phases.items()},
+            "counters": dict(self.counters),
+            "peak_memory_mb": peak_memory_mb(),
+        }
+        if self.enabled:
+            report["hooks"] = (
+                {
+                    name: {"calls": calls, "seconds": round(t, 6)}
+                    for name, (calls, t) in self.hooks.items()
+                }
+                if self.hooks_measured
+                else "n/a"
+            )
+            report["sql"] = {
+                "queries": self.queries[0],
+                "seconds": round(self.queries[1], 6),
+            }
+        return report
@@ -0,0 +1,319 @@
+"""
+Перераспределение с минимальной стоимостью перевозки.
+
+Задача решается как транспортная (min-cost flow): доноры отдают избыток,
+получатели принимают недостаток в пределах свободного места,
+стоимость ребра — расстояние между библиотеками или значение из матрицы.
+Маршрут без стоимости (нет в матрице, нет координат) запрещён — inf.
+Решатель — сетевой симплекс для транспортной задачи
+(начальный план методом минимального элемента).
+"""
+
+from typing import Iterator
+
+import numpy as np
+
+from .capacity import CapacityAwareRedistributionManager
+from .move import Move
+
+# километров в градусе широты
+KM_PER_DEGREE = 111.32
+
+# клеток в блоке при поиске входящей клетки и в пачке начального плана
+BLOCK_CELLS = 4096
+INITIAL_CHUNK = 65536
+
+
+def distance_matrix(sources, targets) -> np.ndarray:
+    """
+    Расстояния в км между библиотеками по latitude/longitude
+    (равнопромежуточная проекция — для города этого достаточно).
+    Если у библиотеки нет координат, расстояние до неё неизвестно — inf.
+    """
+
+    def coords(libraries):
+        lat = np.array(
+            [getattr(lib, "latitude", None) for lib in libraries], dtype=np.float64
+        )
+        lon = np.array(
+            [getattr(lib, "longitude", None) for lib in libraries], dtype=np.float64
+        )
+        return lat, lon
+
+    src_lat, src_lon = coords(sources)
+    dst_lat, dst_lon = coords(targets)
+
+    mean_lat = np.radians((src_lat[:, None] + dst_lat[None, :]) / 2)
+    dx = (src_lon[:, None] - dst_lon[None, :]) * np.cos(mean_lat)
+    dy = src_lat[:, None] - dst_lat[None, :]
+
+    return np.nan_to_num(np.hypot(dx, dy) * KM_PER_DEGREE, nan=np.inf)
+
+
+def missing_coordinates(libraries):
+    """Библиотеки без latitude/longitude — до них нет расстояний."""
+    return [
+        lib
+        for lib in libraries
+        if getattr(lib, "latitude", None) is None
+        or getattr(lib, "longitude", None) is None
+    ]
+
+
+def _initial_basis(supply, demand, cost):
+    """
+    Начальный опорный план методом минимального элемента.
+    Каждое назначение вычёркивает ровно одну строку или столбец,
+    поэтому базис — остовное дерево из m + n - 1 клеток (часть — нулевые).
+    """
+    m, n = cost.shape
+    supply = supply.tolist()
+    demand = demand.tolist()
+    row_done = np.zeros(m, dtype=bool)
+    col_done = np.zeros(n, dtype=bool)
+    rows_left = m
+
+    flow = np.zeros((m, n), dtype=np.int64)
+    basis = []
+
+    order = np.argsort(cost, axis=None, kind="stable")
+    for chunk_start in range(0, len(order), INITIAL_CHUNK):
+        chunk = order[chunk_start : chunk_start + INITIAL_CHUNK]
+        rows, cols = np.divmod(chunk, n)
+        # вычеркнутые строки и столбцы отсеиваем векторно
+        alive = ~(row_done[rows] | col_done[cols])
+
+        for i, j in zip(rows[alive].tolist(), cols[alive].tolist()):
+            if row_done[i] or col_done[j]:
+                continue
+
+            amount = min(supply[i], demand[j])
+            flow[i, j] = amount
+            supply[i] -= amount
+            demand[j] -= amount
+            basis.append((i, j))
+
+            if len(basis) == m + n - 1:
+                return flow, basis
+
+            if supply[i] == 0 and rows_left > 1:
+                row_done[i] = True
+                rows_left -= 1
+            else:
+                col_done[j] = True
+
+    return flow, basis
+
+
+def _transportation_simplex(supply, demand, cost):
+    """
+    Сетевой симплекс для сбалансированной транспортной задачи.
+
+    Узлы 0..m-1 — доноры, m..m+n-1 — получатели; базис хранится деревом
+    (parent/depth), потенциалы u, v — массивами. Входящая клетка ищется
+    блоками строк, после поворота потенциалы и родители пересчитываются
+    только в отделившемся поддереве.
+    """
+    m, n = cost.shape
+    flow, basis = _initial_basis(supply, demand, cost)
+    costs = cost.tolist()
+
+    def cell(x, y):
+        return (x, y - m) if x < m else (y, x - m)
+
+    adj = [set() for _ in range(m + n)]
+    for i, j in basis:
+        adj[i].add(m + j)
+        adj[m + j].add(i)
+
+    # дерево и потенциалы от корня — донора 0
+    parent = [-1] * (m + n)
+    depth = [0] * (m + n)
+    potential = [0.0] * (m + n)
+    stack = [0]
+    while stack:
+        x = stack.pop()
+        for y in adj[x]:
+            if y != parent[x]:
+                parent[y] = x
+                depth[y] = depth[x] + 1
+                i, j = cell(x, y)
+                potential[y] = costs[i][j] - potential[x]
+                stack.append(y)
+
+    u = np.array(potential[:m])
+    v = np.array(potential[m:])
+
+    eps = 1e-9 * (1.0 + float(np.abs(cost).max()))
+    block = max(1, min(m, BLOCK_CELLS // max(n, 1) + 1))
+    blocks = -(-m // block)
+    start = 0
+
+    while True:
+        # поиск входящей клетки с отрицательной приведённой стоимостью
+        entering = None
+        for _ in range(blocks):
+            stop = min(start + block, m)
+            reduced = cost[start:stop] - u[start:stop, None] - v[None, :]
+            k = int(np.argmin(reduced))
+            value = float(reduced.flat[k])
+            lo = start
+            start = stop if stop < m else 0
+            if value < -eps:
+                entering = (lo + k // n, k % n, value)
+                break
+
+        if entering is None:
+            return flow
+
+        i, j, value = entering
+
+        # цикл: путь в дереве от получателя j до донора i
+        a, b = i, m + j
+        up_a, up_b = [], []
+        while a != b:
+            if depth[a] >= depth[b]:
+                up_a.append(a)
+                a = parent[a]
+            else:
+                up_b.append(b)
+                b = parent[b]
+        path = up_b + up_a[::-1]
+
+        # знаки чередуются: входящая "+", первое ребро от j "-", ...
+        theta = None
+        leaving = None
+        for k in range(0, len(path), 2):
+            x = path[k]
+            ci, cj = cell(x, parent[x])
+            if theta is None or flow[ci, cj] < theta:
+                theta = int(flow[ci, cj])
+                leaving = x
+
+        if theta:
+            flow[i, j] += theta
+            for k, x in enumerate(path):
+                ci, cj = cell(x, parent[x])
+                flow[ci, cj] += -theta if k % 2 == 0 else theta
+
+        # ребро leaving — parent[leaving] уходит из базиса. Отделившееся
+        # поддерево — потомки leaving; входящая клетка цепляет его той
+        # вершиной, на чьей стороне цикла лежит leaving.
+        adj[leaving].discard(parent[leaving])
+        adj[parent[leaving]].discard(leaving)
+        adj[i].add(m + j)
+        adj[m + j].add(i)
+
+        inner, outer = (i, m + j) if leaving in up_a else (m + j, i)
+
+        parent[inner] = outer
+        depth[inner] = depth[outer] + 1
+        subtree = [inner]
+        for x in subtree:
+            for y in adj[x]:
+                if y != parent[x]:
+                    parent[y] = x
+                    depth[y] = depth[x] + 1
+                    subtree.append(y)
+
+        # потенциалы: u_i + v_j = c_ij на входящем ребре
+        sign = 1.0 if inner < m else -1.0
+        rows = [x for x in subtree if x < m]
+        cols = [x - m for x in subtree if x >= m]
+        u[rows] += sign * value
+        v[cols] -= sign * value
+
+
+def min_cost_flow(supply, demand, cost) -> np.ndarray:
+    """
+    Транспортная задача: supply[i] от доноров, demand[j] к получателям,
+    cost[i, j] — цена единицы, inf — маршрут запрещён. Возвращает матрицу
+    потоков flow[i, j]. Объём потока — min(sum(supply), sum(demand)):
+    несбалансированная задача дополняется фиктивным донором или получателем
+    с нулевой ценой. Если объём не провезти по разрешённым маршрутам,
+    остаток не везётся (его поток в матрице — нули).
+    """
+    supply = np.array(supply, dtype=np.int64)
+    demand = np.array(demand, dtype=np.int64)
+    cost = np.asarray(cost, dtype=np.float64).reshape(len(supply), len(demand))
+
+    m, n = cost.shape
+    forbidden = ~np.isfinite(cost)
+    if forbidden.all():
+        return np.zeros((m, n), dtype=np.int64)
+    if forbidden.any():
+        # штраф дороже любого плана по разрешённым маршрутам: запрещённые
+        # клетки получают поток, только если без них задачу не решить
+        allowed = cost[~forbidden]
+        penalty = (float(np.abs(allowed).max()) + 1.0) * (
+            float(min(supply.sum(), demand.sum())) + 1.0
+        )
+        cost = np.where(forbidden, penalty, cost)
+    total_supply = int(supply.sum())
+    total_demand = int(demand.sum())
+
+    if min(total_supply, total_demand) <= 0:
+        return np.zeros((m, n), dtype=np.int64)
+
+    if total_supply > total_demand:
+        demand = np.append(demand, total_supply - total_demand)
+        cost = np.hstack([cost, np.zeros((m, 1))])
+    elif total_demand > total_supply:
+        supply = np.append(supply, total_demand - total_supply)
+        cost = np.vstack([cost, np.zeros((1, n))])
+
+    flow = _transportation_simplex(supply, demand, cost)[:m, :n]
+    flow[forbidden] = 0
+    return flow
+
+
+class MinCostRedistributionManager(CapacityAwareRedistributionManager):
+    """
+    Менеджер, минимизирующий суммарную стоимость перевозок.
+
+    Цели и ограничения — как у CapacityAwareRedistributionManager,
+    но пары донор → получатель выбирает решатель min-cost flow.
+    Объёмы по маршрутам — plan().routes().
+
+    cost_matrix — необязательный словарь {(from_id, to_id): стоимость};
+    без него стоимость — расстояние по координатам библиотек. Пары без
+    стоимости запрещены; книги, которые по разрешённым маршрутам не
+    провезти, остаются на месте — их число в unrouted.
+    """
+
+    def __init__(self, libraries, inventory, target_load=None, cost_matrix=None):
+        super().__init__(libraries, inventory, target_load)
+        self.cost_matrix = cost_matrix
+        self.unrouted = 0
+
+    def route_costs(self, donor_ids, receiver_ids) -> np.ndarray:
+        if self.cost_matrix is None:
+            return distance_matrix(
+                [self.libraries[i] for i in donor_ids],
+                [self.libraries[i] for i in receiver_ids],
+            )
+
+        return np.array(
+            [
+                [self.cost_matrix.get((d, r), np.inf) for r in receiver_ids]
+                for d in donor_ids
+            ],
+            dtype=np.float64,
+        )
+
+    def iter_moves(self) -> Iterator[Move]:
+        donor_ids = [i for i in self.libraries if self._surplus(i) > 0]
+        receiver_ids = [i for i in self.libraries if self._surplus(i) < 0]
+
+        supply = [
+            min(self._surplus(i), len(self.books_by_library[i])) for i in donor_ids
+        ]
+        demand = [max(min(-self._surplus(i), self.free[i]), 0) for i in receiver_ids]
+
+        flow = min_cost_flow(supply, demand, self.route_costs(donor_ids, receiver_ids))
+        self.unrouted = min(sum(supply), sum(demand)) - int(flow.sum())
+
+        self.passes += 1
+        for d, r in zip(*np.nonzero(flow)):
+            self.pairings += 1
+            yield from self._transfer(donor_ids[d], receiver_ids[r], int(flow[d, r]))
@@ -1,9 +1,78 @@
+from array import array
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Move:
     book_id: int
     from_library_id: int
     to_library_id: int
     quantity: int = 1
+
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    """Все книги одного маршрута from → to: компактный массив id."""
+
+    from_library_id: int
+    to_library_id: int
+    book_ids: array
+
+    @property
+    def quantity(self) -> int:
+        return len(self.book_ids)
+
+
+class Plan:
+    """
+    Сводный план: по одной записи на маршрут (from, to) с массивом book_id.
+    Вместо объекта на каждую книгу — 8 байт на книгу.
+    Каждая книга входит в план не больше одного раза.
+    """
+
+    def __init__(self):
+        self._routes = {}
+
+    @classmethod
+    def from_moves(cls, moves):
+        plan = cls()
+        for move in moves:
+            plan.add(move.book_id, move.from_library_id, move.to_library_id)
+        return plan
+
+    def add(self, book_id: int, from_library_id: int, to_library_id: int):
+        key = (from_library_id, to_library_id)
+        book_ids = self._routes.get(key)
+        if book_ids is None:
+            book_ids = self._routes[key] = array("q")
+        book_ids.append(book_id)
+
+    def extend(self, other: "Plan"):
+        for key, book_ids in other._routes.items():
+            self._routes.setdefault(key, array("q")).extend(book_ids)
+
+    def routes(self):
+        for (from_id, to_id), book_ids in self._routes.items():
+            yield Route(from_id, to_id, book_ids)
+
+    def __iter__(self):
+        """Поштучные переносы — по одному Move за раз."""
+        for (from_id, to_id), book_ids in self._routes.items():
+            for book_id in book_ids:
+                yield Move(
+                    book_id=book_id, from_library_id=from_id, to_library_id=to_id
+                )
+
+    def moves(self):
+        """Совместимость: план списком Move."""
+        return list(self)
+
+    def __len__(self):
+        return sum(len(book_ids) for book_ids in self._routes.values())
+
+    def books_by_destination(self):
+        """{library_id: [book_id, ...]} — для пакетного сохранения."""
+        result = {}
+        for (_, to_id), book_ids in self._routes.items():
+            result.setdefault(to_id, []).extend(book_ids)
+        return result
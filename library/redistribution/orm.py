@@ -0,0 +1,188 @@
+"""
+Тонкий адаптер Django ORM для ядра перераспределения.
+
+Ядро (остальные модули пакета) работает с записями и кортежами и
+Django не импортирует; только этот модуль читает их из базы.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import islice
+
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from library import journal
+from library.models import Book, Library, LibraryBook
+
+from .records import LibraryRecord
+from .snapshot import InventorySnapshot, SnapshotWriter, read_header
+
+
+class StaleSnapshot(Exception):
+    """Файл снимка снят с другой версии данных, чем в базе сейчас."""
+
+
+def library_records(queryset=None):
+    """Библиотеки как LibraryRecord — без экземпляров моделей."""
+    if queryset is None:
+        queryset = Library.objects.all()
+    return [
+        LibraryRecord(*values)
+        for values in queryset.values_list(
+            "id", "capacity", "district", "latitude", "longitude"
+        )
+    ]
+
+
+def iter_inventory_rows(chunk_size: int = 10000, library_ids=None, details=False):
+    """
+    Потоково читает размещение книг кортежами (book_id, library_id, year),
+    не создавая экземпляров моделей. library_ids — только эти библиотеки.
+    details — добавить author_id и title (для политик, см. policies.py).
+    """
+    fields = ["book_id", "library_id", "book__year"]
+    if details:
+        fields += ["book__author_id", "book__title"]
+    rows = LibraryBook.objects.values_list(*fields)
+    if library_ids is not None:
+        rows = rows.filter(library_id__in=library_ids)
+    return rows.order_by().iterator(chunk_size=chunk_size)
+
+
+def iter_leaving_rows(surplus, manager_class):
+    """
+    Только книги, которые доноры отдадут: по {library_id: избыток} —
+    не больше избытка строк на донора, в порядке, в котором их выбрал бы
+    менеджер manager_class по всем книгам донора (см. его leaving).
+    Один запрос с номером строки внутри донора; читается O(избытка),
+    а не O(книг доноров).
+    """
+    if not surplus:
+        return
+    leaving = manager_class.leaving
+    if leaving == "priority":
+        # priority_key: (year > PRIORITY_YEAR, year) по убыванию,
+        # при равных ключах первой уезжает прочитанная раньше
+        new = Case(
+            When(book__year__gt=manager_class.PRIORITY_YEAR, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        order = [F("new").desc(), F("book__year").desc(), F("id").asc()]
+    elif leaving == "last":
+        # pop() с конца: последние строки, ниже разворачиваются в прежний порядок
+        new = Value(0, output_field=IntegerField())
+        order = [F("id").desc()]
+    else:
+        raise ValueError(f"Книги донора заранее не известны: leaving={leaving!r}")
+
+    quota = Case(
+        *(
+            When(library_id=library_id, then=Value(n))
+            for library_id, n in surplus.items()
+        ),
+        output_field=IntegerField(),
+    )
+    rows = (
+        LibraryBook.objects.filter(library_id__in=list(surplus))
+        .annotate(
+            new=new,
+            quota=quota,
+            rank=Window(RowNumber(), partition_by=F("library_id"), order_by=order),
+        )
+        .filter(rank__lte=F("quota"))
+        .order_by("library_id", "rank")
+        .values_list("book_id", "library_id", "book__year")
+    )
+    by_library = defaultdict(list)
+    for row in rows:
+        by_library[row[1]].append(row)
+    for library_id in surplus:
+        chosen = by_library.pop(library_id, [])
+        yield from reversed(chosen) if leaving == "last" else chosen
+
+
+def library_names() -> dict:
+    """{library_id: название} — один запрос на всю выгрузку плана."""
+    return dict(Library.objects.values_list("id", "name"))
+
+
+def book_titles(book_ids) -> dict:
+    """{book_id: название} для пачки книг — один запрос на пачку."""
+    return dict(Book.objects.filter(id__in=book_ids).values_list("id", "title"))
+
+
+def inventory_snapshot(chunk_size: int = 10000):
+    """Вся сеть из базы одним снимком в массивах (см. snapshot.py)."""
+    return InventorySnapshot.from_rows(
+        library_records(), iter_inventory_rows(chunk_size=chunk_size)
+    )
+
+
+@contextmanager
+def consistent_read(using=DEFAULT_DB_ALIAS):
+    """
+    Транзакция, все запросы которой видят один и тот же снимок базы.
+    PostgreSQL по умолчанию (READ COMMITTED) видит новый снимок на каждый
+    запрос — уровень поднимается до REPEATABLE READ. SQLite и InnoDB
+    держат снимок с первого чтения транзакции и так. Внутри уже начатой
+    транзакции уровень не меняется — он за внешней.
+    """
+    connection = connections[using]
+    outer = connection.in_atomic_block
+    with transaction.atomic(using=using):
+        if not outer and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def export_snapshot(path, chunk_size: int = 100000):
+    """
+    Сеть из базы в файл снимка (snapshot.SnapshotWriter) потоково:
+    память — O(chunk_size). Отметка — версия данных (DataVersion) до
+    начала чтения: изменения во время выгрузки делают файл устаревшим,
+    а не «свежим, но неверным». Отметка, число книг и сами строки
+    читаются в одном снимке базы (consistent_read).
+    Возвращает (отметка, число книг).
+    """
+    with consistent_read():
+        marker = journal.version()
+        libraries = library_records()
+        n_books = LibraryBook.objects.count()
+        rows = (
+            LibraryBook.objects.values_list(
+                "book_id", "library_id", "book__year", "book__author_id"
+            )
+            .order_by()
+            .iterator(chunk_size=chunk_size)
+        )
+        with SnapshotWriter(path, libraries, n_books, marker) as writer:
+            while chunk := list(islice(rows, chunk_size)):
+                book_id, library_id, year, author_id = np.array(chunk, dtype=np.int64).T
+                writer.append(
+                    book_id=book_id,
+                    library_id=library_id,
+                    year=year,
+                    author_id=author_id,
+                )
+    return marker, n_books
+
+
+def is_stale(path) -> bool:
+    """Сравнить отметку файла с версией данных — по заголовку, без колонок."""
+    return read_header(path)["marker"] != journal.version()
+
+
+def open_snapshot(path, allow_stale: bool = False) -> InventorySnapshot:
+    """Снимок из файла; устаревший — StaleSnapshot, если не allow_stale."""
+    snapshot = InventorySnapshot.open(path)
+    current = journal.version()
+    if not allow_stale and snapshot.marker != current:
+        raise StaleSnapshot(
+            f"{path}: снимок версии {snapshot.marker}, данные — версии {current}"
+        )
+    return snapshot
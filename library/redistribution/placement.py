@@ -0,0 +1,54 @@
+"""
+Первичное размещение книг по библиотекам.
+
+Каждая стратегия получает вместимости библиотек (в порядке списка)
+и число книг и возвращает для каждой книги позицию библиотеки.
+Всё считается векторно, без обращений к БД.
+"""
+
+import numpy as np
+
+from .apportion import capped_largest_remainder
+
+
+def first_fit(capacities, n_books: int) -> np.ndarray:
+    """Заполняем библиотеки по очереди: следующая — когда предыдущая полна."""
+    bounds = np.cumsum(np.asarray(capacities, dtype=np.int64))
+    return np.searchsorted(bounds, np.arange(n_books), side="right")
+
+
+def proportional(capacities, n_books: int) -> np.ndarray:
+    """Сразу пропорционально вместимости (метод наибольших остатков)."""
+    capacities = np.asarray(capacities, dtype=np.int64)
+    counts = capped_largest_remainder(n_books, capacities, capacities)
+    return np.repeat(np.arange(len(capacities)), counts)
+
+
+def round_robin(capacities, n_books: int) -> np.ndarray:
+    """По одной книге в каждую библиотеку по кругу, заполненные пропускаются."""
+    capacities = np.asarray(capacities, dtype=np.int64)
+    library = np.repeat(np.arange(len(capacities)), capacities)
+    starts = np.cumsum(capacities) - capacities
+    round_no = np.arange(len(library)) - np.repeat(starts, capacities)
+    slots = np.lexsort((library, round_no))
+    return library[slots[:n_books]]
+
+
+STRATEGIES = {
+    "first-fit": first_fit,
+    "proportional": proportional,
+    "round-robin": round_robin,
+}
+
+
+def place(strategy: str, capacities, n_books: int) -> np.ndarray:
+    """
+    Позиции библиотек для n_books книг.
+    Если мест не хватает, ValueError — до каких-либо изменений в БД.
+    """
+    total_capacity = int(np.sum(capacities))
+    if n_books > total_capacity:
+        raise ValueError(
+            f"Не хватает мест: книг {n_books}, суммарная вместимость {total_capacity}"
+        )
+    return STRATEGIES[strategy](capacities, n_books)
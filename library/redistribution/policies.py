@@ -0,0 +1,330 @@
+"""
+Декларативные политики выбора книги, которую отдаёт донор.
+
+Политика — правила с весами и ограничения:
+
+    newest:year=1950            новые (год > year) уезжают раньше старых
+    spread-authors:weight=2     раньше уезжают книги автора, которого
+                                у донора много, — авторы расходятся по филиалам
+    duplicates:weight=5         раньше уезжают повторяющиеся названия
+    keep-era:year=1950,minimum=3
+                                у библиотеки остаётся не меньше minimum
+                                книг не новее year
+
+Оценка книги — взвешенная сумма правил, при равенстве раньше уезжает
+более новая, затем стоявшая раньше. Политика newest:year=1950 даёт ровно
+план PriorityRedistributionManager.
+
+Политика компилируется в таблицы и счётчики: статическая часть оценки
+(зависит только от книги) считается один раз на донора и лежит в куче,
+динамическая (книг автора у донора, копий названия, книг эпохи) читается
+из счётчиков, которые сдвигаются на каждом переносе. Любая проверка —
+O(1), books_by_library не просматривается.
+"""
+
+import heapq
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+
+from .capacity import CapacityAwareRedistributionManager
+from .priority import PriorityRedistributionManager
+
+
+def title_key(title: str) -> str:
+    """Названия-дубликаты: без регистра и крайних пробелов."""
+    return title.strip().casefold()
+
+
+class Rule(ABC):
+    """
+    Правило оценки книги у донора: чем больше, тем раньше книга уезжает.
+    static — оценка зависит только от книги и считается один раз.
+    counts — какие счётчики нужны правилу ("author", "title").
+
+    Вес не отрицательный: ленивая куча менеджера опирается на то, что
+    динамические оценки донора только убывают.
+    """
+
+    name = ""
+    static = True
+    counts = ()
+
+    def __init__(self, weight: float = 1.0):
+        weight = float(weight)
+        # not >= — заодно отсекает NaN
+        if not weight >= 0:
+            raise ValueError(f"{self.name}: вес должен быть не меньше 0, а не {weight}")
+        self.weight = weight
+
+    @abstractmethod
+    def score(self, book, counters, library_id) -> float:
+        """Оценка книги book у донора library_id."""
+
+
+class NewestFirst(Rule):
+    name = "newest"
+
+    def __init__(
+        self, year: int = PriorityRedistributionManager.PRIORITY_YEAR, weight=1.0
+    ):
+        super().__init__(weight)
+        self.year = int(year)
+
+    def score(self, book, counters, library_id):
+        return float(book.year > self.year)
+
+
+class SpreadAuthors(Rule):
+    name = "spread-authors"
+    static = False
+    counts = ("author",)
+
+    def score(self, book, counters, library_id):
+        # сколько ещё книг того же автора останется у донора
+        return counters.authors[library_id][book.author_id] - 1
+
+
+class DuplicateTitles(Rule):
+    name = "duplicates"
+    static = False
+    counts = ("title",)
+
+    def score(self, book, counters, library_id):
+        return float(counters.titles[library_id][title_key(book.title)] > 1)
+
+
+class KeepEra:
+    """Ограничение: у библиотеки не меньше minimum книг не новее year."""
+
+    name = "keep-era"
+
+    def __init__(
+        self, year: int = PriorityRedistributionManager.PRIORITY_YEAR, minimum=1
+    ):
+        self.year = int(year)
+        self.minimum = int(minimum)
+
+    def protects(self, book) -> bool:
+        return book.year <= self.year
+
+
+RULES = {
+    cls.name: cls for cls in (NewestFirst, SpreadAuthors, DuplicateTitles, KeepEra)
+}
+
+
+class Policy:
+    def __init__(self, rules=(), keep=()):
+        self.rules = list(rules)
+        self.keep = list(keep)
+        self.static_rules = [rule for rule in self.rules if rule.static]
+        self.dynamic_rules = [rule for rule in self.rules if not rule.static]
+        self.counts = {name for rule in self.rules for name in rule.counts}
+
+    @classmethod
+    def default(cls):
+        """Правило PriorityRedistributionManager."""
+        return cls([NewestFirst()])
+
+    @classmethod
+    def from_config(cls, items):
+        """Из списка {"rule": имя, параметры...}, например из JSON."""
+        rules, keep = [], []
+        for item in items:
+            params = dict(item)
+            name = params.pop("rule")
+            if name not in RULES:
+                raise ValueError(
+                    f"Неизвестное правило: {name} (есть: {', '.join(RULES)})"
+                )
+            try:
+                rule = RULES[name](**params)
+            except TypeError as e:
+                raise ValueError(f"{name}: {e}")
+            (keep if isinstance(rule, KeepEra) else rules).append(rule)
+        return cls(rules, keep)
+
+    @classmethod
+    def parse(cls, specs):
+        """Из строк "имя:параметр=значение,...", например "keep-era:minimum=3"."""
+        items = []
+        for spec in specs:
+            name, _, params = spec.partition(":")
+            item = {"rule": name.strip()}
+            for pair in filter(None, params.split(",")):
+                key, sep, value = pair.partition("=")
+                if not sep:
+                    raise ValueError(f"{spec}: ожидается параметр=значение")
+                item[key.strip()] = float(value)
+            items.append(item)
+        return cls.from_config(items)
+
+    @property
+    def needs_details(self) -> bool:
+        """Нужны ли книгам автор и название (orm.iter_inventory_rows(details=True))."""
+        return bool(self.counts)
+
+    def static_score(self, book) -> float:
+        score = 0.0
+        for rule in self.static_rules:
+            score += rule.weight * rule.score(book, None, None)
+        return score
+
+    def dynamic_score(self, book, counters, library_id) -> float:
+        score = 0.0
+        for rule in self.dynamic_rules:
+            score += rule.weight * rule.score(book, counters, library_id)
+        return score
+
+
+class PolicyCounters:
+    """
+    Счётчики по библиотекам, нужные политике: книги автора, копии
+    названия, книги каждой охраняемой эпохи. Строятся одним проходом
+    по книгам и сдвигаются на каждом переносе.
+    """
+
+    def __init__(self, policy, books_by_library):
+        self.policy = policy
+        self.authors = defaultdict(Counter)
+        self.titles = defaultdict(Counter)
+        # по ограничению keep-era: {library_id: книг эпохи}
+        self.eras = [defaultdict(int) for _ in policy.keep]
+        self._authors = "author" in policy.counts
+        self._titles = "title" in policy.counts
+        # только статические правила — счётчики не нужны
+        self.active = bool(policy.counts or policy.keep)
+
+        if self.active:
+            for library_id, books in books_by_library.items():
+                for book in books:
+                    self._add(book, library_id, 1)
+
+    def _add(self, book, library_id, delta):
+        if self._authors:
+            self.authors[library_id][book.author_id] += delta
+        if self._titles:
+            self.titles[library_id][title_key(book.title)] += delta
+        for constraint, era in zip(self.policy.keep, self.eras):
+            if constraint.protects(book):
+                era[library_id] += delta
+
+    def move(self, book, donor_id, receiver_id):
+        if self.active:
+            self._add(book, donor_id, -1)
+            self._add(book, receiver_id, 1)
+
+    def give(self, book, donor_id):
+        """Половина move: получатель — у другого менеджера."""
+        if self.active:
+            self._add(book, donor_id, -1)
+
+    def take(self, book, receiver_id):
+        """Половина move: донор — у другого менеджера."""
+        if self.active:
+            self._add(book, receiver_id, 1)
+
+
+class PolicyRedistributionManager(CapacityAwareRedistributionManager):
+    """
+    Менеджер с политикой выбора книги (см. docstring модуля).
+    Алгоритм переносов — как у CapacityAwareRedistributionManager.
+
+    Книги донора лежат в куче по (оценка, год, исходная позиция).
+    Динамические оценки у донора только убывают (он только отдаёт),
+    поэтому куча ленивая: устаревшая вершина пересчитывается и
+    возвращается в кучу, остальные записи не трогаются.
+    """
+
+    # оценка книги зависит от остальных книг донора
+    leaving = None
+
+    def __init__(self, libraries, inventory, target_load=None, policy=None):
+        super().__init__(libraries, inventory, target_load)
+        self.policy = policy or Policy.default()
+        self.counters = PolicyCounters(self.policy, self.books_by_library)
+        # донор → куча книг; донор → {book.id: индекс в books_by_library}
+        self._queues = {}
+        self._positions = {}
+        self._picked = None
+
+    def _queue(self, library_id):
+        heap = self._queues.get(library_id)
+        if heap is None:
+            books = self.books_by_library[library_id]
+            dynamic = self.policy.dynamic_rules
+            heap = []
+            for pos, book in enumerate(books):
+                static = self.policy.static_score(book)
+                score = static
+                if dynamic:
+                    score += self.policy.dynamic_score(book, self.counters, library_id)
+                heap.append((-score, -book.year, pos, static, book))
+            heapq.heapify(heap)
+            self._queues[library_id] = heap
+            self._positions[library_id] = {book.id: i for i, book in enumerate(books)}
+        return heap
+
+    def _eligible(self, book, library_id) -> bool:
+        for constraint, era in zip(self.policy.keep, self.counters.eras):
+            if constraint.protects(book) and era[library_id] <= constraint.minimum:
+                return False
+        return True
+
+    def _top(self, library_id):
+        """
+        Вершина кучи с актуальной оценкой или None. Охраняемые книги
+        уходят из кучи навсегда: счётчик эпохи у донора не растёт.
+        """
+        heap = self._queue(library_id)
+        dynamic = bool(self.policy.dynamic_rules)
+        while heap:
+            neg_score, neg_year, pos, static, book = heap[0]
+            if not self._eligible(book, library_id):
+                heapq.heappop(heap)
+                continue
+            if dynamic:
+                score = static + self.policy.dynamic_score(
+                    book, self.counters, library_id
+                )
+                if score != -neg_score:
+                    heapq.heapreplace(heap, (-score, neg_year, pos, static, book))
+                    continue
+            return book
+        return None
+
+    def can_give(self, library_id: int) -> bool:
+        return self._top(library_id) is not None
+
+    def pick_book(self, donor_id: int):
+        book = self._top(donor_id)
+        heapq.heappop(self._queues[donor_id])
+
+        # удалить из books_by_library за O(1): на место книги — последнюю
+        books = self.books_by_library[donor_id]
+        positions = self._positions[donor_id]
+        index = positions.pop(book.id)
+        last = books.pop()
+        if last is not book:
+            books[index] = last
+            positions[last.id] = index
+
+        self._picked = book
+        return book
+
+    def on_move_planned(self, donor_id: int, receiver_id: int):
+        super().on_move_planned(donor_id, receiver_id)
+        self.counters.move(self._picked, donor_id, receiver_id)
+        # получатель дописал книгу — его куча, если была, устарела
+        self._queues.pop(receiver_id, None)
+        self._positions.pop(receiver_id, None)
+
+    def on_book_given(self, donor_id: int, book):
+        super().on_book_given(donor_id, book)
+        self.counters.give(book, donor_id)
+
+    def on_book_taken(self, receiver_id: int, book):
+        super().on_book_taken(receiver_id, book)
+        self.counters.take(book, receiver_id)
+        self._queues.pop(receiver_id, None)
+        self._positions.pop(receiver_id, None)
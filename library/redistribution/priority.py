@@ -1,4 +1,3 @@
-from typing import List
 from .capacity import CapacityAwareRedistributionManager
 
 
@@ -7,30 +6,55 @@ class PriorityRedistributionManager(CapacityAwareRedistributionManager):
     Менеджер перераспределения с приоритетами.
     Он меняет ТОЛЬКО стратегию выбора книги (pick_book),
     а сам алгоритм rebalance полностью наследует от CapacityAwareRedistributionManager.
+
+    Чтобы задать другую политику (по автору, названию и т.п.),
+    достаточно переопределить priority_key.
     """
 
     PRIORITY_YEAR = 1950
+    # наследник с другим priority_key задаёт leaving = None
+    leaving = "priority"
 
-    def pick_book(self, donor_id: int):
-        """
-        Переопределяем способ выбора книги у донора.
+    def __init__(self, libraries, inventory, target_load=None):
+        super().__init__(libraries, inventory, target_load)
+        # библиотеки, чей список книг уже упорядочен по приоритету
+        self._ordered = set()
 
-        Вместо "последней книги в списке" выбираем книгу с приоритетом:
+    def priority_key(self, book):
+        """
+        Ключ приоритета книги: чем больше ключ, тем раньше книга уезжает.
         - сначала новые (year > PRIORITY_YEAR)
         - затем старые
         - внутри группы — по убыванию года (новее → раньше)
         """
+        return (book.year > self.PRIORITY_YEAR, book.year)
+
+    def _order_books(self, library_id: int):
+        """
+        Один раз сортирует книги библиотеки так, чтобы лучшая была в конце.
+        При равных ключах первой уезжает книга, стоявшая раньше в списке.
+        """
+        books = self.books_by_library[library_id]
+        books.sort(key=self.priority_key, reverse=True)
+        books.reverse()
+        self._ordered.add(library_id)
 
-        books = self.books_by_library[donor_id]
+    def pick_book(self, donor_id: int):
+        """
+        Переопределяем способ выбора книги у донора.
 
-        sorted_books = sorted(
-            books,
-            key=lambda b: (b.year > self.PRIORITY_YEAR, b.year),
-            reverse=True,
-        )
+        Список донора сортируется один раз, дальше каждый выбор — pop() за O(1).
+        """
+        if donor_id not in self._ordered:
+            self._order_books(donor_id)
 
-        best_book = sorted_books[0]
+        return self.books_by_library[donor_id].pop()
 
-        self.books_by_library[donor_id].remove(best_book)
+    def on_move_planned(self, donor_id: int, receiver_id: int):
+        super().on_move_planned(donor_id, receiver_id)
+        # получатель дописал книгу в конец — порядок нарушен
+        self._ordered.discard(receiver_id)
 
-        return best_book
+    def on_book_taken(self, receiver_id: int, book):
+        super().on_book_taken(receiver_id, book)
+        self._ordered.discard(receiver_id)
@@ -0,0 +1,97 @@
+"""
+Лёгкие записи для ядра перераспределения: без Django и без БД.
+Из моделей их строит адаптер orm.py.
+"""
+
+
+class BookRecord:
+    """
+    Лёгкая замена модели Book для менеджеров перераспределения:
+    хранит только id и year.
+    """
+
+    __slots__ = ("id", "year")
+
+    def __init__(self, id: int, year: int):
+        self.id = id
+        self.year = year
+
+    def __repr__(self):
+        return f"BookRecord(id={self.id}, year={self.year})"
+
+
+class DetailedBookRecord(BookRecord):
+    """BookRecord с автором и названием — только для политик выбора книги."""
+
+    __slots__ = ("author_id", "title")
+
+    def __init__(self, id: int, year: int, author_id: int, title: str):
+        super().__init__(id, year)
+        self.author_id = author_id
+        self.title = title
+
+
+class LibraryRecord:
+    """
+    Лёгкая замена модели Library: id, capacity, район и координаты.
+    В отличие от модели, передаётся в другие процессы без Django.
+    """
+
+    __slots__ = ("id", "capacity", "district", "latitude", "longitude")
+
+    def __init__(
+        self,
+        id: int,
+        capacity: int,
+        district: str = "",
+        latitude=None,
+        longitude=None,
+    ):
+        self.id = id
+        self.capacity = capacity
+        self.district = district
+        self.latitude = latitude
+        self.longitude = longitude
+
+    @classmethod
+    def from_library(cls, library):
+        return cls(
+            library.id,
+            library.capacity,
+            getattr(library, "district", ""),
+            getattr(library, "latitude", None),
+            getattr(library, "longitude", None),
+        )
+
+    def __repr__(self):
+        return f"LibraryRecord(id={self.id}, capacity={self.capacity})"
+
+
+def residual_view(libraries, load, target_load, surplus_only=False):
+    """
+    Ещё не сбалансированная часть сети как отдельная задача для менеджера.
+
+    Донор участвует как есть — со всеми книгами и общей целью, а с
+    surplus_only — только с избытком книг, которые уедут (цель 0).
+    Получатель участвует без книг: цель — его недостаток,
+    вместимость — свободное место. Сбалансированные библиотеки не нужны.
+    Возвращает (библиотеки, цели, id доноров).
+    """
+    view = []
+    targets = {}
+    donor_ids = []
+
+    for lib in libraries:
+        current = load.get(lib.id, 0)
+        target = target_load[lib.id]
+        if current > target:
+            view.append(LibraryRecord.from_library(lib))
+            targets[lib.id] = 0 if surplus_only else target
+            donor_ids.append(lib.id)
+        elif current < target:
+            record = LibraryRecord.from_library(lib)
+            record.capacity -= current
+            view.append(record)
+            targets[lib.id] = target - current
+
+    return view, targets, donor_ids
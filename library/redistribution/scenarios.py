@@ -0,0 +1,173 @@
+"""
+Сценарии «что если»: изменение вместимости и закрытие библиотек.
+
+Каждый сценарий планируется поверх одного общего InventorySnapshot:
+меняются только вместимости библиотек, инвентарь не копируется и не
+перечитывается. Пачка сценариев считается в пуле процессов — при fork
+дочерние процессы делят страницы снимка с родителем (copy-on-write).
+
+Результат сценария — число переносов и маршрутов, итоговая загрузка
+относительно вместимости и стоимость перевозок (км × книги; None, если
+у библиотек какого-то маршрута нет координат).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .arrays import ArrayInventory, ArrayRedistributionManager
+from .base import RedistributionManager
+from .capacity import CapacityAwareRedistributionManager
+from .mincost import MinCostRedistributionManager, distance_matrix
+from .priority import PriorityRedistributionManager
+from .records import LibraryRecord
+
+# "arrays" — векторизованный бэкенд, остальные — менеджеры на объектах
+MANAGERS = {
+    "arrays": ArrayRedistributionManager,
+    "base": RedistributionManager,
+    "capacity": CapacityAwareRedistributionManager,
+    "priority": PriorityRedistributionManager,
+    "mincost": MinCostRedistributionManager,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    """
+    capacity — {library_id: доля прежней вместимости}, например {3: 0.6};
+    closed — библиотеки, которые закрываются (вместимость 0, все книги уходят).
+    """
+
+    name: str
+    capacity: dict = field(default_factory=dict)
+    closed: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Из JSON: {"name": ..., "capacity": {"3": 0.6}, "close": [5]}."""
+        return cls(
+            name=data["name"],
+            capacity={int(k): float(v) for k, v in data.get("capacity", {}).items()},
+            closed=tuple(int(i) for i in data.get("close", ())),
+        )
+
+    def apply(self, libraries):
+        """Библиотеки с вместимостью по сценарию — новые записи, исходные не меняются."""
+        closed = set(self.closed)
+        result = []
+        for lib in libraries:
+            record = LibraryRecord.from_library(lib)
+            if lib.id in closed:
+                record.capacity = 0
+            elif lib.id in self.capacity:
+                record.capacity = int(lib.capacity * self.capacity[lib.id])
+            result.append(record)
+        return result
+
+
+def base_inventory(snapshot) -> ArrayInventory:
+    """
+    Инвентарь снимка для бэкенда arrays. Строится один раз: сценарии
+    получают из него свои копии через with_capacities, и дорогая
+    сортировка книг по порядку отдачи тоже считается один раз.
+    """
+    return ArrayInventory.from_snapshot(snapshot)
+
+
+def _plan(snapshot, libraries, manager, inventory):
+    """План и итоговая загрузка {library_id: книги}."""
+    if manager == "arrays":
+        if inventory is None:
+            inventory = base_inventory(snapshot)
+        inv = inventory.with_capacities([lib.capacity for lib in libraries])
+        plan = ArrayRedistributionManager(
+            inv, priority_year=PriorityRedistributionManager.PRIORITY_YEAR
+        ).rebalance()
+        return plan, inv.load_by_library()
+
+    mgr = MANAGERS[manager](libraries, snapshot.rows())
+    plan = mgr.plan()
+    return plan, {lib.id: mgr.load.get(lib.id, 0) for lib in libraries}
+
+
+def evaluate(
+    snapshot, scenario: Scenario, manager="arrays", distances=None, inventory=None
+):
+    """
+    Метрики одного сценария. distances — матрица расстояний между
+    библиотеками снимка (в их порядке), inventory — base_inventory(snapshot);
+    без них считаются здесь.
+    """
+    libraries = scenario.apply(snapshot.libraries)
+    if distances is None:
+        distances = distance_matrix(snapshot.libraries, snapshot.libraries)
+
+    plan, load = _plan(snapshot, libraries, manager, inventory)
+
+    position = {lib.id: i for i, lib in enumerate(libraries)}
+    routes = 0
+    transfer_km = 0.0
+    for route in plan.routes():
+        routes += 1
+        distance = float(
+            distances[position[route.from_library_id], position[route.to_library_id]]
+        )
+        transfer_km += distance * route.quantity
+    if not np.isfinite(transfer_km):
+        # у библиотек маршрута нет координат — расстояние неизвестно
+        transfer_km = None
+
+    capacity = np.array([lib.capacity for lib in libraries], dtype=np.int64)
+    final = np.array([load[lib.id] for lib in libraries], dtype=np.int64)
+    is_open = capacity > 0
+    utilisation = final[is_open] / capacity[is_open]
+
+    return {
+        "name": scenario.name,
+        "moves": len(plan),
+        "routes": routes,
+        "transfer_km": transfer_km,
+        # книги, которым не нашлось места (не хватает суммарной вместимости)
+        "unplaced": int(np.clip(final - capacity, 0, None).sum()),
+        "utilisation_min": float(utilisation.min()) if len(utilisation) else None,
+        "utilisation_mean": float(utilisation.mean()) if len(utilisation) else None,
+        "utilisation_max": float(utilisation.max()) if len(utilisation) else None,
+    }
+
+
+# Состояние процесса пула: снимок приходит один раз на процесс,
+# при fork — без копирования.
+_WORKER = {}
+
+
+def _init_worker(snapshot, manager, distances):
+    inventory = base_inventory(snapshot) if manager == "arrays" else None
+    _WORKER.update(
+        snapshot=snapshot, manager=manager, distances=distances, inventory=inventory
+    )
+
+
+def _evaluate_in_worker(scenario):
+    return evaluate(scenario=scenario, **_WORKER)
+
+
+def simulate(snapshot, scenarios, manager="arrays", max_workers=None):
+    """
+    Метрики пачки сценариев — в том же порядке, что и scenarios.
+    max_workers=1 — без пула, в текущем процессе.
+    """
+    scenarios = list(scenarios)
+    distances = distance_matrix(snapshot.libraries, snapshot.libraries)
+
+    if max_workers == 1 or len(scenarios) <= 1:
+        inventory = base_inventory(snapshot) if manager == "arrays" else None
+        return [evaluate(snapshot, s, manager, distances, inventory) for s in scenarios]
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(snapshot, manager, distances),
+    ) as pool:
+        return list(pool.map(_evaluate_in_worker, scenarios))
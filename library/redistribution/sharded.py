@@ -0,0 +1,165 @@
+"""
+Шардированное перераспределение.
+
+Сеть делится на шарды (по умолчанию — по районам), каждый шард
+планируется отдельным процессом обычным менеджером, а остаток
+избытка и недостатка между шардами закрывает итоговый проход координатора.
+"""
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from .apportion import target_loads
+from .move import Move, Plan
+from .priority import PriorityRedistributionManager
+from .records import LibraryRecord, residual_view
+
+# Разбиения: принимают библиотеки, возвращают {ключ шарда: [библиотеки]}
+
+
+def by_district(libraries):
+    """Шард — район библиотеки (Library.district)."""
+    shards = defaultdict(list)
+    for lib in libraries:
+        shards[lib.district].append(lib)
+    return dict(shards)
+
+
+def round_robin(count: int):
+    """Равные шарды без учёта географии: библиотеки раскладываются по кругу."""
+
+    def partition(libraries):
+        shards = defaultdict(list)
+        for i, lib in enumerate(libraries):
+            shards[i % count].append(lib)
+        return dict(shards)
+
+    return partition
+
+
+def _as_row(item):
+    if isinstance(item, tuple):
+        return item
+    return (item.book_id, item.library_id, item.book.year)
+
+
+def _plan_shard(manager_class, libraries, rows, target_load):
+    """
+    Работа одного процесса: план внутри шарда.
+    Возвращает сводный план (передаётся между процессами компактно),
+    итоговую загрузку, книги доноров, у которых остался избыток (они
+    нужны координатору), и счётчики проходов (passes, pairings).
+    """
+    mgr = manager_class(libraries, rows, target_load=target_load)
+    plan = mgr.plan()
+
+    leftover = [
+        (book.id, lib_id, book.year)
+        for lib_id, books in mgr.books_by_library.items()
+        if mgr.load[lib_id] > target_load[lib_id]
+        for book in books
+    ]
+    counters = (getattr(mgr, "passes", 0), getattr(mgr, "pairings", 0))
+    return plan, dict(mgr.load), leftover, counters
+
+
+class ShardedRebalancer:
+    """
+    Перераспределение по шардам в пуле процессов.
+
+    Цели считаются по всей сети, поэтому, если книги помещаются в сеть
+    (их не больше суммарной вместимости), итоговая загрузка и число
+    переносов совпадают с обычным запуском, но большая часть переносов
+    остаётся внутри шарда. Если книг больше, цели занимают всю
+    вместимость, а лишние книги остаются там, где их оставил шард, —
+    загрузка может отличаться от обычного запуска.
+    """
+
+    def __init__(
+        self,
+        libraries,
+        inventory,
+        manager_class=PriorityRedistributionManager,
+        partitioner=by_district,
+        max_workers=None,
+    ):
+        self.libraries = [LibraryRecord.from_library(lib) for lib in libraries]
+        self.manager_class = manager_class
+        self.partitioner = partitioner
+        self.max_workers = max_workers
+
+        self.rows_by_library = defaultdict(list)
+        for item in inventory:
+            row = _as_row(item)
+            self.rows_by_library[row[1]].append(row)
+
+        self.total_books = sum(len(rows) for rows in self.rows_by_library.values())
+        self.target_load = target_loads(self.libraries, self.total_books)
+        self.load = {}
+        # проходы и пары по всем шардам и координатору (для отчётов);
+        # хуки менеджеров в дочерних процессах не замеряются
+        self.passes = 0
+        self.pairings = 0
+
+    def _shard_jobs(self):
+        for shard in self.partitioner(self.libraries).values():
+            rows = [row for lib in shard for row in self.rows_by_library[lib.id]]
+            targets = {lib.id: self.target_load[lib.id] for lib in shard}
+            yield shard, rows, targets
+
+    def _run_shards(self):
+        jobs = list(self._shard_jobs())
+
+        if self.max_workers == 1 or len(jobs) <= 1:
+            return [
+                _plan_shard(self.manager_class, shard, rows, targets)
+                for shard, rows, targets in jobs
+            ]
+
+        # ядро не зависит от Django: дочерним процессам django.setup() не нужен
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [
+                pool.submit(_plan_shard, self.manager_class, shard, rows, targets)
+                for shard, rows, targets in jobs
+            ]
+            return [future.result() for future in futures]
+
+    def _reconcile(self, leftover) -> Plan:
+        """Проход координатора между шардами по ещё не сбалансированной части сети."""
+        libraries, target_load, _ = residual_view(
+            self.libraries, self.load, self.target_load
+        )
+        if not libraries:
+            return Plan()
+
+        mgr = self.manager_class(libraries, leftover, target_load=target_load)
+        plan = mgr.plan()
+        self.passes += getattr(mgr, "passes", 0)
+        self.pairings += getattr(mgr, "pairings", 0)
+
+        for route in plan.routes():
+            self.load[route.from_library_id] -= route.quantity
+            self.load[route.to_library_id] = (
+                self.load.get(route.to_library_id, 0) + route.quantity
+            )
+
+        return plan
+
+    def plan(self) -> Plan:
+        plan = Plan()
+        leftover = []
+
+        for shard_plan, shard_load, shard_leftover, counters in self._run_shards():
+            plan.extend(shard_plan)
+            self.passes += counters[0]
+            self.pairings += counters[1]
+            self.load.update(shard_load)
+            leftover.extend(shard_leftover)
+
+        plan.extend(self._reconcile(leftover))
+        return plan
+
+    def rebalance(self) -> List[Move]:
+        """Совместимость: поштучный список переносов."""
+        return self.plan().moves()
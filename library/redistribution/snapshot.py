@@ -0,0 +1,248 @@
+"""
+Снимок сети в массивах: библиотеки и размещение книг.
+
+Массивы снимка только для чтения — поверх одного снимка можно
+планировать сколько угодно вариантов (см. scenarios.py), не копируя
+и не перечитывая инвентарь. Дочерние процессы, созданные через fork,
+делят страницы снимка с родителем.
+
+Снимок можно сохранить в файл и открыть через mmap (save / open):
+колонки книг лежат в файле подряд, открытие не читает их и не
+копирует — массивы снимка смотрят прямо в отображённые страницы.
+
+Формат файла (версия FORMAT_VERSION):
+
+    MAGIC (8 байт), версия формата (uint32), длина заголовка (uint32)
+    заголовок — JSON: число книг, отметка версии данных, имена колонок,
+        таблица библиотек [id, capacity, district, latitude, longitude]
+    колонки int64 little-endian по числу книг, каждая с границы ALIGN байт
+"""
+
+import json
+import mmap
+import os
+import struct
+from itertools import chain
+
+import numpy as np
+
+from .records import LibraryRecord
+
+MAGIC = b"CLSNAP\r\n"
+FORMAT_VERSION = 1
+ALIGN = 64
+COLUMNS = ("book_id", "library_id", "year", "author_id")
+DTYPE = "<i8"
+
+# MAGIC, версия формата, длина заголовка
+_PREFIX = struct.Struct("<8sII")
+
+
+def _frozen(values) -> np.ndarray:
+    """Непрерывный int64-массив только для чтения (исходный массив не меняется)."""
+    column = np.ascontiguousarray(values, dtype=np.int64).view()
+    column.flags.writeable = False
+    return column
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGN) * ALIGN
+
+
+def _layout(header_size: int, n_books: int):
+    """Смещение первой колонки и шаг между колонками."""
+    return _aligned(_PREFIX.size + header_size), _aligned(n_books * 8)
+
+
+def read_header(path) -> dict:
+    """Заголовок файла снимка без отображения колонок."""
+    with open(path, "rb") as f:
+        magic, version, size = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path}: не файл снимка")
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                f"{path}: формат снимка {version}, поддерживается {FORMAT_VERSION}"
+            )
+        header = json.loads(f.read(size))
+    header["header_size"] = size
+    return header
+
+
+class SnapshotWriter:
+    """
+    Запись снимка пачками: размер файла известен заранее (число книг),
+    колонки заполняются через memmap, поэтому память — O(пачки).
+    Файл пишется рядом под временным именем и появляется только целым.
+
+        with SnapshotWriter(path, libraries, n_books, marker) as writer:
+            writer.append(book_id=..., library_id=..., year=..., author_id=...)
+    """
+
+    def __init__(self, path, libraries, n_books, marker=None, columns=COLUMNS):
+        self.path = os.fspath(path)
+        self.n_books = n_books
+        self.columns = tuple(columns)
+        self.written = 0
+        self._tmp = f"{self.path}.tmp"
+
+        header = json.dumps(
+            {
+                "books": n_books,
+                "marker": marker,
+                "columns": self.columns,
+                "dtype": DTYPE,
+                "libraries": [
+                    [lib.id, lib.capacity, lib.district, lib.latitude, lib.longitude]
+                    for lib in libraries
+                ],
+            },
+            ensure_ascii=False,
+        ).encode()
+        offset, stride = _layout(len(header), n_books)
+
+        with open(self._tmp, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            f.truncate(offset + stride * len(self.columns))
+        self._data = (
+            np.memmap(
+                self._tmp,
+                dtype=DTYPE,
+                mode="r+",
+                offset=offset,
+                shape=(len(self.columns), stride // 8),
+            )
+            if n_books
+            else None
+        )
+
+    def append(self, **columns):
+        """Пачка книг: по массиву на каждую колонку, одинаковой длины."""
+        count = len(columns[self.columns[0]])
+        if not count:
+            return
+        if self.written + count > self.n_books:
+            raise ValueError(f"Книг больше, чем объявлено ({self.n_books})")
+        for i, name in enumerate(self.columns):
+            self._data[i, self.written : self.written + count] = columns[name]
+        self.written += count
+
+    def close(self):
+        if self.written != self.n_books:
+            # недописанный файл не остаётся рядом под временным именем
+            self.abort()
+            raise ValueError(
+                f"Записано книг: {self.written}, объявлено: {self.n_books}"
+            )
+        if self._data is not None:
+            self._data.flush()
+        self._data = None
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._data = None
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class InventorySnapshot:
+    """
+    libraries — список LibraryRecord (или моделей Library);
+    book_id / library_id / year / author_id — по книге (author_id может
+    отсутствовать). marker — версия данных, с которой снят снимок.
+    """
+
+    def __init__(
+        self, libraries, book_id, library_id, year, author_id=None, marker=None
+    ):
+        self.libraries = list(libraries)
+        self.book_id = _frozen(book_id)
+        self.library_id = _frozen(library_id)
+        self.year = _frozen(year)
+        self.author_id = None if author_id is None else _frozen(author_id)
+        self.marker = marker
+
+    @classmethod
+    def from_rows(cls, libraries, rows):
+        """Из кортежей (book_id, library_id, year), например orm.iter_inventory_rows."""
+        flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 3)
+        return cls(libraries, flat[:, 0], flat[:, 1], flat[:, 2])
+
+    @classmethod
+    def open(cls, path):
+        """
+        Снимок из файла через mmap. Колонки не читаются и не копируются:
+        страницы подгружает ОС при первом обращении.
+        """
+        header = read_header(path)
+        n_books = header["books"]
+        offset, stride = _layout(header["header_size"], n_books)
+
+        empty = np.empty(0, dtype=np.int64)
+        columns = dict.fromkeys(header["columns"], empty)
+        if n_books:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # массивы держат ссылку на mmap: файл остаётся отображённым,
+            # пока жив хотя бы один из них
+            for i, name in enumerate(header["columns"]):
+                columns[name] = np.frombuffer(
+                    mapped,
+                    dtype=header["dtype"],
+                    count=n_books,
+                    offset=offset + i * stride,
+                )
+
+        return cls(
+            [LibraryRecord(*row) for row in header["libraries"]],
+            columns["book_id"],
+            columns["library_id"],
+            columns["year"],
+            author_id=columns.get("author_id"),
+            marker=header["marker"],
+        )
+
+    def save(self, path, marker=None):
+        """Записать снимок в файл (формат — в docstring модуля)."""
+        columns = {
+            "book_id": self.book_id,
+            "library_id": self.library_id,
+            "year": self.year,
+        }
+        if self.author_id is not None:
+            columns["author_id"] = self.author_id
+        marker = self.marker if marker is None else marker
+
+        with SnapshotWriter(
+            path, self.libraries, len(self), marker, columns=columns
+        ) as writer:
+            writer.append(**columns)
+
+    def __len__(self):
+        return len(self.book_id)
+
+    def rows(self, chunk_size: int = 65536):
+        """Кортежи (book_id, library_id, year) — для менеджеров на объектах."""
+        for start in range(0, len(self.book_id), chunk_size):
+            stop = start + chunk_size
+            yield from zip(
+                self.book_id[start:stop].tolist(),
+                self.library_id[start:stop].tolist(),
+                self.year[start:stop].tolist(),
+            )
+
+    def load_by_library(self):
+        library_ids, counts = np.unique(self.library_id, return_counts=True)
+        load = dict.fromkeys((lib.id for lib in self.libraries), 0)
+        load.update(zip(library_ids.tolist(), counts.tolist()))
+        return load
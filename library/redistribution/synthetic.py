@@ -0,0 +1,167 @@
+"""
+Синтетические сети библиотек для нагрузочных замеров.
+
+generate() строит сеть заданного размера целиком в массивах NumPy:
+вместимости (равномерные или с тяжёлым хвостом), первичное размещение
+(стратегии из placement — от равномерного до сильного перекоса)
+и годы книг с заданной долей старых изданий. Результат — либо кортежи
+(book_id, library_id, year) для менеджеров, либо записи в формате
+импортёров (см. library/importers.py) для load_initial_data.
+"""
+
+import datetime
+
+import numpy as np
+
+from .apportion import largest_remainder
+from .placement import place
+from .priority import PriorityRedistributionManager
+from .records import LibraryRecord
+
+CAPACITY_DISTRIBUTIONS = ("uniform", "skewed")
+
+# книги не новее этого года — старые, их донор отдаёт в последнюю очередь
+OLD_YEAR = PriorityRedistributionManager.PRIORITY_YEAR
+FIRST_YEAR = 1800
+LAST_YEAR = 2024
+
+# центр и разброс координат, градусы
+CITY_CENTER = (55.75, 37.62)
+CITY_SPREAD = 0.25
+
+
+def _capacity_weights(rng, distribution: str, count: int) -> np.ndarray:
+    if distribution == "uniform":
+        weights = rng.uniform(0.5, 1.5, count)
+    elif distribution == "skewed":
+        # Парето: несколько крупных библиотек и много маленьких
+        weights = rng.pareto(1.2, count) + 1.0
+    else:
+        raise ValueError(f"Неизвестное распределение вместимости: {distribution}")
+    return np.maximum((weights * 1000).astype(np.int64), 1)
+
+
+def _years(rng, count: int, old_share: float) -> np.ndarray:
+    old = rng.random(count) < old_share
+    return np.where(
+        old,
+        rng.integers(FIRST_YEAR, OLD_YEAR + 1, count),
+        rng.integers(OLD_YEAR + 1, LAST_YEAR + 1, count),
+    )
+
+
+class SyntheticNetwork:
+    """
+    Сеть библиотек в массивах: libraries — LibraryRecord,
+    book_id / library_id / year — по книге, author_id — по книге.
+    """
+
+    def __init__(self, libraries, book_id, library_id, year, author_id, n_authors):
+        self.libraries = libraries
+        self.book_id = book_id
+        self.library_id = library_id
+        self.year = year
+        self.author_id = author_id
+        self.n_authors = n_authors
+
+    def __len__(self):
+        return len(self.book_id)
+
+    def rows(self, chunk_size: int = 65536):
+        """Кортежи (book_id, library_id, year) — как orm.iter_inventory_rows."""
+        for start in range(0, len(self.book_id), chunk_size):
+            stop = start + chunk_size
+            yield from zip(
+                self.book_id[start:stop].tolist(),
+                self.library_id[start:stop].tolist(),
+                self.year[start:stop].tolist(),
+            )
+
+    def records(self):
+        """
+        Пары (раздел, запись) как у читателей из library/importers.py.
+        Размещение книг не выгружается: его делает init_inventory.
+        """
+        birth_date = datetime.date(1900, 1, 1).isoformat()
+        for author_id in range(1, self.n_authors + 1):
+            yield "authors", {
+                "id": author_id,
+                "full_name": f"Автор {author_id}",
+                "birth_date": birth_date,
+            }
+
+        for book_id, year, author_id in zip(
+            self.book_id.tolist(), self.year.tolist(), self.author_id.tolist()
+        ):
+            yield "books", {
+                "id": book_id,
+                "title": f"Книга {book_id}",
+                "year": year,
+                "author_id": author_id,
+            }
+
+        for lib in self.libraries:
+            yield "libraries", {
+                "id": lib.id,
+                "name": f"Библиотека {lib.id}",
+                "capacity": lib.capacity,
+                "district": lib.district,
+                "latitude": lib.latitude,
+                "longitude": lib.longitude,
+            }
+
+
+def generate(
+    n_books: int,
+    n_libraries: int,
+    capacity: str = "skewed",
+    fill: float = 0.8,
+    placement: str = "first-fit",
+    old_share: float = 0.3,
+    districts: int = 10,
+    n_authors: int = None,
+    seed: int = 0,
+) -> SyntheticNetwork:
+    """
+    n_books книг в n_libraries библиотеках.
+
+    fill — доля занятых мест (суммарная вместимость = n_books / fill),
+    placement — стратегия первичного размещения: "first-fit" даёт
+    сильный перекос, "proportional" — почти сбалансированную сеть.
+    old_share — доля книг до OLD_YEAR включительно.
+    """
+    if not 0 < fill <= 1:
+        raise ValueError("fill должен быть в (0, 1]")
+
+    rng = np.random.default_rng(seed)
+
+    total_capacity = max(int(np.ceil(n_books / fill)), n_libraries)
+    weights = _capacity_weights(rng, capacity, n_libraries)
+    # каждой библиотеке хотя бы одно место, остальное — по весам
+    capacities = 1 + largest_remainder(total_capacity - n_libraries, weights)
+
+    lat = CITY_CENTER[0] + rng.uniform(-CITY_SPREAD, CITY_SPREAD, n_libraries)
+    lon = CITY_CENTER[1] + rng.uniform(-CITY_SPREAD, CITY_SPREAD, n_libraries)
+    libraries = [
+        LibraryRecord(
+            i + 1,
+            int(capacities[i]),
+            f"Район {i % districts + 1}",
+            float(lat[i]),
+            float(lon[i]),
+        )
+        for i in range(n_libraries)
+    ]
+
+    positions = place(placement, capacities, n_books)
+    library_ids = np.arange(1, n_libraries + 1, dtype=np.int64)
+
+    n_authors = n_authors or max(n_books // 20, 1)
+    return SyntheticNetwork(
+        libraries=libraries,
+        book_id=np.arange(1, n_books + 1, dtype=np.int64),
+        library_id=library_ids[positions],
+        year=_years(rng, n_books, old_share),
+        author_id=rng.integers(1, n_authors + 1, n_books),
+        n_authors=n_authors,
+    )
@@ -0,0 +1,33 @@
+"""Синтетическая сеть в тестовой базе: каталог, библиотеки и размещение."""
+
+from io import StringIO
+
+from django.core.management import call_command
+
+from library.models import Author, Book, Library, LibraryBook
+from library.redistribution.synthetic import generate
+
+
+def load_network(n_books=600, n_libraries=15, seed=0, **options):
+    """Записать synthetic.generate() в базу и разместить книги init_inventory."""
+    network = generate(n_books, n_libraries, seed=seed, **options)
+    rows = {"authors": [], "books": [], "libraries": []}
+    for section, record in network.records():
+        rows[section].append(record)
+    Author.objects.bulk_create(Author(**record) for record in rows["authors"])
+    Book.objects.bulk_create(Book(**record) for record in rows["books"])
+    Library.objects.bulk_create(Library(**record) for record in rows["libraries"])
+    call_command("init_inventory", stdout=StringIO())
+    return network
+
+
+def placements() -> dict:
+    """{book_id: library_id} по таблице LibraryBook."""
+    return dict(LibraryBook.objects.values_list("book_id", "library_id"))
+
+
+def rebalance(*args, **options) -> str:
+    """Вывод rebalance_libraries."""
+    out = StringIO()
+    call_command("rebalance_libraries", *args, stdout=out, **options)
+    return out.getvalue()
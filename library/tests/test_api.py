@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from library import counters, jobs
+from library.models import Author, Book, Library, LibraryBook, RebalanceChunk
+
+from .network import load_network, rebalance
+
+
+class CachedApiTests(TestCase):
+    """ETag и кэш ответов меняются вместе с данными."""
+
+    def setUp(self):
+        # кэш в памяти процесса переживает тесты, а версия в новой базе — нет
+        cache.clear()
+        load_network(n_books=120, n_libraries=6, seed=7)
+        self.libraries_url = reverse("library:library-list")
+        self.books_url = reverse("library:library-books", args=[1])
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_not_modified_while_data_unchanged(self):
+        etag = self.etag(self.libraries_url)
+        response = self.client.get(self.libraries_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_cached_response_costs_one_query(self):
+        first = self.client.get(self.books_url)
+        # только чтение версии
+        with self.assertNumQueries(1):
+            second = self.client.get(self.books_url)
+        self.assertEqual(first.content, second.content)
+
+    def test_every_change_invalidates(self):
+        def move_book():
+            placement = LibraryBook.objects.exclude(library_id=1).first()
+            placement.library_id = 1
+            placement.save()
+
+        def rename_book():
+            book = Book.objects.get(
+                pk=LibraryBook.objects.filter(library_id=1).first().book_id
+            )
+            book.title = "Новое название"
+            book.save()
+
+        def rename_author():
+            author = Author.objects.first()
+            author.full_name = "Новый автор"
+            author.save()
+
+        def resize_library():
+            library = Library.objects.get(pk=1)
+            library.capacity += 10
+            library.save()
+
+        changes = {
+            "LibraryBook": move_book,
+            "Book": rename_book,
+            "Author": rename_author,
+            "Library": resize_library,
+            "counters.assign": lambda: counters.assign(counters.loads()),
+            "rebalance_libraries": rebalance,
+            "delete LibraryBook": lambda: LibraryBook.objects.first().delete(),
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                libraries_etag = self.etag(self.libraries_url)
+                books_etag = self.etag(self.books_url)
+                change()
+                for url, etag in (
+                    (self.libraries_url, libraries_etag),
+                    (self.books_url, books_etag),
+                ):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200, url)
+                    self.assertNotEqual(response["ETag"], etag)
+                if name == "Book":
+                    titles = [
+                        book["title"]
+                        for book in self.client.get(self.books_url).json()["books"]
+                    ]
+                    self.assertIn("Новое название", titles)
+
+    def test_errors_are_not_cached(self):
+        url = f"{self.books_url}?limit=x"
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(
+            self.client.get(reverse("library:library-books", args=[999])).status_code,
+            404,
+        )
+
+
+class LastPlanTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        load_network(n_books=120, n_libraries=6, seed=7)
+        self.url = reverse("library:last-plan")
+
+    def test_empty_before_first_plan(self):
+        self.assertEqual(
+            self.client.get(self.url).json(),
+            {"job_id": None, "total_moves": 0, "routes": []},
+        )
+
+    def test_only_latest_plan_is_kept(self):
+        etag = self.client.get(self.url)["ETag"]
+        rebalance()
+        first = jobs.last_plan()
+        self.assertNotEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        # разбалансировать и перераспределить снова
+        for placement in LibraryBook.objects.exclude(library_id=1)[:20]:
+            placement.library_id = 1
+            placement.save()
+        rebalance()
+        second = jobs.last_plan()
+        self.assertGreater(second.pk, first.pk)
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(data["job_id"], second.pk)
+        self.assertEqual(
+            sum(route["quantity"] for route in data["routes"]), second.total_moves
+        )
+        self.assertEqual(
+            set(RebalanceChunk.objects.values_list("job_id", flat=True)), {second.pk}
+        )
+        # применённый план хранится строкой на маршрут, без номеров книг
+        self.assertEqual(second.chunks.count(), len(data["routes"]))
+        self.assertFalse(second.chunks.exclude(book_ids=b"").exists())
@@ -0,0 +1,83 @@
+import random
+
+from django.test import SimpleTestCase
+
+from library.redistribution.apportion import (
+    capped_largest_remainder,
+    largest_remainder,
+    target_loads,
+)
+from library.redistribution.records import LibraryRecord
+
+
+class LargestRemainderTests(SimpleTestCase):
+    def test_exact_total(self):
+        rng = random.Random(0)
+        for case in range(200):
+            weights = [rng.randint(0, 50) for _ in range(rng.randint(1, 12))]
+            total = rng.randint(0, 1000)
+            with self.subTest(case=case):
+                result = largest_remainder(total, weights)
+                expected = total if sum(weights) else 0
+                self.assertEqual(int(result.sum()), expected)
+                # каждая доля — целая часть квоты или на единицу больше
+                for share, weight in zip(result.tolist(), weights):
+                    if sum(weights):
+                        quota = total * weight // sum(weights)
+                        self.assertIn(share, (quota, quota + 1))
+
+    def test_ties_go_to_lower_index(self):
+        self.assertEqual(largest_remainder(1, [1, 1, 1]).tolist(), [1, 0, 0])
+        self.assertEqual(largest_remainder(2, [1, 1, 1]).tolist(), [1, 1, 0])
+        self.assertEqual(largest_remainder(5, [2, 1, 2, 1]).tolist(), [2, 1, 1, 1])
+
+    def test_nothing_to_divide(self):
+        self.assertEqual(largest_remainder(0, [3, 4]).tolist(), [0, 0])
+        self.assertEqual(largest_remainder(7, [0, 0]).tolist(), [0, 0])
+
+
+class CappedLargestRemainderTests(SimpleTestCase):
+    def test_overflow_is_redistributed(self):
+        # по весам 5 и 5, но первой помещается только 2
+        self.assertEqual(
+            capped_largest_remainder(10, [1, 1], [2, 100]).tolist(), [2, 8]
+        )
+        # насыщение в два шага
+        self.assertEqual(
+            capped_largest_remainder(12, [1, 1, 1], [1, 3, 100]).tolist(), [1, 3, 8]
+        )
+
+    def test_zero_capacity_gets_nothing(self):
+        self.assertEqual(
+            capped_largest_remainder(6, [5, 1, 1], [0, 10, 10]).tolist(), [0, 3, 3]
+        )
+
+    def test_total_above_capacity_fills_everything(self):
+        self.assertEqual(
+            capped_largest_remainder(100, [1, 2, 3], [4, 5, 6]).tolist(), [4, 5, 6]
+        )
+
+    def test_never_exceeds_caps(self):
+        rng = random.Random(1)
+        for case in range(200):
+            n = rng.randint(1, 10)
+            caps = [rng.randint(0, 40) for _ in range(n)]
+            weights = [rng.randint(0, 40) for _ in range(n)]
+            total = rng.randint(0, 300)
+            with self.subTest(case=case):
+                result = capped_largest_remainder(total, weights, caps).tolist()
+                self.assertEqual(sum(result), min(total, sum(caps)))
+                self.assertTrue(all(0 <= r <= c for r, c in zip(result, caps)))
+
+
+class TargetLoadsTests(SimpleTestCase):
+    def test_proportional_to_capacity(self):
+        libraries = [LibraryRecord(7, 10), LibraryRecord(3, 20), LibraryRecord(5, 30)]
+        self.assertEqual(target_loads(libraries, 30), {7: 5, 3: 10, 5: 15})
+        # остаток — по наибольшей дробной части, при равных — первой
+        self.assertEqual(target_loads(libraries, 31), {7: 5, 3: 10, 5: 16})
+        self.assertEqual(target_loads(libraries, 7), {7: 1, 3: 2, 5: 4})
+
+    def test_more_books_than_capacity(self):
+        libraries = [LibraryRecord(1, 2), LibraryRecord(2, 3), LibraryRecord(3, 0)]
+        self.assertEqual(target_loads(libraries, 10), {1: 2, 2: 3, 3: 0})
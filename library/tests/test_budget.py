@@ -0,0 +1,118 @@
+from django.test import SimpleTestCase
+
+from library.redistribution import synthetic
+from library.redistribution.budget import BudgetedPlanner, deviation
+from library.redistribution.mincost import distance_matrix
+from library.redistribution.priority import PriorityRedistributionManager
+from library.redistribution.records import LibraryRecord
+
+
+class BudgetTests(SimpleTestCase):
+    """Ограниченный план: остановка по числу переносов и стоимости."""
+
+    def setUp(self):
+        self.network = synthetic.generate(2000, 30, seed=6)
+        self.rows = list(self.network.rows())
+
+    def manager(self):
+        return PriorityRedistributionManager(self.network.libraries, self.rows)
+
+    def plan_cost(self, plan):
+        libraries = {lib.id: lib for lib in self.network.libraries}
+        return sum(
+            route.quantity
+            * float(
+                distance_matrix(
+                    [libraries[route.from_library_id]],
+                    [libraries[route.to_library_id]],
+                )[0, 0]
+            )
+            for route in plan.routes()
+        )
+
+    def test_unlimited_is_full_plan(self):
+        full = len(self.manager().plan())
+        budget = BudgetedPlanner(self.manager())
+        plan = budget.plan()
+        self.assertEqual(budget.stopped, "balanced")
+        self.assertTrue(budget.complete)
+        self.assertEqual(len(plan), full)
+        self.assertEqual(budget.before["moves_left"], full)
+        self.assertEqual(budget.after["moves_left"], 0)
+
+    def test_max_moves_stop(self):
+        budget = BudgetedPlanner(self.manager(), max_moves=25)
+        plan = budget.plan()
+        self.assertEqual(budget.stopped, "moves")
+        self.assertFalse(budget.complete)
+        self.assertEqual((len(plan), budget.moves), (25, 25))
+        self.assertEqual(budget.after["moves_left"], budget.before["moves_left"] - 25)
+        self.assertLess(budget.after["rms"], budget.before["rms"])
+
+    def test_max_cost_stop(self):
+        budget = BudgetedPlanner(self.manager(), max_cost=40.0)
+        plan = budget.plan()
+        self.assertEqual(budget.stopped, "cost")
+        self.assertGreater(len(plan), 0)
+        self.assertLessEqual(budget.cost, 40.0)
+        self.assertAlmostEqual(budget.cost, self.plan_cost(plan), places=6)
+        self.assertEqual(
+            budget.after["moves_left"], budget.before["moves_left"] - len(plan)
+        )
+
+    def test_repeated_runs_reach_full_plan(self):
+        full = self.manager()
+        full_moves = len(full.plan())
+        mgr = self.manager()
+        moves = 0
+        for _ in range(full_moves):
+            budget = BudgetedPlanner(mgr, max_moves=40, max_cost=150.0)
+            moves += len(budget.plan())
+            if budget.complete:
+                break
+        self.assertTrue(budget.complete)
+        self.assertEqual(moves, full_moves)
+        self.assertEqual(dict(mgr.load), dict(full.load))
+
+    def test_fallback_beyond_candidate_window(self):
+        # два далёких кластера: A и D рядом, B и C рядом. Крайняя пара
+        # A → C дороже бюджета — переносы идут к ближайшим получателям
+        libraries = [
+            LibraryRecord(1, 10, "", 55.0, 37.0),
+            LibraryRecord(2, 10, "", 55.5, 37.5),
+            LibraryRecord(3, 10, "", 55.5, 37.501),
+            LibraryRecord(4, 10, "", 55.0, 37.001),
+        ]
+        rows = [(i, 1, 2000) for i in range(1, 6)] + [(i, 2, 2000) for i in range(6, 9)]
+        budget = BudgetedPlanner(
+            PriorityRedistributionManager(libraries, rows), max_cost=1.0
+        )
+        budget.candidates = 1
+        plan = budget.plan()
+        self.assertEqual(
+            sorted(
+                (r.from_library_id, r.to_library_id, r.quantity) for r in plan.routes()
+            ),
+            [(1, 4, 2), (2, 3, 1)],
+        )
+        self.assertEqual(budget.stopped, "cost")
+        self.assertLessEqual(budget.cost, 1.0)
+        self.assertEqual(budget.after["moves_left"], 1)
+
+    def test_invalid_limits(self):
+        for options in ({"max_moves": -1}, {"max_cost": -0.5}):
+            with self.subTest(**options):
+                with self.assertRaises(ValueError):
+                    BudgetedPlanner(self.manager(), **options)
+
+    def test_deviation(self):
+        target = {1: 4, 2: 4, 3: 2}
+        self.assertEqual(
+            deviation({1: 7, 2: 2, 3: 2}, target, [1, 2, 3]),
+            {"moves_left": 3, "max": 3, "rms": 2.0817},
+        )
+        self.assertEqual(
+            deviation({1: 4, 2: 4, 3: 2}, target, [1, 2, 3]),
+            {"moves_left": 0, "max": 0, "rms": 0.0},
+        )
+        self.assertEqual(deviation({}, {}, []), {"moves_left": 0, "max": 0, "rms": 0.0})
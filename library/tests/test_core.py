@@ -0,0 +1,34 @@
+import pkgutil
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+import library.redistribution
+
+# адаптер к моделям — единственный модуль ядра, которому нужен Django
+DJANGO_ADAPTERS = {"orm"}
+
+
+class DjangoFreeCoreTests(SimpleTestCase):
+    def test_core_imports_without_django(self):
+        modules = [
+            f"library.redistribution.{info.name}"
+            for info in pkgutil.iter_modules(library.redistribution.__path__)
+            if info.name not in DJANGO_ADAPTERS
+        ]
+        code = (
+            "import sys\n"
+            f"for name in {modules!r}:\n"
+            "    __import__(name)\n"
+            "loaded = sorted(m for m in sys.modules if m.split('.')[0] == 'django')\n"
+            "assert not loaded, loaded\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
@@ -0,0 +1,194 @@
+import csv
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from library.redistribution import export, synthetic
+from library.redistribution.export import ColumnarPlan, write_plan
+from library.redistribution.priority import PriorityRedistributionManager
+
+FORMATS = {"csv": "plan.csv", "ndjson": "plan.ndjson", "columnar": "plan.clplan"}
+
+
+def titles(book_ids):
+    # запятые, кавычки и перевод строки — проверка экранирования
+    return {book_id: f'Книга «{book_id}», "том"\n{book_id % 7}' for book_id in book_ids}
+
+
+def read_rows(path, fmt):
+    """(from, to, book_id, title) по строкам файла."""
+    if fmt == "csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            return [
+                (
+                    int(row["from_library_id"]),
+                    int(row["to_library_id"]),
+                    int(row["book_id"]),
+                    row["title"],
+                )
+                for row in csv.DictReader(f)
+            ]
+    if fmt == "ndjson":
+        with open(path, encoding="utf-8") as f:
+            return [
+                (
+                    row["from_library_id"],
+                    row["to_library_id"],
+                    row["book_id"],
+                    row["title"],
+                )
+                for row in map(json.loads, f)
+            ]
+    plan = ColumnarPlan(path)
+    rows = []
+    position = 0
+    for from_id, to_id, book_ids in plan.routes():
+        for book_id in book_ids.tolist():
+            rows.append((from_id, to_id, book_id, plan.title(position)))
+            position += 1
+    return rows
+
+
+class ExportTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.network = synthetic.generate(1500, 20, seed=8)
+        cls.rows = list(cls.network.rows())
+        cls.plan = cls.manager().plan()
+        cls.expected = sorted(
+            (move.from_library_id, move.to_library_id, move.book_id)
+            for move in cls.plan
+        )
+        cls.names = {lib.id: f"Библиотека {lib.id}" for lib in cls.network.libraries}
+
+    @classmethod
+    def manager(cls):
+        return PriorityRedistributionManager(cls.network.libraries, cls.rows)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, fmt):
+        return os.path.join(self.tmp.name, FORMATS[fmt])
+
+    def assertRoundTrip(self, path, fmt, exported):
+        rows = read_rows(path, fmt)
+        self.assertEqual(exported, len(self.expected))
+        self.assertEqual(sorted(row[:3] for row in rows), self.expected)
+        for from_id, to_id, book_id, title in rows:
+            self.assertEqual(title, titles([book_id])[book_id])
+        self.assertFalse(
+            [name for name in os.listdir(self.tmp.name) if name.endswith(".tmp")]
+        )
+
+    def test_round_trip_from_plan_and_streams(self):
+        sources = {
+            "plan": lambda: self.plan,
+            "iter_moves": lambda: self.manager().iter_moves(),
+            "routes": lambda: self.plan.routes(),
+        }
+        for fmt in FORMATS:
+            for name, source in sources.items():
+                with self.subTest(fmt=fmt, source=name):
+                    exported = write_plan(
+                        source(), self.path(fmt), self.names, titles, chunk_size=64
+                    )
+                    self.assertRoundTrip(self.path(fmt), fmt, exported)
+
+    def test_library_names(self):
+        write_plan(self.plan, self.path("csv"), self.names, titles)
+        with open(self.path("csv"), encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                self.assertEqual(
+                    row["from_library"], self.names[int(row["from_library_id"])]
+                )
+                self.assertEqual(
+                    row["to_library"], self.names[int(row["to_library_id"])]
+                )
+        write_plan(self.plan, self.path("columnar"), self.names, titles)
+        self.assertEqual(
+            ColumnarPlan(self.path("columnar")).header["libraries"],
+            {str(k): v for k, v in self.names.items()},
+        )
+
+    def test_csv_and_ndjson_stream_moves(self):
+        # пачка пишется, пока план ещё строится: к первому запросу
+        # названий выдано не больше пачки переносов (и один сверх неё)
+        for fmt in ("csv", "ndjson"):
+            with self.subTest(fmt=fmt):
+                yielded = []
+                seen = []
+
+                def moves():
+                    for move in self.manager().iter_moves():
+                        yielded.append(move)
+                        yield move
+
+                def tracked(book_ids):
+                    seen.append((len(yielded), len(book_ids)))
+                    return titles(book_ids)
+
+                write_plan(moves(), self.path(fmt), self.names, tracked, chunk_size=50)
+                self.assertLessEqual(seen[0][0], 51)
+                self.assertTrue(all(size <= 50 for _, size in seen))
+                self.assertEqual(sum(size for _, size in seen), len(self.expected))
+
+    def test_error_keeps_previous_file(self):
+        for fmt in FORMATS:
+            with self.subTest(fmt=fmt):
+                path = self.path(fmt)
+                write_plan(self.plan, path, self.names, titles)
+                with open(path, "rb") as f:
+                    before = f.read()
+                calls = []
+
+                def failing(book_ids):
+                    calls.append(book_ids)
+                    if len(calls) == 3:
+                        raise RuntimeError("база недоступна")
+                    return titles(book_ids)
+
+                with self.assertRaisesMessage(RuntimeError, "база недоступна"):
+                    write_plan(self.plan, path, self.names, failing, chunk_size=20)
+                with open(path, "rb") as f:
+                    self.assertEqual(f.read(), before)
+                self.assertEqual(os.listdir(self.tmp.name), [FORMATS[fmt]])
+                os.remove(path)
+
+    def test_columnar_writer_checks_count(self):
+        path = self.path("columnar")
+        with self.assertRaisesMessage(ValueError, "Записано книг: 1"):
+            with export.ColumnarPlanWriter(path, self.names, [(1, 2, 2)]) as writer:
+                writer.write(1, 2, [10], titles([10]))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_columnar_header_checks(self):
+        path = self.path("columnar")
+        write_plan(self.plan, path, self.names, titles)
+        with open(path, "r+b") as f:
+            f.seek(8)
+            f.write((export.FORMAT_VERSION + 1).to_bytes(4, "little"))
+        with self.assertRaisesMessage(ValueError, "формат плана"):
+            ColumnarPlan(path)
+        with open(path, "r+b") as f:
+            f.write(b"NOTPLAN!")
+        with self.assertRaisesMessage(ValueError, "не файл плана"):
+            ColumnarPlan(path)
+
+    def test_empty_plan(self):
+        for fmt in FORMATS:
+            with self.subTest(fmt=fmt):
+                self.assertEqual(write_plan([], self.path(fmt), {}, titles), 0)
+                self.assertEqual(read_rows(self.path(fmt), fmt), [])
+                os.remove(self.path(fmt))
+
+    def test_format_selection(self):
+        self.assertEqual(export.guess_format("plan.JSONL"), "ndjson")
+        with self.assertRaisesMessage(ValueError, "формат не определить"):
+            export.guess_format("plan.txt")
+        with self.assertRaisesMessage(ValueError, "Неизвестный формат"):
+            write_plan(self.plan, self.path("csv"), self.names, titles, fmt="xlsx")
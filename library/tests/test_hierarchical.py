@@ -0,0 +1,119 @@
+import random
+
+from django.test import SimpleTestCase
+
+from library.redistribution import synthetic
+from library.redistribution.capacity import CapacityAwareRedistributionManager
+from library.redistribution.hierarchical import (
+    HierarchicalRebalancer,
+    _quotas,
+    region_flows,
+)
+from library.redistribution.priority import PriorityRedistributionManager
+from library.redistribution.records import LibraryRecord
+
+
+def flat_run(manager_class, libraries, rows):
+    flat = manager_class(libraries, rows)
+    moves = len(flat.plan())
+    return moves, {lib.id: flat.load[lib.id] for lib in libraries}
+
+
+class HierarchicalTests(SimpleTestCase):
+    """Регионы и межрегиональные переносы против плоского запуска."""
+
+    def assertMatchesFlat(self, manager_class, libraries, rows):
+        flat_moves, flat_load = flat_run(manager_class, libraries, rows)
+        mgr = HierarchicalRebalancer(libraries, rows, manager_class=manager_class)
+        plan = mgr.plan()
+        self.assertEqual({lib.id: mgr.load[lib.id] for lib in libraries}, flat_load)
+        self.assertEqual(len(plan), flat_moves)
+        book_ids = [move.book_id for move in plan]
+        self.assertEqual(len(set(book_ids)), len(book_ids))
+
+        region_of = {
+            lib.id: key for key, members in mgr.regions.items() for lib in members
+        }
+        self.assertEqual(
+            mgr.cross_region_moves,
+            sum(
+                route.quantity
+                for route in plan.routes()
+                if region_of[route.from_library_id] != region_of[route.to_library_id]
+            ),
+        )
+        self.assertEqual(
+            mgr.cross_region_moves, sum(quantity for _, _, quantity in mgr.flows)
+        )
+        return mgr
+
+    def test_synthetic_network_matches_flat(self):
+        network = synthetic.generate(3000, 40, districts=5, seed=4)
+        rows = list(network.rows())
+        for manager_class in (
+            CapacityAwareRedistributionManager,
+            PriorityRedistributionManager,
+        ):
+            with self.subTest(manager=manager_class.__name__):
+                mgr = self.assertMatchesFlat(manager_class, network.libraries, rows)
+                self.assertEqual(len(mgr.regions), 5)
+                self.assertGreater(mgr.cross_region_moves, 0)
+
+    def test_random_networks_match_flat(self):
+        for seed in range(150):
+            rng = random.Random(seed)
+            libraries = [
+                LibraryRecord(i + 1, rng.randint(1, 40), f"Район {rng.randint(1, 4)}")
+                for i in range(rng.randint(2, 20))
+            ]
+            # книги помещаются в сеть; перекос — в первые библиотеки
+            rows = []
+            free = {lib.id: lib.capacity for lib in libraries}
+            for book_id in range(1, rng.randint(0, sum(free.values())) + 1):
+                pool = [lib.id for lib in libraries if free[lib.id]]
+                lib_id = rng.choice(pool[: max(1, len(pool) // 3)])
+                free[lib_id] -= 1
+                rows.append((book_id, lib_id, rng.randint(1900, 2020)))
+            with self.subTest(seed=seed):
+                self.assertMatchesFlat(PriorityRedistributionManager, libraries, rows)
+
+    def test_quota_carries_over_to_next_receiver(self):
+        # вывоз донора 1 (5 книг) исчерпывает квоту получателя 2,
+        # остаток переходит к получателю 3
+        libraries = [
+            LibraryRecord(1, 10, "А"),
+            LibraryRecord(2, 10, "Б"),
+            LibraryRecord(3, 10, "Б"),
+        ]
+        rows = [(i, 1, 2000) for i in range(1, 9)]
+        mgr = HierarchicalRebalancer(libraries, rows)
+        plan = mgr.plan()
+        self.assertEqual(mgr.flows, [("А", "Б", 5)])
+        self.assertEqual(
+            sorted(
+                (r.from_library_id, r.to_library_id, r.quantity) for r in plan.routes()
+            ),
+            [(1, 2, 3), (1, 3, 2)],
+        )
+        self.assertEqual(mgr.cross_region_moves, 5)
+        self.assertEqual(dict(mgr.load), {1: 3, 2: 3, 3: 2})
+
+    def test_region_flows(self):
+        # крупнейший избыток — крупнейшему недостатку; у d остаётся 1,
+        # и крупнейшим становится недостаток b
+        self.assertEqual(
+            region_flows({"a": 5, "b": -2, "c": 3, "d": -6, "e": 0}),
+            [("a", "d", 5), ("c", "b", 2), ("c", "d", 1)],
+        )
+        self.assertEqual(region_flows({"a": 0, "b": 0}), [])
+        # избыток больше недостатка (книг больше вместимости) — сколько влезет
+        self.assertEqual(region_flows({"a": 7, "b": -3}), [("a", "b", 3)])
+
+    def test_quotas(self):
+        libraries = [LibraryRecord(i, 10) for i in (1, 2, 3)]
+        room = {1: 2, 2: 5, 3: 4}
+        # сначала самым большим, не больше room
+        self.assertEqual(_quotas(libraries, room, 7), {2: 5, 3: 2})
+        self.assertEqual(_quotas(libraries, room, 11), {2: 5, 3: 4, 1: 2})
+        self.assertEqual(_quotas(libraries, room, 20), {2: 5, 3: 4, 1: 2})
+        self.assertEqual(_quotas(libraries, room, 0), {})
@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from library import importers
+
+DATA = {
+    "authors": [{"id": 1, "full_name": "Пушкин", "birth_date": "1799-06-06"}],
+    "skipped": {"nested": [1, 2, 3]},
+    "books": [
+        {"id": 1, "title": "Евгений Онегин", "year": 1833, "author_id": 1},
+        {"id": 2, "title": "Капитанская дочка", "year": 1836, "author_id": 1},
+    ],
+    "libraries": [{"id": 1, "name": "Центральная", "capacity": 10}],
+}
+
+EXPECTED = [
+    ("authors", DATA["authors"][0]),
+    ("books", DATA["books"][0]),
+    ("books", DATA["books"][1]),
+    ("libraries", DATA["libraries"][0]),
+]
+
+
+class ReaderTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_json(self):
+        path = self.write("data.json", json.dumps(DATA, ensure_ascii=False, indent=1))
+        self.assertEqual(list(importers.iter_json(path)), EXPECTED)
+
+    def test_json_values_split_across_reads(self):
+        # буфер подчитывается по 3 символа: значения и числа рвутся на границах
+        path = self.write("data.json", json.dumps(DATA, ensure_ascii=False))
+        with mock.patch.object(importers, "READ_SIZE", 3):
+            self.assertEqual(list(importers.iter_json(path)), EXPECTED)
+
+    def test_json_malformed(self):
+        path = self.write("bad.json", '{"books": [{"id": 1,, }]}')
+        with self.assertRaises(ValueError):
+            list(importers.iter_json(path))
+        path = self.write("bad.json", '["books"]')
+        with self.assertRaisesMessage(ValueError, "Ожидался '{'"):
+            list(importers.iter_json(path))
+
+    def test_json_oversize_value(self):
+        # незакрытая строка не дочитывается в память до конца файла
+        path = self.write("bad.json", '{"books": ["' + "x" * 100)
+        with mock.patch.object(importers, "READ_SIZE", 8), mock.patch.object(
+            importers, "MAX_VALUE", 32
+        ):
+            with self.assertRaisesMessage(ValueError, "длиннее 32"):
+                list(importers.iter_json(path))
+
+    def test_ndjson(self):
+        lines = [
+            json.dumps(
+                {"type": kind[:-1] if kind != "libraries" else "library", **record},
+                ensure_ascii=False,
+            )
+            for kind, record in EXPECTED
+        ]
+        path = self.write("data.ndjson", "\n".join(lines[:2] + [""] + lines[2:]) + "\n")
+        self.assertEqual(list(importers.iter_ndjson(path)), EXPECTED)
+
+    def test_ndjson_errors_carry_line_numbers(self):
+        cases = {
+            '{"type": "book", "id": 1}\n{"type": "book", "id": \n': "строка 2",
+            '\n\n{"id": 1}\n': "строка 3",
+            '{"type": "shelf"}\n': "'shelf'",
+            '{"type": ["book"]}\n': "строка 1",
+            "[1, 2]\n": "строка 1",
+        }
+        for text, message in cases.items():
+            with self.subTest(text=text):
+                path = self.write("bad.ndjson", text)
+                with self.assertRaisesMessage(ValueError, message):
+                    list(importers.iter_ndjson(path))
+
+    def test_csv(self):
+        self.write("authors.csv", "id,full_name,birth_date\n1,Пушкин,1799-06-06\n")
+        self.write("books.csv", 'id,title,year,author_id\n1,"Онегин, роман",1833,1\n')
+        # libraries.csv нет — раздел пропускается
+        self.assertEqual(
+            list(importers.iter_csv(self.tmp.name)),
+            [
+                (
+                    "authors",
+                    {"id": "1", "full_name": "Пушкин", "birth_date": "1799-06-06"},
+                ),
+                (
+                    "books",
+                    {
+                        "id": "1",
+                        "title": "Онегин, роман",
+                        "year": "1833",
+                        "author_id": "1",
+                    },
+                ),
+            ],
+        )
+
+    def test_detect_format(self):
+        self.assertEqual(importers.detect_format(self.tmp.name), "csv")
+        self.assertEqual(importers.detect_format("export.ndjson"), "ndjson")
+        self.assertEqual(importers.detect_format("export.jsonl"), "ndjson")
+        self.assertEqual(importers.detect_format("initial_data.json"), "json")
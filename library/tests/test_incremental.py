@@ -0,0 +1,110 @@
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from library import counters, journal
+from library.models import Library, LibraryBook
+from library.redistribution.base import RedistributionManager
+from library.redistribution.orm import iter_leaving_rows
+from library.redistribution.priority import PriorityRedistributionManager
+
+from .network import load_network, placements, rebalance
+
+FULL_RECOUNT = "полный пересчёт"
+
+
+class IncrementalTests(TestCase):
+    """--incremental по снимку и журналу даёт то же, что полный пересчёт."""
+
+    def setUp(self):
+        load_network(seed=3)
+        rebalance()
+        rng = random.Random(1)
+        hot = list(Library.objects.order_by("pk").values_list("pk", flat=True)[:3])
+        for placement in rng.sample(
+            list(LibraryBook.objects.exclude(library_id__in=hot)), 60
+        ):
+            placement.library_id = rng.choice(hot)
+            placement.save()
+        for placement in rng.sample(list(LibraryBook.objects.all()), 10):
+            placement.delete()
+
+    def run_rolled_back(self, *args):
+        """Запуск в точке сохранения: результат и вывод, база не меняется."""
+        savepoint = transaction.savepoint()
+        output = rebalance(*args)
+        result = placements()
+        transaction.savepoint_rollback(savepoint)
+        return result, output
+
+    def test_journal_matches_counters(self):
+        libraries = list(Library.objects.all())
+        load = journal.current_load(libraries, journal.last_change_id())
+        self.assertEqual(load, counters.loads(libraries))
+        self.assertEqual(counters.drift(), {})
+
+    def test_same_placements_as_full_run(self):
+        for planner in ("priority", "mincost", "policy"):
+            with self.subTest(planner=planner):
+                before = placements()
+                incremental, output = self.run_rolled_back(
+                    "--incremental", "--planner", planner
+                )
+                self.assertNotIn(FULL_RECOUNT, output)
+                full, _ = self.run_rolled_back("--planner", planner)
+                self.assertEqual(incremental, full)
+                self.assertNotEqual(full, before)
+
+    def test_changes_behind_signals_force_full_run(self):
+        # update() идёт мимо сигналов; reconcile_library_load исправляет
+        # счётчики, и журнал с ними расходится
+        placement = LibraryBook.objects.exclude(library_id=1).first()
+        LibraryBook.objects.filter(pk=placement.pk).update(library_id=1)
+        call_command("reconcile_library_load", stdout=StringIO())
+        _, output = self.run_rolled_back("--incremental")
+        self.assertIn(FULL_RECOUNT, output)
+
+
+class LeavingRowsTests(TestCase):
+    """iter_leaving_rows выбирает те же книги, что менеджер по всем книгам."""
+
+    def setUp(self):
+        load_network(seed=5)
+
+    def expected(self, surplus, pick):
+        rows = {}
+        for row in LibraryBook.objects.order_by("id").values_list(
+            "book_id", "library_id", "book__year"
+        ):
+            rows.setdefault(row[1], []).append(row)
+        chosen = []
+        for library_id, count in surplus.items():
+            chosen += pick(rows[library_id], count)
+        return chosen
+
+    def test_same_rows_as_manager(self):
+        class Modern(PriorityRedistributionManager):
+            PRIORITY_YEAR = 2000
+
+        donors = sorted(set(placements().values()), reverse=True)
+        surplus = dict(zip(donors, [7, 1, 25]))
+        for manager_class in (PriorityRedistributionManager, Modern):
+            year = manager_class.PRIORITY_YEAR
+            with self.subTest(year=year):
+                self.assertEqual(
+                    list(iter_leaving_rows(surplus, manager_class)),
+                    self.expected(
+                        surplus,
+                        lambda rows, count: sorted(
+                            rows, key=lambda r: (r[2] > year, r[2]), reverse=True
+                        )[:count],
+                    ),
+                )
+        # "last": последние строки донора в прежнем порядке
+        self.assertEqual(
+            list(iter_leaving_rows(surplus, RedistributionManager)),
+            self.expected(surplus, lambda rows, count: rows[-count:]),
+        )
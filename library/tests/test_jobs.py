@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from library import counters, jobs
+from library.models import RebalanceJob
+
+from .network import load_network, placements, rebalance
+
+# фоновый поток heartbeat не пишет в базу за время теста
+HEARTBEAT = 3600
+
+
+class Interrupted(BaseException):
+    """Падение процесса: не Exception, задание не переводится в FAILED."""
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        load_network(n_books=300, n_libraries=10, seed=5)
+        # итог полного запуска rebalance_libraries — эталон для заданий
+        savepoint = transaction.savepoint()
+        rebalance()
+        self.expected = placements()
+        transaction.savepoint_rollback(savepoint)
+
+    def run_job(self, job, on_chunk=None):
+        return jobs.run(job, on_chunk=on_chunk, heartbeat=HEARTBEAT)
+
+    def assertCompleted(self, job):
+        self.assertEqual(job.status, RebalanceJob.DONE)
+        self.assertEqual(job.applied_chunks, job.total_chunks)
+        self.assertEqual(job.applied_moves, job.total_moves)
+        self.assertEqual(placements(), self.expected)
+        self.assertEqual(counters.drift(), {})
+
+    def test_uninterrupted(self):
+        job = jobs.submit(chunk_size=7)
+        job = self.run_job(jobs.claim("a"))
+        self.assertGreater(job.total_chunks, 1)
+        self.assertCompleted(job)
+
+    def test_crashed_job_is_reclaimed_and_resumed(self):
+        jobs.submit(chunk_size=7)
+        job = jobs.claim("a")
+
+        def crash(job, chunk, moved):
+            if chunk.index == 2:
+                raise Interrupted
+
+        with self.assertRaises(Interrupted):
+            self.run_job(job, on_chunk=crash)
+        job.refresh_from_db()
+        self.assertEqual(job.status, RebalanceJob.APPLYING)
+        self.assertEqual(job.applied_chunks, 3)
+        self.assertEqual(counters.drift(), {})
+
+        # heartbeat свежий — задание ещё считается занятым
+        self.assertIsNone(jobs.claim("b", stale_after=60))
+        RebalanceJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=120)
+        )
+        job = jobs.claim("b", stale_after=60)
+        self.assertEqual(job.worker, "b")
+
+        applied = []
+        job = self.run_job(
+            job, on_chunk=lambda job, chunk, moved: applied.append(chunk.index)
+        )
+        self.assertEqual(applied[0], 3)
+        self.assertCompleted(job)
+
+    def test_cancel_and_resume(self):
+        jobs.submit(chunk_size=7)
+
+        def cancel(job, chunk, moved):
+            if chunk.index == 1:
+                jobs.cancel(job.pk)
+
+        job = self.run_job(jobs.claim("a"), on_chunk=cancel)
+        self.assertEqual(job.status, RebalanceJob.CANCELLED)
+        self.assertEqual(job.applied_chunks, 2)
+
+        jobs.resume(job.pk)
+        job = self.run_job(jobs.claim("b"))
+        self.assertCompleted(job)
+        with self.assertRaises(ValueError):
+            jobs.resume(job.pk)
+
+    def test_queued_job_is_cancelled_at_once(self):
+        job = jobs.cancel(jobs.submit().pk)
+        self.assertEqual(job.status, RebalanceJob.CANCELLED)
+        self.assertIsNone(jobs.claim("a"))
+
+    def test_lost_job_is_left_to_new_owner(self):
+        jobs.submit(chunk_size=7)
+        old = jobs.claim("a")
+        RebalanceJob.objects.filter(pk=old.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=600)
+        )
+        new = jobs.claim("b", stale_after=300)
+        self.assertEqual(new.pk, old.pk)
+
+        # прежний владелец ничего не пишет: ни план, ни статус
+        old = self.run_job(old)
+        self.assertEqual(old.worker, "b")
+        self.assertEqual(old.status, RebalanceJob.PLANNING)
+        self.assertFalse(old.planned)
+        self.assertFalse(old.chunks.exists())
+
+        self.assertCompleted(self.run_job(new))
+
+    def test_lost_while_applying(self):
+        jobs.submit(chunk_size=7)
+        job = jobs.claim("a")
+
+        def steal(job, chunk, moved):
+            if chunk.index == 0:
+                RebalanceJob.objects.filter(pk=job.pk).update(worker="b")
+
+        job = self.run_job(job, on_chunk=steal)
+        self.assertEqual(job.status, RebalanceJob.APPLYING)
+        self.assertEqual(job.applied_chunks, 1)
+
+    def test_arrays_backend_needs_priority_planner(self):
+        with self.assertRaises(ValueError):
+            jobs.submit(planner="mincost", backend="arrays")
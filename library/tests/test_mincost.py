@@ -0,0 +1,106 @@
+import itertools
+import random
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from library.redistribution.mincost import MinCostRedistributionManager, min_cost_flow
+from library.redistribution.records import LibraryRecord
+
+
+def brute_force(supply, demand, cost):
+    """
+    Эталон перебором: наибольший объём по разрешённым маршрутам,
+    среди таких планов — наименьшая стоимость. (объём, стоимость).
+    """
+    m, n = len(supply), len(demand)
+    cells = [(i, j) for i in range(m) for j in range(n) if np.isfinite(cost[i][j])]
+    best = (0, 0.0)
+    ranges = [range(min(supply[i], demand[j]) + 1) for i, j in cells]
+    for amounts in itertools.product(*ranges):
+        sent, received = [0] * m, [0] * n
+        for (i, j), amount in zip(cells, amounts):
+            sent[i] += amount
+            received[j] += amount
+        if any(s > cap for s, cap in zip(sent, supply)) or any(
+            r > cap for r, cap in zip(received, demand)
+        ):
+            continue
+        volume = sum(amounts)
+        total = sum(cost[i][j] * a for (i, j), a in zip(cells, amounts))
+        if volume > best[0] or (volume == best[0] and total < best[1] - 1e-9):
+            best = (volume, total)
+    return best
+
+
+class MinCostFlowTests(SimpleTestCase):
+    def assertOptimal(self, supply, demand, cost):
+        flow = min_cost_flow(supply, demand, cost)
+        cost = np.asarray(cost, dtype=np.float64)
+        self.assertTrue((flow >= 0).all())
+        self.assertTrue((flow.sum(axis=1) <= supply).all())
+        self.assertTrue((flow.sum(axis=0) <= demand).all())
+        self.assertFalse(flow[~np.isfinite(cost)].any())
+        volume, total = brute_force(supply, demand, cost)
+        self.assertEqual(int(flow.sum()), volume)
+        used = flow > 0
+        self.assertAlmostEqual(float((flow[used] * cost[used]).sum()), total)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        for case in range(150):
+            m, n = rng.randint(1, 3), rng.randint(1, 3)
+            supply = [rng.randint(0, 3) for _ in range(m)]
+            demand = [rng.randint(0, 3) for _ in range(n)]
+            cost = [
+                [
+                    np.inf if rng.random() < 0.25 else float(rng.randint(0, 9))
+                    for _ in range(n)
+                ]
+                for _ in range(m)
+            ]
+            with self.subTest(case=case, supply=supply, demand=demand, cost=cost):
+                self.assertOptimal(supply, demand, cost)
+
+    def test_forbidden_cheapest_route_is_avoided(self):
+        inf = np.inf
+        flow = min_cost_flow([5, 5], [5, 5], [[inf, 1.0], [2.0, 9.0]])
+        self.assertEqual(flow.tolist(), [[0, 5], [5, 0]])
+
+    def test_unreachable_volume_is_not_moved(self):
+        inf = np.inf
+        flow = min_cost_flow([5, 5], [5, 5], [[inf, 1.0], [inf, 9.0]])
+        self.assertEqual(int(flow.sum()), 5)
+        self.assertEqual(flow[:, 0].tolist(), [0, 0])
+
+
+class MinCostManagerTests(SimpleTestCase):
+    def test_route_without_cost_is_unrouted(self):
+        libraries = [LibraryRecord(1, 10), LibraryRecord(2, 10), LibraryRecord(3, 10)]
+        rows = [(i, 1, 2000) for i in range(9)]
+        mgr = MinCostRedistributionManager(libraries, rows, cost_matrix={(1, 2): 5.0})
+        plan = mgr.plan()
+        self.assertEqual(
+            [(r.from_library_id, r.to_library_id) for r in plan.routes()], [(1, 2)]
+        )
+        self.assertEqual(
+            mgr.unrouted, len(rows) - len(plan) - mgr.load[1] + mgr.target_load[1]
+        )
+        self.assertEqual(mgr.load[3], 0)
+
+    def test_nearest_receiver_gets_the_books(self):
+        libraries = [
+            LibraryRecord(1, 10, "", 55.70, 37.60),
+            LibraryRecord(2, 10, "", 55.71, 37.60),
+            LibraryRecord(3, 10, "", 55.90, 37.60),
+            LibraryRecord(4, 10, "", 55.89, 37.60),
+        ]
+        rows = [(i, 1, 2000) for i in range(6)] + [(i, 3, 2000) for i in range(6, 12)]
+        # 4 и 2 пусты; ближайший к 1 — 2, к 3 — 4
+        plan = MinCostRedistributionManager(libraries, rows).plan()
+        self.assertEqual(
+            sorted(
+                (r.from_library_id, r.to_library_id, r.quantity) for r in plan.routes()
+            ),
+            [(1, 2, 3), (3, 4, 3)],
+        )
@@ -0,0 +1,91 @@
+from collections import Counter
+from io import StringIO
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from library import counters
+from library.models import Author, Book, Library, LibraryBook
+from library.redistribution.placement import STRATEGIES, place
+
+CAPACITIES = [5, 1, 3, 4]
+
+
+class PlacementTests(SimpleTestCase):
+    def test_strategies_respect_capacity(self):
+        for name in STRATEGIES:
+            for n_books in range(sum(CAPACITIES) + 1):
+                with self.subTest(strategy=name, n_books=n_books):
+                    positions = place(name, CAPACITIES, n_books)
+                    self.assertEqual(len(positions), n_books)
+                    load = np.bincount(positions, minlength=len(CAPACITIES))
+                    self.assertTrue((load <= CAPACITIES).all())
+
+    def test_first_fit(self):
+        self.assertEqual(
+            place("first-fit", CAPACITIES, 8).tolist(), [0, 0, 0, 0, 0, 1, 2, 2]
+        )
+
+    def test_proportional(self):
+        # 7 из 13: доли 2.69, 0.54, 1.62, 2.15 — лишние две по наибольшим остаткам
+        self.assertEqual(
+            place("proportional", CAPACITIES, 7).tolist(), [0, 0, 0, 2, 2, 3, 3]
+        )
+
+    def test_round_robin(self):
+        # заполненная библиотека 1 пропускается со второго круга
+        self.assertEqual(
+            place("round-robin", CAPACITIES, 9).tolist(), [0, 1, 2, 3, 0, 2, 3, 0, 2]
+        )
+
+    def test_not_enough_capacity(self):
+        for name in STRATEGIES:
+            with self.subTest(strategy=name):
+                with self.assertRaisesMessage(ValueError, "Не хватает мест"):
+                    place(name, CAPACITIES, sum(CAPACITIES) + 1)
+
+
+class InitInventoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(full_name="Автор", birth_date="1900-01-01")
+        Book.objects.bulk_create(
+            Book(title=f"Книга {i}", year=1900 + i, author=author) for i in range(10)
+        )
+        for i, capacity in enumerate(CAPACITIES):
+            Library.objects.create(name=f"Библиотека {i}", capacity=capacity)
+
+    def test_load_matches_placements(self):
+        for name in STRATEGIES:
+            with self.subTest(strategy=name):
+                call_command("init_inventory", strategy=name, stdout=StringIO())
+                actual = Counter(
+                    LibraryBook.objects.values_list("library_id", flat=True)
+                )
+                self.assertEqual(LibraryBook.objects.count(), 10)
+                self.assertEqual(
+                    counters.loads(),
+                    {lib.id: actual[lib.id] for lib in Library.objects.all()},
+                )
+                self.assertEqual(counters.drift(), {})
+
+    def test_not_enough_capacity(self):
+        call_command("init_inventory", stdout=StringIO())
+        Library.objects.update(capacity=1)
+        with self.assertRaisesMessage(CommandError, "Не хватает мест"):
+            call_command("init_inventory", stdout=StringIO())
+        # старое размещение не тронуто
+        self.assertEqual(LibraryBook.objects.count(), 10)
+        self.assertEqual(sum(counters.loads().values()), 10)
+
+    def test_save_keeps_load(self):
+        call_command("init_inventory", stdout=StringIO())
+        library = Library.objects.get(name="Библиотека 0")
+        # счётчик поменялся после чтения экземпляра
+        counters.adjust({library.id: -1})
+        library.capacity += 1
+        library.save()
+        library.refresh_from_db()
+        self.assertEqual(library.load, 4)
+        self.assertEqual(library.capacity, 6)
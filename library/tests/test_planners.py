@@ -0,0 +1,167 @@
+import random
+from collections import Counter, defaultdict
+
+from django.test import SimpleTestCase
+
+from library.redistribution.base import RedistributionManager
+from library.redistribution.capacity import CapacityAwareRedistributionManager
+from library.redistribution.priority import PriorityRedistributionManager
+from library.redistribution.records import LibraryRecord
+
+
+def random_network(seed):
+    """Библиотеки и кортежи (book_id, library_id, year) с перекосом загрузки."""
+    rng = random.Random(seed)
+    libraries = [
+        LibraryRecord(i + 1, rng.randint(1, 60)) for i in range(rng.randint(2, 30))
+    ]
+    free = {lib.id: lib.capacity for lib in libraries}
+    rows = []
+    for book_id in range(1, rng.randint(0, sum(free.values())) + 1):
+        open_ = [lib for lib in libraries if free[lib.id]]
+        # чаще в первые библиотеки — чтобы были доноры
+        pool = open_[: max(1, len(open_) // 3)] if rng.random() < 0.7 else open_
+        lib = rng.choice(pool)
+        free[lib.id] -= 1
+        rows.append(
+            (book_id, lib.id, rng.choice([1950, 1951, rng.randint(1800, 2020)]))
+        )
+    return libraries, rows
+
+
+def naive_rebalance(mgr):
+    """
+    Эталон — прежний цикл: каждый проход заново сортирует доноров и
+    получателей и переносит по одной книге через те же хуки менеджера.
+    """
+    moves = []
+    while True:
+        surplus = {i: mgr.load[i] - mgr.target_load[i] for i in mgr.libraries}
+        donors = sorted(
+            (i for i in surplus if surplus[i] > 0), key=lambda i: -surplus[i]
+        )
+        receivers = sorted(
+            (i for i in surplus if surplus[i] < 0), key=lambda i: surplus[i]
+        )
+        if not donors or not receivers:
+            return moves
+
+        progress = False
+        for donor_id in donors:
+            for receiver_id in receivers:
+                if mgr.load[donor_id] <= mgr.target_load[donor_id]:
+                    break
+                if mgr.load[receiver_id] >= mgr.target_load[receiver_id]:
+                    continue
+                if not mgr.can_give(donor_id) or not mgr.can_receive(receiver_id):
+                    continue
+                book = mgr.pick_book(donor_id)
+                mgr.load[donor_id] -= 1
+                mgr.load[receiver_id] += 1
+                mgr.books_by_library[receiver_id].append(book)
+                mgr.on_move_planned(donor_id, receiver_id)
+                moves.append((book.id, donor_id, receiver_id))
+                progress = True
+        if not progress:
+            return moves
+
+
+class HeapPlannerTests(SimpleTestCase):
+    """Очереди с приоритетом против прежнего поштучного цикла."""
+
+    managers = (RedistributionManager, CapacityAwareRedistributionManager)
+
+    def assertSameOutcome(self, manager_class, libraries, rows):
+        heap = manager_class(libraries, rows)
+        moves = [
+            (m.book_id, m.from_library_id, m.to_library_id) for m in heap.iter_moves()
+        ]
+        naive = manager_class(libraries, rows)
+        expected = naive_rebalance(naive)
+
+        self.assertEqual(len(moves), len(expected))
+        self.assertEqual(dict(heap.load), dict(naive.load))
+        # доноры отдают те же книги, получатели принимают столько же
+        leaving, arriving = defaultdict(set), Counter()
+        for book_id, donor_id, receiver_id in expected:
+            leaving[donor_id].add(book_id)
+            arriving[receiver_id] += 1
+        self.assertEqual(
+            {d: {b for b, f, _ in moves if f == d} for d in leaving}, dict(leaving)
+        )
+        self.assertEqual(Counter(r for _, _, r in moves), arriving)
+        # каждая книга переезжает не больше одного раза
+        self.assertEqual(len({b for b, _, _ in moves}), len(moves))
+        return heap
+
+    def test_matches_naive_loop(self):
+        for seed in range(200):
+            libraries, rows = random_network(seed)
+            for manager_class in self.managers:
+                with self.subTest(seed=seed, manager=manager_class.__name__):
+                    heap = self.assertSameOutcome(manager_class, libraries, rows)
+                    # книг не больше вместимости — цели достигаются точно
+                    for lib in libraries:
+                        self.assertEqual(heap.load[lib.id], heap.target_load[lib.id])
+
+    def test_capacity_never_exceeded(self):
+        for seed in range(50):
+            libraries, rows = random_network(seed)
+            mgr = CapacityAwareRedistributionManager(libraries, rows)
+            mgr.rebalance()
+            with self.subTest(seed=seed):
+                for lib in libraries:
+                    self.assertLessEqual(mgr.load[lib.id], lib.capacity)
+                    self.assertEqual(
+                        len(mgr.books_by_library[lib.id]), mgr.load[lib.id]
+                    )
+
+    def test_blocked_receiver_is_retried(self):
+        """Получатель, которому отказали, получает книги после переносов другим."""
+
+        class WaitsForSecond(RedistributionManager):
+            # библиотека 3 принимает книги, только когда у 2 они уже есть
+            def can_receive(self, library_id):
+                return library_id != 3 or self.load[2] > 0
+
+        libraries = [LibraryRecord(1, 10), LibraryRecord(2, 10), LibraryRecord(3, 20)]
+        rows = [(i, 1, 2000) for i in range(1, 10)]
+        mgr = WaitsForSecond(libraries, rows)
+        moves = mgr.rebalance()
+        self.assertEqual(dict(mgr.load), mgr.target_load)
+        self.assertEqual(len(moves), 9 - mgr.target_load[1])
+        self.assertEqual(mgr.passes, 2)
+
+
+class SortEveryPick(CapacityAwareRedistributionManager):
+    """Прежний PriorityRedistributionManager: сортировка на каждый выбор."""
+
+    def pick_book(self, donor_id):
+        books = self.books_by_library[donor_id]
+        book = sorted(books, key=lambda b: (b.year > 1950, b.year), reverse=True)[0]
+        books.remove(book)
+        return book
+
+
+class PriorityPlannerTests(SimpleTestCase):
+    """Однократная сортировка донора против сортировки на каждый выбор."""
+
+    def test_same_moves_as_sort_every_pick(self):
+        for seed in range(200):
+            libraries, rows = random_network(seed)
+            with self.subTest(seed=seed):
+                fast = PriorityRedistributionManager(libraries, rows).rebalance()
+                slow = SortEveryPick(libraries, rows).rebalance()
+                self.assertEqual(
+                    [(m.book_id, m.from_library_id, m.to_library_id) for m in fast],
+                    [(m.book_id, m.from_library_id, m.to_library_id) for m in slow],
+                )
+
+    def test_newest_leave_first_old_last(self):
+        libraries = [LibraryRecord(1, 10), LibraryRecord(2, 10)]
+        years = [1900, 2001, 1950, 1999, 1951, 1800, 2001, 1949]
+        rows = [(i, 1, year) for i, year in enumerate(years, start=1)]
+        mgr = PriorityRedistributionManager(libraries, rows)
+        left = [m.book_id for m in mgr.rebalance()]
+        # новые по убыванию года, из двух 2001 — стоявшая раньше; старые остаются
+        self.assertEqual(left, [2, 7, 4, 5])
@@ -0,0 +1,138 @@
+from collections import Counter
+
+from django.test import SimpleTestCase
+
+from library.redistribution.policies import (
+    NewestFirst,
+    Policy,
+    PolicyRedistributionManager,
+)
+from library.redistribution.priority import PriorityRedistributionManager
+from library.redistribution.records import LibraryRecord
+
+from .test_planners import random_network
+
+
+def placed(mgr):
+    return {
+        book.id: library_id
+        for library_id, books in mgr.books_by_library.items()
+        for book in books
+    }
+
+
+class PolicyTests(SimpleTestCase):
+    def test_newest_matches_priority_manager(self):
+        for seed in range(40):
+            with self.subTest(seed=seed):
+                libraries, rows = random_network(seed)
+                expected = PriorityRedistributionManager(libraries, rows)
+                mgr = PolicyRedistributionManager(
+                    libraries, rows, policy=Policy.parse(["newest:year=1950"])
+                )
+                self.assertEqual(
+                    [
+                        (m.book_id, m.from_library_id, m.to_library_id)
+                        for m in mgr.plan().moves()
+                    ],
+                    [
+                        (m.book_id, m.from_library_id, m.to_library_id)
+                        for m in expected.plan().moves()
+                    ],
+                )
+                self.assertEqual(placed(mgr), placed(expected))
+
+    def test_keep_era_minimum(self):
+        # у донора 4 старые книги: без ограничения уезжают две, с ним — одна
+        libraries = [LibraryRecord(1, 10), LibraryRecord(2, 10)]
+        rows = [(i, 1, 1900 + i) for i in range(1, 5)]
+        free = PolicyRedistributionManager(libraries, rows)
+        self.assertEqual(len(free.plan()), 2)
+        kept = PolicyRedistributionManager(
+            libraries, rows, policy=Policy.parse(["newest", "keep-era:minimum=3"])
+        )
+        self.assertEqual(len(kept.plan()), 1)
+        self.assertEqual(kept.load, {1: 3, 2: 1})
+
+    def test_keep_era_never_drops_below_minimum(self):
+        policy = Policy.parse(["newest", "keep-era:year=1950,minimum=4"])
+        for seed in range(40):
+            with self.subTest(seed=seed):
+                libraries, rows = random_network(seed)
+                before = Counter(lib for _, lib, year in rows if year <= 1950)
+                mgr = PolicyRedistributionManager(libraries, rows, policy=policy)
+                mgr.plan()
+                after = Counter(
+                    library_id
+                    for library_id, books in mgr.books_by_library.items()
+                    for book in books
+                    if book.year <= 1950
+                )
+                for lib in libraries:
+                    self.assertGreaterEqual(
+                        after[lib.id], min(before[lib.id], 4), lib.id
+                    )
+
+    def test_spread_authors_and_duplicates(self):
+        libraries = [LibraryRecord(1, 10), LibraryRecord(2, 10)]
+        books = {
+            1: (2000, 1, "Вишнёвый сад"),
+            2: (2000, 1, "Чайка"),
+            3: (2000, 1, "Дядя Ваня"),
+            4: (2000, 2, "Чайка "),
+        }
+
+        def moved(order, specs):
+            rows = [(book_id, 1, *books[book_id]) for book_id in order]
+            mgr = PolicyRedistributionManager(
+                libraries, rows, policy=Policy.parse(specs)
+            )
+            return {move.book_id for move in mgr.plan().moves()}
+
+        # без правил уезжают первые по порядку: 4 и 1; у донора три
+        # книги автора 1 — с spread-authors уезжают две из них
+        self.assertEqual(moved([4, 1, 2, 3], ["newest"]), {4, 1})
+        self.assertLessEqual(moved([4, 1, 2, 3], ["spread-authors"]), {1, 2, 3})
+        # "Чайка" и "Чайка " — одно название: уезжает ровно одна копия
+        self.assertEqual(moved([1, 3, 2, 4], ["newest"]), {1, 3})
+        self.assertEqual(len(moved([1, 3, 2, 4], ["duplicates"]) & {2, 4}), 1)
+
+    def test_negative_or_nan_weight_rejected(self):
+        for weight in (-1, -0.5, float("nan")):
+            with self.subTest(weight=weight):
+                with self.assertRaisesMessage(ValueError, "вес"):
+                    NewestFirst(weight=weight)
+        for spec in ("duplicates:weight=-2", "spread-authors:weight=nan"):
+            with self.subTest(spec=spec):
+                with self.assertRaisesMessage(ValueError, "вес"):
+                    Policy.parse([spec])
+
+    def test_parse_errors(self):
+        cases = {
+            "oldest": "Неизвестное правило",
+            "newest:year": "параметр=значение",
+            "newest:colour=1": "newest:",
+            "keep-era:minimum=три": "",
+        }
+        for spec, message in cases.items():
+            with self.subTest(spec=spec):
+                with self.assertRaisesMessage(ValueError, message):
+                    Policy.parse([spec])
+
+    def test_from_config(self):
+        policy = Policy.from_config(
+            [
+                {"rule": "newest", "year": 1900},
+                {"rule": "spread-authors", "weight": 2},
+                {"rule": "keep-era", "minimum": 2},
+            ]
+        )
+        self.assertEqual([rule.name for rule in policy.static_rules], ["newest"])
+        self.assertEqual(
+            [rule.name for rule in policy.dynamic_rules], ["spread-authors"]
+        )
+        self.assertEqual([(c.year, c.minimum) for c in policy.keep], [(1950, 2)])
+        self.assertTrue(policy.needs_details)
+        self.assertFalse(Policy.default().needs_details)
+        with self.assertRaisesMessage(ValueError, "Неизвестное правило"):
+            Policy.from_config([{"rule": "random"}])
@@ -0,0 +1,43 @@
+import json
+import os
+import tempfile
+
+from django.db import transaction
+from django.test import TestCase
+
+from library.redistribution.instrument import HOOKS
+
+from .network import load_network, rebalance
+
+
+class ReportTests(TestCase):
+    """--report: счётчики и хуки для каждого планировщика."""
+
+    def setUp(self):
+        load_network(seed=2, districts=3)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def report(self, *args):
+        path = os.path.join(self.tmp.name, "report.json")
+        # откат: каждый запуск видит несбалансированную сеть
+        savepoint = transaction.savepoint()
+        rebalance("--report", path, *args)
+        transaction.savepoint_rollback(savepoint)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_hooks_and_passes(self):
+        for args in ((), ("--hierarchical",)):
+            with self.subTest(args=args):
+                report = self.report(*args)
+                self.assertGreater(report["counters"]["passes"], 0)
+                self.assertGreater(report["counters"]["pairings"], 0)
+                self.assertEqual(set(report["hooks"]), set(HOOKS))
+                self.assertGreater(report["hooks"]["pick_book"]["calls"], 0)
+
+    def test_sharded_hooks_not_measured(self):
+        report = self.report("--sharded", "--workers", "1")
+        self.assertGreater(report["counters"]["passes"], 0)
+        self.assertGreater(report["counters"]["pairings"], 0)
+        self.assertEqual(report["hooks"], "n/a")
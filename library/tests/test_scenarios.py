@@ -0,0 +1,54 @@
+from django.test import SimpleTestCase
+
+from library.redistribution import synthetic
+from library.redistribution.priority import PriorityRedistributionManager
+from library.redistribution.scenarios import Scenario, evaluate, simulate
+from library.redistribution.snapshot import InventorySnapshot
+
+
+class ScenarioTests(SimpleTestCase):
+    """Сценарии «что если» по одному снимку."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        network = synthetic.generate(2000, 12, placement="proportional", seed=2)
+        cls.snapshot = InventorySnapshot(
+            network.libraries, network.book_id, network.library_id, network.year
+        )
+        cls.scenarios = (
+            [Scenario("как есть")]
+            + [
+                Scenario(f"закрыть {lib.id}", closed=(lib.id,))
+                for lib in network.libraries[:4]
+            ]
+            + [Scenario("сжать 1", capacity={1: 0.5})]
+        )
+
+    def test_arrays_match_priority_manager(self):
+        for scenario in self.scenarios:
+            with self.subTest(scenario=scenario.name):
+                arrays = evaluate(self.snapshot, scenario, manager="arrays")
+                objects = evaluate(self.snapshot, scenario, manager="priority")
+                self.assertEqual(arrays["moves"], objects["moves"])
+                self.assertEqual(arrays["unplaced"], objects["unplaced"])
+                self.assertAlmostEqual(arrays["transfer_km"], objects["transfer_km"], 6)
+
+    def test_pool_matches_sequential(self):
+        in_pool = simulate(self.snapshot, self.scenarios, max_workers=2)
+        sequential = simulate(self.snapshot, self.scenarios, max_workers=1)
+        self.assertEqual(in_pool, sequential)
+        self.assertEqual([r["name"] for r in in_pool], [s.name for s in self.scenarios])
+
+    def test_closed_library_is_emptied(self):
+        library = self.snapshot.libraries[0]
+        scenario = Scenario("закрыть", closed=(library.id,))
+        libraries = scenario.apply(self.snapshot.libraries)
+        mgr = PriorityRedistributionManager(libraries, self.snapshot.rows())
+        plan = mgr.plan()
+        self.assertEqual(mgr.load[library.id], 0)
+        self.assertEqual(
+            sum(r.quantity for r in plan.routes() if r.from_library_id == library.id),
+            int((self.snapshot.library_id == library.id).sum()),
+        )
+        self.assertEqual(evaluate(self.snapshot, scenario)["moves"], len(plan))
@@ -0,0 +1,67 @@
+from django.test import SimpleTestCase
+
+from library.redistribution import synthetic
+from library.redistribution.priority import PriorityRedistributionManager
+from library.redistribution.sharded import ShardedRebalancer, by_district, round_robin
+
+
+class ShardedTests(SimpleTestCase):
+    """Шарды и проход координатора против одного менеджера на всю сеть."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.network = synthetic.generate(3000, 40, districts=5, seed=4)
+        cls.rows = list(cls.network.rows())
+        flat = PriorityRedistributionManager(cls.network.libraries, cls.rows)
+        cls.flat_moves = len(flat.plan())
+        cls.flat_load = {lib.id: flat.load[lib.id] for lib in cls.network.libraries}
+
+    def rebalance(self, **options):
+        sharded = ShardedRebalancer(self.network.libraries, self.rows, **options)
+        return sharded, sharded.plan()
+
+    def assertMatchesFlat(self, sharded, plan):
+        load = {lib.id: sharded.load.get(lib.id, 0) for lib in self.network.libraries}
+        self.assertEqual(load, self.flat_load)
+        self.assertEqual(len(plan), self.flat_moves)
+        book_ids = [move.book_id for move in plan]
+        self.assertEqual(len(set(book_ids)), len(book_ids))
+
+    def cross_shard_moves(self, plan, partitioner):
+        shard_of = {
+            lib.id: key
+            for key, shard in partitioner(self.network.libraries).items()
+            for lib in shard
+        }
+        return sum(
+            route.quantity
+            for route in plan.routes()
+            if shard_of[route.from_library_id] != shard_of[route.to_library_id]
+        )
+
+    def test_districts_in_process_pool(self):
+        sharded, plan = self.rebalance(max_workers=2)
+        self.assertMatchesFlat(sharded, plan)
+        # итоговый проход координатора что-то перевёз между районами
+        self.assertGreater(self.cross_shard_moves(plan, by_district), 0)
+
+    def test_pool_matches_single_process(self):
+        _, in_pool = self.rebalance(max_workers=2)
+        _, single = self.rebalance(max_workers=1)
+        self.assertEqual(
+            sorted(
+                (r.from_library_id, r.to_library_id, list(r.book_ids))
+                for r in in_pool.routes()
+            ),
+            sorted(
+                (r.from_library_id, r.to_library_id, list(r.book_ids))
+                for r in single.routes()
+            ),
+        )
+
+    def test_round_robin_shards(self):
+        partitioner = round_robin(3)
+        sharded, plan = self.rebalance(partitioner=partitioner, max_workers=1)
+        self.assertMatchesFlat(sharded, plan)
+        self.assertGreater(self.cross_shard_moves(plan, partitioner), 0)
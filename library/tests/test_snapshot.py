@@ -0,0 +1,116 @@
+import os
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from library.models import LibraryBook
+from library.redistribution import snapshot
+from library.redistribution.orm import (
+    StaleSnapshot,
+    export_snapshot,
+    is_stale,
+    open_snapshot,
+)
+from library.redistribution.snapshot import InventorySnapshot, SnapshotWriter
+from library.redistribution.synthetic import generate
+
+from .network import load_network
+
+
+class SnapshotFileTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "inventory.snap")
+        self.network = generate(1000, 12, seed=1)
+
+    def write(self, chunk_size=300, marker="v1"):
+        network = self.network
+        with SnapshotWriter(
+            self.path, network.libraries, len(network), marker
+        ) as writer:
+            for start in range(0, len(network), chunk_size):
+                part = slice(start, start + chunk_size)
+                writer.append(
+                    book_id=network.book_id[part],
+                    library_id=network.library_id[part],
+                    year=network.year[part],
+                    author_id=network.author_id[part],
+                )
+
+    def test_round_trip(self):
+        self.write()
+        opened = InventorySnapshot.open(self.path)
+        self.assertEqual(opened.marker, "v1")
+        self.assertEqual(list(opened.rows()), list(self.network.rows()))
+        np.testing.assert_array_equal(opened.author_id, self.network.author_id)
+        self.assertEqual(
+            [(lib.id, lib.capacity, lib.district) for lib in opened.libraries],
+            [(lib.id, lib.capacity, lib.district) for lib in self.network.libraries],
+        )
+        # колонки смотрят в отображённый файл и только для чтения
+        self.assertFalse(opened.library_id.flags.writeable)
+        self.assertFalse(opened.book_id.flags.owndata)
+
+    def test_save_and_open_empty(self):
+        InventorySnapshot(self.network.libraries, [], [], []).save(self.path, "v0")
+        opened = InventorySnapshot.open(self.path)
+        self.assertEqual(len(opened), 0)
+        self.assertEqual(set(opened.load_by_library().values()), {0})
+
+    def test_header_checks(self):
+        self.write()
+        with open(self.path, "r+b") as f:
+            f.seek(8)
+            f.write((snapshot.FORMAT_VERSION + 1).to_bytes(4, "little"))
+        with self.assertRaisesMessage(ValueError, "формат снимка"):
+            InventorySnapshot.open(self.path)
+        with open(self.path, "r+b") as f:
+            f.write(b"NOTSNAP!")
+        with self.assertRaisesMessage(ValueError, "не файл снимка"):
+            snapshot.read_header(self.path)
+
+    def test_incomplete_write_leaves_no_file(self):
+        with self.assertRaisesMessage(ValueError, "Записано книг: 0"):
+            with SnapshotWriter(self.path, self.network.libraries, 10):
+                pass
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+        self.write(marker="v1")
+        with self.assertRaisesMessage(ValueError, "Книг больше"):
+            with SnapshotWriter(self.path, self.network.libraries, 1, "v2") as writer:
+                writer.append(book_id=[1, 2], library_id=[1, 1], year=[1900, 1901])
+        # прежний файл цел, временного нет
+        self.assertEqual(os.listdir(self.tmp.name), ["inventory.snap"])
+        self.assertEqual(snapshot.read_header(self.path)["marker"], "v1")
+
+
+class StaleSnapshotTests(TestCase):
+    def setUp(self):
+        load_network(n_books=200, n_libraries=5, seed=4)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "inventory.snap")
+
+    def test_fresh_snapshot_matches_database(self):
+        marker, n_books = export_snapshot(self.path, chunk_size=64)
+        self.assertEqual(n_books, 200)
+        self.assertFalse(is_stale(self.path))
+        opened = open_snapshot(self.path)
+        self.assertEqual(opened.marker, marker)
+        self.assertEqual(
+            sorted(zip(opened.book_id.tolist(), opened.library_id.tolist())),
+            sorted(LibraryBook.objects.values_list("book_id", "library_id")),
+        )
+
+    def test_change_makes_snapshot_stale(self):
+        export_snapshot(self.path)
+        placement = LibraryBook.objects.exclude(library_id=1).first()
+        placement.library_id = 1
+        placement.save()
+
+        self.assertTrue(is_stale(self.path))
+        with self.assertRaises(StaleSnapshot):
+            open_snapshot(self.path)
+        self.assertEqual(len(open_snapshot(self.path, allow_stale=True)), 200)
@@ -0,0 +1,68 @@
+import math
+from collections import Counter
+
+from django.test import SimpleTestCase
+
+from library.redistribution.placement import STRATEGIES
+from library.redistribution.synthetic import (
+    CAPACITY_DISTRIBUTIONS,
+    OLD_YEAR,
+    generate,
+)
+
+
+class GenerateTests(SimpleTestCase):
+    def test_capacity_matches_fill(self):
+        for capacity in CAPACITY_DISTRIBUTIONS:
+            for n_books, n_libraries, fill in [
+                (1000, 30, 0.8),
+                (997, 7, 0.33),
+                (5, 9, 1),
+            ]:
+                with self.subTest(capacity=capacity, n_books=n_books, fill=fill):
+                    network = generate(
+                        n_books, n_libraries, capacity=capacity, fill=fill
+                    )
+                    capacities = [lib.capacity for lib in network.libraries]
+                    self.assertEqual(len(capacities), n_libraries)
+                    self.assertGreaterEqual(min(capacities), 1)
+                    self.assertEqual(
+                        sum(capacities),
+                        max(math.ceil(n_books / fill), n_libraries),
+                    )
+
+    def test_placements_keep_books(self):
+        for placement in STRATEGIES:
+            with self.subTest(placement=placement):
+                network = generate(2000, 25, placement=placement, fill=0.9)
+                rows = list(network.rows(chunk_size=300))
+                self.assertEqual(len(network), 2000)
+                self.assertEqual(sorted(row[0] for row in rows), list(range(1, 2001)))
+                load = Counter(row[1] for row in rows)
+                for lib in network.libraries:
+                    self.assertLessEqual(load[lib.id], lib.capacity)
+
+    def test_records(self):
+        network = generate(300, 4, old_share=0.5, n_authors=7)
+        sections = Counter(section for section, _ in network.records())
+        self.assertEqual(sections, {"authors": 7, "books": 300, "libraries": 4})
+        old = sum(year <= OLD_YEAR for year in network.year.tolist())
+        self.assertTrue(100 < old < 200)
+
+    def test_same_seed_same_network(self):
+        first, second = generate(500, 10, seed=3), generate(500, 10, seed=3)
+        self.assertEqual(list(first.rows()), list(second.rows()))
+
+        def fields(network):
+            return [
+                (lib.id, lib.capacity, lib.district, lib.latitude, lib.longitude)
+                for lib in network.libraries
+            ]
+
+        self.assertEqual(fields(first), fields(second))
+
+    def test_invalid_arguments(self):
+        for options in ({"fill": 0}, {"fill": 1.5}, {"capacity": "normal"}):
+            with self.subTest(**options):
+                with self.assertRaises(ValueError):
+                    generate(100, 5, **options)
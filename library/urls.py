@@ -0,0 +1,17 @@
+from django.urls import path
+
+from library import views
+
+app_name = "library"
+
+urlpatterns = [
+    path("libraries/", views.library_list, name="library-list"),
+    path(
+        "libraries/<int:library_id>/books/",
+        views.library_books,
+        name="library-books",
+    ),
+    path("plan/", views.last_plan, name="last-plan"),
+    path("jobs/", views.job_list, name="job-list"),
+    path("jobs/<int:job_id>/", views.job_detail, name="job-detail"),
+]
@@ -0,0 +1,173 @@
+"""
+JSON API для дашбордов.
+
+Ответы libraries / books / plan кэшируются в памяти процесса (CACHES)
+под ключом «версия данных + путь запроса». Версия (DataVersion) растёт
+при изменении LibraryBook, Library, Book и Author, записи счётчиков
+и каждом перераспределении, поэтому
+запрос стоит одного чтения версии по первичному ключу, а устаревший
+кэш просто перестаёт находиться. ETag — та же версия: клиент с
+актуальным If-None-Match получает 304 без тела.
+"""
+
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_GET
+
+from library import jobs, journal
+from library.models import Library, LibraryBook, RebalanceJob
+from library.redistribution.apportion import target_loads
+
+DEFAULT_PAGE = 100
+MAX_PAGE = 1000
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _int_param(request, name, default, minimum=0, maximum=None):
+    raw = request.GET.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise BadRequest(f"{name} должен быть числом")
+    if value < minimum:
+        raise BadRequest(f"{name} должен быть не меньше {minimum}")
+    return value if maximum is None else min(value, maximum)
+
+
+def cached_json(view):
+    """
+    view возвращает dict для JSON. Ошибки (4xx) не кэшируются.
+    """
+
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        current = journal.version()
+        etag = f'"{current}"'
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+
+        key = f"api:{current}:{request.get_full_path()}"
+        body = cache.get(key)
+        if body is None:
+            try:
+                data = view(request, *args, **kwargs)
+            except BadRequest as e:
+                return JsonResponse({"error": str(e)}, status=400)
+            body = JsonResponse(data).content
+            cache.set(key, body)
+
+        response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        # кэшировать можно, но каждый раз сверяться по ETag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    return wrapper
+
+
+@cached_json
+def library_list(request):
+    """Загрузка, вместимость, цель и заполненность каждой библиотеки."""
+    libraries = list(Library.objects.order_by("id"))
+    # Library.load — поддерживаемый счётчик, инвентарь не читается
+    total = sum(lib.load for lib in libraries)
+    capacity = sum(lib.capacity for lib in libraries)
+    target = target_loads(libraries, total)
+    return {
+        "books": total,
+        "capacity": capacity,
+        "utilisation": round(total / capacity, 4) if capacity else None,
+        "libraries": [
+            {
+                "id": lib.id,
+                "name": lib.name,
+                "district": lib.district,
+                "capacity": lib.capacity,
+                "load": lib.load,
+                "target": target[lib.id],
+                "utilisation": (
+                    round(lib.load / lib.capacity, 4) if lib.capacity else None
+                ),
+            }
+            for lib in libraries
+        ],
+    }
+
+
+@cached_json
+def library_books(request, library_id):
+    """
+    Книги библиотеки по возрастанию id, страницами. Курсор — after
+    (id последней книги прошлой страницы): страница читается по индексу
+    (library, book), без OFFSET.
+    """
+    after = _int_param(request, "after", 0)
+    limit = _int_param(request, "limit", DEFAULT_PAGE, minimum=1, maximum=MAX_PAGE)
+    library = get_object_or_404(Library, pk=library_id)
+
+    books = (
+        LibraryBook.objects.filter(library_id=library.id, book_id__gt=after)
+        .order_by("book_id")
+        .values_list("book_id", "book__title", "book__year", "book__author__full_name")
+    )
+    # лишняя строка — признак следующей страницы
+    rows = list(books[: limit + 1])
+    page = rows[:limit]
+    return {
+        "library_id": library.id,
+        "books": [
+            {"id": book_id, "title": title, "year": year, "author": author}
+            for book_id, title, year, author in page
+        ],
+        "next": page[-1][0] if len(rows) > limit else None,
+    }
+
+
+@cached_json
+def last_plan(request):
+    """Маршруты последнего плана — фонового задания или rebalance_libraries."""
+    job = jobs.last_plan()
+    if job is None:
+        return {"job_id": None, "total_moves": 0, "routes": []}
+    return {
+        "job_id": job.pk,
+        "planner": job.planner,
+        "backend": job.backend,
+        "created_at": job.created_at.isoformat(),
+        "total_moves": job.total_moves,
+        "routes": [
+            {"from": from_id, "to": to_id, "quantity": quantity}
+            for from_id, to_id, quantity in jobs.plan_routes(job)
+        ],
+    }
+
+
+@require_GET
+def job_list(request):
+    """Последние задания перераспределения, новые первыми."""
+    try:
+        limit = _int_param(request, "limit", 20, minimum=1, maximum=100)
+    except BadRequest as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    selected = RebalanceJob.objects.order_by("-pk")[:limit]
+    return JsonResponse({"jobs": [jobs.progress(job) for job in selected]})
+
+
+@require_GET
+def job_detail(request, job_id):
+    """Прогресс одного задания (без кэша — меняется после каждой пачки)."""
+    job = get_object_or_404(RebalanceJob, pk=job_id)
+    return JsonResponse(jobs.progress(job))